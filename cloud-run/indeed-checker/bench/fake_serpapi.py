@@ -0,0 +1,202 @@
+"""ベンチマーク用の SerpAPI スタンドイン
+
+SERPAPI_URL に向けるローカルの HTTP サーバー。indeed_checker が発行する
+「site:jp.indeed.com/cmp/ "企業名"」（OR でまとめた一括検索を含む）と
+「site:<企業ページ>/jobs」の検索に、SerpAPI と同じ形の JSON を返す。
+
+- 応答までの遅延（latency + 一様なゆらぎ）を入れられる
+- error_rate の割合で HTTP 500、rate_429 の割合で HTTP 429（Retry-After: 1）を返す
+- capacity を指定すると、直近1秒のリクエスト数がそれを超えた分に HTTP 429 を返す
+  （SerpAPI 側の流量制限の代わり。適応制御の確認用）
+- 企業名ごとに掲載あり / /jobs ありを企業名のハッシュで決める（実行ごとに同じ結果）
+- 0件の検索には SerpAPI と同じく organic_results のない error ペイロードを返す
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+INDEED_BASE = 'https://jp.indeed.com/cmp/'
+
+# SerpAPI が検索結果0件のときに返す応答（HTTP 200）
+NO_RESULTS = {
+    'search_information': {'organic_results_state': 'Fully empty'},
+    'error': "Google hasn't returned any results for this query.",
+}
+
+_QUOTED = re.compile(r'"([^"]+)"')
+_JOBS_QUERY = re.compile(r'site:(https?://jp\.indeed\.com/cmp/[^/\s]+)/jobs')
+
+
+def _fraction(key: str) -> float:
+    """key から決まる [0, 1) の値。"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+class FakeSerpApi:
+    """SerpAPI スタンドインの HTTP サーバー。
+
+    Args:
+        latency: 応答までの基本の遅延（秒）
+        jitter: 遅延に加える一様なゆらぎの幅（秒）
+        error_rate: HTTP 500 を返す割合
+        rate_429: HTTP 429 を返す割合
+        detect_rate: Indeed に掲載ありとする企業名の割合
+        jobs_rate: 掲載ありの企業のうち /jobs ありとする割合
+        seed: エラー注入の乱数シード
+        capacity: 1秒あたりに受け付けるリクエスト数（超えた分は HTTP 429。0 で無制限）
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        detect_rate: float = 0.3,
+        jobs_rate: float = 0.7,
+        seed: int = 0,
+        capacity: float = 0.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.detect_rate = detect_rate
+        self.jobs_rate = jobs_rate
+        self.capacity = capacity
+        self._arrivals = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'cmp': 0, 'jobs': 0, 'errors': 0, 'rate_limited': 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/search.json'
+
+    def start(self) -> 'FakeSerpApi':
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name='fake-serpapi', daemon=True
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _over_capacity(self) -> bool:
+        """直近1秒に受け付けたリクエスト数が capacity に達していれば True。"""
+        now = time.monotonic()
+        with self._lock:
+            while self._arrivals and self._arrivals[0] <= now - 1:
+                self._arrivals.popleft()
+            if len(self._arrivals) >= self.capacity:
+                return True
+            self._arrivals.append(now)
+            return False
+
+    def _injected_status(self) -> Optional[int]:
+        if self.capacity and self._over_capacity():
+            self._count('rate_limited')
+            return 429
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_429:
+            self._count('rate_limited')
+            return 429
+        if roll < self.rate_429 + self.error_rate:
+            self._count('errors')
+            return 500
+        return None
+
+    def detected(self, name: str) -> bool:
+        return _fraction(f'cmp:{name}') < self.detect_rate
+
+    def has_jobs(self, name: str) -> bool:
+        return _fraction(f'jobs:{name}') < self.jobs_rate
+
+    def respond(self, query: str) -> dict:
+        """検索クエリに対する SerpAPI 形式の応答。"""
+        jobs_match = _JOBS_QUERY.search(query)
+        if jobs_match:
+            self._count('jobs')
+            cmp_url = jobs_match.group(1)
+            slug = cmp_url[len(INDEED_BASE):]
+            if not self.has_jobs(unquote(slug)):
+                return dict(NO_RESULTS)
+            return {'organic_results': [{'link': f'{cmp_url}/jobs', 'title': '求人'}]}
+
+        self._count('cmp')
+        results = self._cmp_results(_QUOTED.findall(query))
+        if not results:
+            return dict(NO_RESULTS)
+        return {'organic_results': results}
+
+    def _cmp_results(self, names: List[str]) -> List[dict]:
+        results = []
+        for position, name in enumerate(names, 1):
+            if not self.detected(name):
+                continue
+            cmp_url = INDEED_BASE + quote(name)
+            result = {
+                'position': position,
+                'link': cmp_url,
+                'title': f'{name}の求人・企業情報 | Indeed (インディード)',
+            }
+            if self.has_jobs(name):
+                result['sitelinks'] = {
+                    'inline': [{'link': f'{cmp_url}/jobs', 'title': '求人'}]
+                }
+            results.append(result)
+        return results
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeSerpApi
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文の書き込みの間で Nagle の遅延が入らないようにする
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        fake = self.fake
+        fake._count('requests')
+        delay = fake.latency + (fake.jitter * fake._random.random() if fake.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        status = fake._injected_status()
+        if status is not None:
+            body = json.dumps({'error': f'injected HTTP {status}'}).encode()
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', '1')
+        else:
+            params = parse_qs(urlparse(self.path).query)
+            query = params.get('q', [''])[0]
+            body = json.dumps(fake.respond(query), ensure_ascii=False).encode()
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
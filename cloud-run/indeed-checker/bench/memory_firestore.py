@@ -0,0 +1,323 @@
+"""ベンチマーク用のインメモリ Firestore
+
+firestore_service が使う範囲の google.cloud.firestore.Client の API
+（document の get / set / update / delete、where / select / order_by('__name__') /
+limit / start_after / stream、WriteBatch、get_all、トランザクション）をメモリ上で再現し、
+読み書きの回数を数える。
+
+latency を指定すると、ドキュメントの取得・クエリ・コミットのたびにその秒数だけ待つ
+（本番の Firestore の往復時間の代わり）。
+
+install() で firestore_service の接続先をこのクライアントに差し替える。
+Firestore エミュレーターを使う場合は差し替えずに FIRESTORE_EMULATOR_HOST を設定する。
+"""
+
+import copy
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+import firestore_service
+
+
+def _get_field(data: dict, path: str):
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def _resolve(value, current):
+    """書き込む値（Increment などのセンチネルを含む）を実際の値にする。"""
+    if isinstance(value, firestore.Increment):
+        return (current or 0) + value.value
+    return copy.deepcopy(value)
+
+
+def _project(data: dict, fields: Optional[List[str]]) -> dict:
+    if fields is None:
+        return copy.deepcopy(data)
+    projected = {}
+    for path in fields:
+        value = _get_field(data, path)
+        if value is None:
+            continue
+        parts = path.split('.')
+        target = projected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = copy.deepcopy(value)
+    return projected
+
+
+class Snapshot:
+    def __init__(self, reference: 'DocumentReference', data: Optional[dict], fields=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+        self._fields = fields
+
+    def to_dict(self) -> Optional[dict]:
+        if self._data is None:
+            return None
+        return _project(self._data, self._fields)
+
+
+class DocumentReference:
+    def __init__(self, client: 'MemoryFirestore', collection: str, doc_id: str):
+        self._client = client
+        self.collection = collection
+        self.id = doc_id
+        self.path = f'{collection}/{doc_id}'
+
+    def _docs(self) -> Dict[str, dict]:
+        return self._client.data.setdefault(self.collection, {})
+
+    def get(self, transaction=None, field_paths=None) -> Snapshot:
+        self._client.wait()
+        with self._client.lock:
+            self._client.count('reads')
+            data = self._docs().get(self.id)
+            return Snapshot(self, copy.deepcopy(data) if data is not None else None, field_paths)
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        with self._client.lock:
+            self._client.count('writes')
+            self._apply_set(data, merge)
+
+    def update(self, data: dict) -> None:
+        with self._client.lock:
+            self._client.count('writes')
+            self._apply_update(data)
+
+    def delete(self) -> None:
+        with self._client.lock:
+            self._client.count('writes')
+            self._docs().pop(self.id, None)
+
+    def _apply_set(self, data: dict, merge: bool) -> None:
+        docs = self._docs()
+        if not merge:
+            docs[self.id] = {key: _resolve(value, None) for key, value in data.items()}
+            return
+
+        def _merge(target: dict, source: dict) -> None:
+            for key, value in source.items():
+                if value is firestore.DELETE_FIELD:
+                    target.pop(key, None)
+                elif isinstance(value, dict) and isinstance(target.get(key), dict):
+                    _merge(target[key], value)
+                else:
+                    target[key] = _resolve(value, target.get(key))
+
+        _merge(docs.setdefault(self.id, {}), data)
+
+    def _apply_update(self, data: dict) -> None:
+        doc = self._docs().get(self.id)
+        if doc is None:
+            raise NotFound(f'No document to update: {self.path}')
+        for path, value in data.items():
+            parts = path.split('.')
+            target = doc
+            for part in parts[:-1]:
+                if not isinstance(target.get(part), dict):
+                    target[part] = {}
+                target = target[part]
+            if value is firestore.DELETE_FIELD:
+                target.pop(parts[-1], None)
+            else:
+                target[parts[-1]] = _resolve(value, target.get(parts[-1]))
+
+
+class Query:
+    def __init__(self, client: 'MemoryFirestore', collection: str):
+        self._client = client
+        self._collection = collection
+        self._filters = []
+        self._fields = None
+        self._limit = None
+        self._start_after = None
+
+    def _copy(self, **changes) -> 'Query':
+        query = copy.copy(self)
+        query._filters = list(self._filters)
+        for key, value in changes.items():
+            setattr(query, key, value)
+        return query
+
+    def document(self, doc_id: str) -> DocumentReference:
+        return DocumentReference(self._client, self._collection, doc_id)
+
+    def where(self, field_path: str, op_string: str, value) -> 'Query':
+        query = self._copy()
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def select(self, field_paths: Iterable[str]) -> 'Query':
+        return self._copy(_fields=list(field_paths))
+
+    def order_by(self, field_path: str, **kwargs) -> 'Query':
+        # ドキュメントID順（__name__）のみ対応。結果は常にID順で返す
+        return self._copy()
+
+    def limit(self, count: int) -> 'Query':
+        return self._copy(_limit=count)
+
+    def start_after(self, cursor) -> 'Query':
+        if isinstance(cursor, dict):
+            cursor = cursor['__name__']
+        return self._copy(_start_after=cursor.id)
+
+    def _matches(self, data: dict) -> bool:
+        for field_path, op, value in self._filters:
+            actual = _get_field(data, field_path)
+            if op == '==':
+                ok = actual == value
+            elif op == 'in':
+                ok = actual in value
+            elif actual is None:
+                ok = False
+            elif op == '<':
+                ok = actual < value
+            elif op == '<=':
+                ok = actual <= value
+            elif op == '>':
+                ok = actual > value
+            elif op == '>=':
+                ok = actual >= value
+            else:
+                raise NotImplementedError(f'未対応の演算子: {op}')
+            if not ok:
+                return False
+        return True
+
+    def stream(self):
+        self._client.wait()
+        with self._client.lock:
+            self._client.count('queries')
+            docs = self._client.data.get(self._collection, {})
+            snapshots = []
+            for doc_id in sorted(docs):
+                if self._start_after is not None and doc_id <= self._start_after:
+                    continue
+                data = docs[doc_id]
+                if not self._matches(data):
+                    continue
+                snapshots.append(
+                    Snapshot(self.document(doc_id), _project(data, self._fields))
+                )
+                if self._limit is not None and len(snapshots) >= self._limit:
+                    break
+            self._client.count('reads', len(snapshots))
+        return iter(snapshots)
+
+    def on_snapshot(self, callback):
+        raise NotImplementedError('インメモリ Firestore は on_snapshot に対応していません')
+
+
+class WriteBatch:
+    def __init__(self, client: 'MemoryFirestore'):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference: DocumentReference, data: dict, merge: bool = False) -> None:
+        self._writes.append(('set', reference, data, merge))
+
+    def update(self, reference: DocumentReference, data: dict) -> None:
+        self._writes.append(('update', reference, data, None))
+
+    def delete(self, reference: DocumentReference) -> None:
+        self._writes.append(('delete', reference, None, None))
+
+    def commit(self) -> None:
+        # どれか1件でも失敗したら何も書き込まない（Firestore の WriteBatch と同じ）
+        self._client.wait()
+        with self._client.lock:
+            self._client.count('commits')
+            for kind, reference, _, _ in self._writes:
+                if kind == 'update' and reference.id not in reference._docs():
+                    raise NotFound(f'No document to update: {reference.path}')
+            for kind, reference, data, merge in self._writes:
+                self._client.count('writes')
+                if kind == 'set':
+                    reference._apply_set(data, merge)
+                elif kind == 'update':
+                    reference._apply_update(data)
+                else:
+                    reference._docs().pop(reference.id, None)
+
+
+class Transaction(WriteBatch):
+    """書き込みを即時に反映するトランザクション（transactional がロックで直列化する）。"""
+
+    def set(self, reference, data, merge=False):
+        reference.set(data, merge=merge)
+
+    def update(self, reference, data):
+        reference.update(data)
+
+    def delete(self, reference):
+        reference.delete()
+
+
+class MemoryFirestore:
+    """インメモリの Firestore クライアント。
+
+    Args:
+        latency: 取得・クエリ・コミット1回あたりの待ち時間（秒）
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.data: Dict[str, Dict[str, dict]] = {}
+        self.lock = threading.RLock()
+        self.ops = {'reads': 0, 'writes': 0, 'commits': 0, 'queries': 0}
+
+    def wait(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def count(self, op: str, n: int = 1) -> None:
+        self.ops[op] += n
+
+    def collection(self, name: str) -> Query:
+        return Query(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self) -> Transaction:
+        return Transaction(self)
+
+    def get_all(self, references, field_paths=None):
+        for reference in references:
+            yield reference.get(field_paths=field_paths)
+
+
+class _FirestoreModule:
+    """firestore_service から見た google.cloud.firestore の代わり（transactional だけ差し替え）。"""
+
+    def __init__(self, client: MemoryFirestore):
+        self._client = client
+
+    def transactional(self, fn):
+        def _run(transaction, *args, **kwargs):
+            with self._client.lock:
+                return fn(transaction, *args, **kwargs)
+        return _run
+
+    def __getattr__(self, name):
+        return getattr(firestore, name)
+
+
+def install(client: Optional[MemoryFirestore] = None) -> MemoryFirestore:
+    """firestore_service の接続先をインメモリ Firestore に差し替える。"""
+    client = client or MemoryFirestore()
+    firestore_service._db = client
+    firestore_service.firestore = _FirestoreModule(client)
+    return client
@@ -0,0 +1,361 @@
+"""オフラインベンチマーク
+
+SerpAPI スタンドイン（fake_serpapi）とインメモリ Firestore（memory_firestore）に
+合成した企業・求人を入れ、/run と /check-single を Flask のテストクライアントで
+端から端まで実行する。実際の SerpAPI のクエリも本番の Firestore も使わない。
+
+報告する値:
+    throughput       1秒あたりにチェックした企業数
+    latency          企業ごとのチェック所要時間の p50 / p95（ミリ秒）
+    peak_rss_mb      プロセスの最大常駐メモリ
+    firestore        読み取り・書き込み・コミット・クエリの回数
+    serpapi          スタンドインが受けたリクエスト数・注入したエラー数
+    timings          /run サマリーの段階ごとの集計
+
+使い方（cloud-run/indeed-checker で実行）:
+    python bench/run_bench.py --companies 1000
+    python bench/run_bench.py --scale 1k,10k,100k --json
+    python bench/run_bench.py --companies 5000 --latency-ms 200 --error-rate 0.02 --rate-429 0.01
+    python bench/run_bench.py --companies 2000 --adaptive --capacity 50
+
+SerpAPI の適応制御（rate_controller）は --adaptive のときだけ有効にする。
+--qps がレートの上限、--start-qps が開始時のレートになる。
+
+Firestore エミュレーターを使う場合は FIRESTORE_EMULATOR_HOST を設定する
+（インメモリ Firestore に差し替えず、エミュレーターに合成データを書き込む）。
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_serpapi import FakeSerpApi  # noqa: E402
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+# 同じ企業名を持つ企業（チェーン店など）の割合
+DUPLICATE_RATE = 0.1
+# アクティブな企業の割合
+ACTIVE_RATE = 0.95
+# 企業あたりの求人数の上限
+MAX_JOBS_PER_COMPANY = 5
+
+_NAME_PARTS = ('サンプル', 'テスト', 'ミライ', 'ひかり', 'グローバル', 'フード', 'メディカル', 'ケア')
+_SUFFIXES = ('株式会社', '有限会社', '', '（株）', '合同会社')
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Indeed チェッカーのオフラインベンチマーク')
+    parser.add_argument('--companies', type=int, default=1000, help='合成する企業数')
+    parser.add_argument(
+        '--scale',
+        help='カンマ区切りの規模（1k,10k,100k）。規模ごとに別プロセスで実行する',
+    )
+    parser.add_argument('--workers', type=int, default=4, help='/run の並列ワーカー数')
+    parser.add_argument('--qps', type=float, default=200, help='SerpAPI のリクエストレート')
+    parser.add_argument('--batch', type=int, default=1, help='OR でまとめる企業名の数')
+    parser.add_argument(
+        '--jobs-check', default='full', help='/jobs の確認方法（full / single / deferred / off）'
+    )
+    parser.add_argument('--latency-ms', type=float, default=50, help='スタンドインの応答遅延')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='応答遅延のゆらぎの幅')
+    parser.add_argument(
+        '--firestore-latency-ms', type=float, default=0,
+        help='インメモリ Firestore の取得・クエリ・コミット1回あたりの遅延',
+    )
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 を返す割合')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='HTTP 429 を返す割合')
+    parser.add_argument(
+        '--capacity', type=float, default=0,
+        help='スタンドインが1秒あたりに受け付けるリクエスト数（超えた分は HTTP 429。0 で無制限）',
+    )
+    parser.add_argument('--adaptive', action='store_true', help='SerpAPI の適応制御を有効にする')
+    parser.add_argument(
+        '--start-qps', type=float, default=1, help='適応制御の開始時のレート（--adaptive のとき）'
+    )
+    parser.add_argument('--detect-rate', type=float, default=0.3, help='掲載ありの企業名の割合')
+    parser.add_argument('--single', type=int, default=20, help='/check-single を呼ぶ回数')
+    parser.add_argument('--seed', type=int, default=0, help='合成データの乱数シード')
+    parser.add_argument('--json', action='store_true', help='結果を JSON で出力する')
+    parser.add_argument('--verbose', action='store_true', help='チェッカーのログを出力する')
+    return parser.parse_args(argv)
+
+
+def synthetic_data(count: int, seed: int = 0):
+    """合成した企業と求人（(企業ID, データ) のリスト）を返す。"""
+    rng = random.Random(seed)
+    companies, jobs = [], []
+    names: List[str] = []
+    for i in range(count):
+        if names and rng.random() < DUPLICATE_RATE:
+            name = rng.choice(names)
+        else:
+            part = _NAME_PARTS[i % len(_NAME_PARTS)]
+            suffix = rng.choice(_SUFFIXES)
+            name = f'{suffix}{part}{i}' if rng.random() < 0.5 else f'{part}{i}{suffix}'
+            names.append(name)
+        company_id = f'c{i:07d}'
+        status = 'active' if rng.random() < ACTIVE_RATE else 'inactive'
+        companies.append((company_id, {'name': name, 'status': status}))
+        for j in range(rng.randint(0, MAX_JOBS_PER_COMPANY)):
+            jobs.append((f'{company_id}-j{j}', {
+                'companyId': company_id,
+                'status': 'active' if rng.random() < 0.8 else 'closed',
+            }))
+    return companies, jobs
+
+
+def _seed_memory(client, companies, jobs) -> None:
+    client.data['companies'] = {company_id: data for company_id, data in companies}
+    client.data['jobs'] = {job_id: data for job_id, data in jobs}
+
+
+def _seed_emulator(db, companies, jobs) -> None:
+    batch, pending = db.batch(), 0
+    for collection, docs in (('companies', companies), ('jobs', jobs)):
+        for doc_id, data in docs:
+            batch.set(db.collection(collection).document(doc_id), data)
+            pending += 1
+            if pending == 500:
+                batch.commit()
+                batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None}
+    ordered = sorted(values)
+
+    def _pick(pct: float) -> float:
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 1)
+
+    return {'p50': _pick(50), 'p95': _pick(95)}
+
+
+def run_once(args: argparse.Namespace) -> dict:
+    """1つの規模でベンチマークを実行する（チェッカーのモジュールは環境変数の設定後に読み込む）。"""
+    fake = FakeSerpApi(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        detect_rate=args.detect_rate,
+        seed=args.seed,
+        capacity=args.capacity,
+    ).start()
+
+    os.environ['SERPAPI_KEY'] = 'bench'
+    os.environ['SERPAPI_URL'] = fake.url
+    if args.adaptive:
+        os.environ['SERPAPI_ADAPTIVE'] = '1'
+        os.environ['SERPAPI_QPS'] = str(min(args.start_qps, args.qps))
+        os.environ['SERPAPI_MAX_QPS'] = str(args.qps)
+        os.environ.setdefault('SERPAPI_INFLIGHT', str(max(1, args.workers)))
+        os.environ.setdefault('SERPAPI_MAX_INFLIGHT', str(max(1, args.workers)))
+    else:
+        os.environ['SERPAPI_ADAPTIVE'] = '0'
+        os.environ['SERPAPI_QPS'] = str(args.qps)
+    os.environ['SERPAPI_BURST'] = str(max(1, args.workers))
+    os.environ['INDEED_CACHE_BACKEND'] = 'none'
+    os.environ['RUN_RESULTS_DIR'] = tempfile.mkdtemp(prefix='indeed-bench-')
+    os.environ.setdefault('SERPAPI_BACKOFF_BASE', '0.05')
+    os.environ.setdefault('SERPAPI_BACKOFF_MAX', '1')
+
+    import logging
+
+    import firestore_service
+    import main
+    import runner
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    companies, jobs = synthetic_data(args.companies, args.seed)
+    if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        client = None
+        _seed_emulator(firestore_service.get_db(), companies, jobs)
+    else:
+        import memory_firestore
+        client = memory_firestore.install(
+            memory_firestore.MemoryFirestore(latency=args.firestore_latency_ms / 1000)
+        )
+        _seed_memory(client, companies, jobs)
+
+    # 投入単位（1グループ or OR 検索でまとめた複数グループ）の所要時間を、含まれる企業ごとに記録する
+    latencies: List[float] = []
+    latencies_lock = threading.Lock()
+    process = runner.CheckRun._process
+
+    def _timed_process(self, groups):
+        started = time.monotonic()
+        try:
+            return process(self, groups)
+        finally:
+            elapsed = time.monotonic() - started
+            with latencies_lock:
+                latencies.extend([elapsed] * sum(len(g.companies) for g in groups))
+
+    runner.CheckRun._process = _timed_process
+
+    def _ops() -> Optional[dict]:
+        return dict(client.ops) if client is not None else None
+
+    def _delta(before: Optional[dict]) -> Optional[dict]:
+        if before is None:
+            return None
+        return {key: value - before[key] for key, value in client.ops.items()}
+
+    app = main.app.test_client()
+    report = {
+        'companies': args.companies,
+        'active': sum(1 for _, data in companies if data['status'] == 'active'),
+        'jobs': len(jobs),
+        'config': {
+            'workers': args.workers,
+            'qps': args.qps,
+            'batch': args.batch,
+            'jobs_check': args.jobs_check,
+            'latency_ms': args.latency_ms,
+            'firestore_latency_ms': args.firestore_latency_ms,
+            'error_rate': args.error_rate,
+            'rate_429': args.rate_429,
+            'capacity': args.capacity,
+            'adaptive': args.adaptive,
+        },
+    }
+
+    # /run（全企業。時間の上限なし）
+    ops_before = _ops()
+    started = time.monotonic()
+    response = app.post(
+        f'/run?full=1&max_seconds=0&workers={args.workers}'
+        f'&batch={args.batch}&jobs_check={args.jobs_check}'
+    )
+    elapsed = time.monotonic() - started
+    summary = response.get_json() or {}
+    checked = summary.get('processed', 0)
+    report['run'] = {
+        'status': response.status_code,
+        'runStatus': summary.get('status'),
+        'seconds': round(elapsed, 2),
+        'processed': checked,
+        'detected': summary.get('detected'),
+        'errors': summary.get('errors'),
+        'throughput': round(checked / elapsed, 1) if elapsed else None,
+        'latency_ms': _percentiles(latencies),
+        'firestore': _delta(ops_before),
+        'timings': summary.get('timings'),
+        'adaptive': (summary.get('serpapi') or {}).get('adaptive'),
+    }
+
+    # /check-single（ランダムに選んだ企業を1社ずつ）
+    rng = random.Random(args.seed)
+    active = [(company_id, data) for company_id, data in companies if data['status'] == 'active']
+    samples = rng.sample(active, min(args.single, len(active)))
+    single_latencies = []
+    ops_before = _ops()
+    for company_id, data in samples:
+        started = time.monotonic()
+        app.post('/check-single', json={'companyId': company_id, 'companyName': data['name']})
+        single_latencies.append(time.monotonic() - started)
+    report['check_single'] = {
+        'calls': len(samples),
+        'latency_ms': _percentiles(single_latencies),
+        'firestore': _delta(ops_before),
+    }
+
+    report['serpapi'] = dict(fake.stats)
+    # Linux の ru_maxrss は KB
+    report['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    fake.stop()
+    return report
+
+
+def _print_report(report: dict) -> None:
+    run = report['run']
+    single = report['check_single']
+    print(f'== {report["companies"]} 社（アクティブ {report["active"]}、求人 {report["jobs"]}）')
+    print(
+        f'/run: {run["processed"]} 社 / {run["seconds"]} 秒 = {run["throughput"]} 社/秒 '
+        f'(status={run["runStatus"]}, 掲載あり={run["detected"]}, エラー={run["errors"]})'
+    )
+    print(f'  企業ごとのレイテンシ: p50={run["latency_ms"]["p50"]}ms p95={run["latency_ms"]["p95"]}ms')
+    print(f'  Firestore: {run["firestore"]}')
+    if run.get('adaptive'):
+        print(f'  適応制御: {run["adaptive"]}')
+    for name, stat in sorted((run.get('timings') or {}).items()):
+        print(f'  {name:16s} count={stat["count"]:7d} avg={stat["avg_ms"]}ms')
+    print(
+        f'/check-single: {single["calls"]} 回 p50={single["latency_ms"]["p50"]}ms '
+        f'p95={single["latency_ms"]["p95"]}ms Firestore: {single["firestore"]}'
+    )
+    print(f'SerpAPI スタンドイン: {report["serpapi"]}')
+    print(f'最大 RSS: {report["peak_rss_mb"]} MB')
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if not args.scale:
+        report = run_once(args)
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False))
+        else:
+            _print_report(report)
+        return 0 if report['run']['status'] == 200 else 1
+
+    # 規模ごとに別プロセスで実行する（最大 RSS・モジュールの状態を分けるため）
+    base_argv = _without_options(
+        list(argv if argv is not None else sys.argv[1:]),
+        {'--scale': True, '--companies': True, '--json': False},
+    )
+    reports = []
+    for scale in args.scale.split(','):
+        count = SCALES.get(scale.strip()) or int(scale)
+        child_argv = base_argv + ['--companies', str(count), '--json']
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)] + child_argv,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        reports.append(report)
+        if not args.json:
+            _print_report(report)
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False))
+    return 0
+
+
+def _without_options(argv: List[str], options: Dict[str, bool]) -> List[str]:
+    """argv から options（オプション名 → 値を取るか）を取り除く。"""
+    result, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in options:
+            skip = options[name] and '=' not in arg
+            continue
+        result.append(arg)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,43 +1,572 @@
 """Firestore サービスモジュール
 
 Companies / Jobs コレクションの読み書きを担当する。
+google.cloud.firestore は読み込みに時間がかかるため、起動時ではなく
+最初に Firestore を使うときに読み込む（/health などは読み込まずに応答できる）。
 """
 
 import logging
-from datetime import datetime, timezone
-from typing import Dict, List, Optional
-from google.cloud import firestore
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from metrics import stage, startup_step
 
 logger = logging.getLogger(__name__)
 
 _db = None
+_db_lock = threading.Lock()
+
+# google.cloud.firestore モジュール（_firestore() が初回に読み込む）
+firestore = None
+
+# WriteBatch 1回あたりの最大書き込み件数（Firestore の上限）
+BATCH_LIMIT = 500
+
+# 企業スキャンの1ページあたりの件数
+COMPANY_PAGE_SIZE = 200
+
+# チェックに必要な企業フィールド
+COMPANY_FIELDS = ['name', 'indeedStatus']
+
+# in クエリ1回あたりの最大値の数（Firestore の上限）
+IN_QUERY_LIMIT = 30
+
+# 一括チェックの実行状態（チェックポイント）を保存するコレクション
+RUNS_COLLECTION = 'indeedCheckerRuns'
+
+# 一括チェックの実行リース（同時実行の防止）を保存するコレクション
+LEASES_COLLECTION = 'indeedCheckerLeases'
+
+# SerpAPI の月間クエリ使用量を保存するコレクション（ドキュメントID は YYYY-MM）
+QUOTA_COLLECTION = 'indeedCheckerQuota'
+
 
+def _firestore():
+    """google.cloud.firestore を返す（初回の呼び出しで読み込む）。"""
+    global firestore
+    if firestore is None:
+        with startup_step('firestore_import'):
+            from google.cloud import firestore as module
+        firestore = module
+    return firestore
 
-def get_db() -> firestore.Client:
+
+def get_db() -> 'firestore.Client':
     """Firestore クライアントのシングルトンを返す。"""
     global _db
     if _db is None:
-        _db = firestore.Client()
+        with _db_lock:
+            if _db is None:
+                module = _firestore()
+                with startup_step('firestore_client'):
+                    _db = module.Client()
     return _db
 
 
-def get_all_companies() -> List[dict]:
-    """全アクティブ企業を取得する。
+def ping() -> None:
+    """Firestore への接続を開いておく（存在しないドキュメントを1件読む）。"""
+    get_db().collection(RUNS_COLLECTION).document('_warmup').get()
+
+
+class BatchWriter:
+    """WriteBatch で書き込みをまとめるライター（スレッドセーフ）。
+
+    BATCH_LIMIT 件たまるごとに自動コミットする。終了時は flush() を呼ぶこと。
+    バッチのコミットに失敗した場合は1件ずつ書き込み直し、
+    失敗したドキュメントだけを failed として数える。
+
+    commit_workers > 0 なら、たまったバッチのコミットを専用スレッドに渡し、
+    update() を呼んだスレッド（検索ワーカー）はコミットを待たない。
+    コミット待ちのバッチが max_pending 件に達したら、空くまで update() が待つ
+    （バックプレッシャー。待った時間は段階 commit_wait に記録する）。
+
+    Args:
+        limit: 1バッチの最大件数
+        commit_workers: コミット専用スレッド数（0 なら update() を呼んだスレッドでコミット）
+        max_pending: コミット待ち・コミット中のバッチ数の上限
+    """
+
+    def __init__(
+        self,
+        limit: int = BATCH_LIMIT,
+        commit_workers: int = 0,
+        max_pending: int = 2,
+    ):
+        self.limit = limit
+        self.commit_workers = commit_workers
+        self._lock = threading.Lock()
+        self._pending = []
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._commits = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._inflight = set()
+
+    def _count(self, kind: str, field: str, n: int = 1) -> None:
+        counts = self._counts.setdefault(
+            kind, {'written': 0, 'skipped': 0, 'failed': 0}
+        )
+        counts[field] += n
+
+    def update(self, ref, data: dict, kind: str) -> None:
+        """更新をキューに積む。上限に達したらコミットする。"""
+        with self._lock:
+            self._pending.append((ref, data, kind))
+            if len(self._pending) < self.limit:
+                return
+            pending, self._pending = self._pending, []
+        self._submit(pending)
+
+    def skip(self, kind: str, n: int = 1) -> None:
+        """変更がないため書き込みを省略した件数を記録する。"""
+        with self._lock:
+            self._count(kind, 'skipped', n)
+
+    def flush(self, wait: bool = True) -> list:
+        """キューに残っている更新をコミットする。
+
+        Args:
+            wait: False ならコミット専用スレッドに渡すだけで完了を待たない
+
+        Returns:
+            この時点でコミット待ち・コミット中のバッチの Future
+            （wait=True なら完了済み。コミット専用スレッドがなければ空）
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._submit(pending)
+        with self._lock:
+            inflight = list(self._inflight)
+        if wait:
+            for future in inflight:
+                future.result()
+        return inflight
+
+    def close(self) -> None:
+        """残りをコミットしてコミット専用スレッドを止める。"""
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _submit(self, pending: list) -> None:
+        if self.commit_workers <= 0:
+            self._commit(pending)
+            return
+        with stage('commit_wait'):
+            self._slots.acquire()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.commit_workers, thread_name_prefix='batch-commit'
+                )
+            future = self._executor.submit(self._commit, pending)
+            self._inflight.add(future)
+        future.add_done_callback(self._committed)
+
+    def _committed(self, future) -> None:
+        with self._lock:
+            self._inflight.discard(future)
+        self._slots.release()
+
+    def _commit(self, pending: list) -> None:
+        batch = get_db().batch()
+        for ref, data, _ in pending:
+            batch.update(ref, data)
+
+        try:
+            with stage('batch_commit'):
+                batch.commit()
+            with self._lock:
+                self._commits += 1
+                for _, _, kind in pending:
+                    self._count(kind, 'written')
+            return
+        except Exception as e:
+            logger.warning(
+                f'バッチコミット失敗（{len(pending)}件を個別に再実行）: {e}'
+            )
+
+        # 1件でも失敗するとバッチ全体が失敗するため、個別に書き直す
+        for ref, data, kind in pending:
+            try:
+                ref.update(data)
+                field = 'written'
+            except Exception as e:
+                logger.error(f'書き込みエラー ({ref.path}): {e}')
+                field = 'failed'
+            with self._lock:
+                self._count(kind, field)
+
+    def stats(self) -> dict:
+        """種類ごとの written / skipped / failed 件数とコミット回数を返す。"""
+        with self._lock:
+            stats = {kind: dict(c) for kind, c in self._counts.items()}
+            stats['commits'] = self._commits
+        return stats
+
+
+def iter_active_companies(
+    page_size: int = COMPANY_PAGE_SIZE,
+    prefetch_pages: int = 2,
+    start_after_id: Optional[str] = None,
+) -> Iterator[dict]:
+    """全アクティブ企業をページ単位で順に返すジェネレーター。
+
+    name / indeedStatus のみを取得し、ドキュメントID順に start_after で
+    ページングする。次のページはバックグラウンドで先読みするため、
+    最初のページを受け取った時点からチェックを始められる。
+
+    Args:
+        page_size: 1ページあたりの件数
+        prefetch_pages: 先読みしておく最大ページ数
+        start_after_id: 指定時はこの企業IDより後から取得する（再開用）
+
+    Yields:
+        企業データ（id 付き）
+    """
+    db = get_db()
+    base_query = (
+        db.collection('companies')
+        .where('status', '==', 'active')
+        .select(COMPANY_FIELDS)
+        .order_by('__name__')
+        .limit(page_size)
+    )
+
+    pages: queue.Queue = queue.Queue(maxsize=prefetch_pages)
+    stop = threading.Event()
+    end = object()
+
+    def _fetch_pages():
+        cursor = None
+        if start_after_id:
+            cursor = {'__name__': db.collection('companies').document(start_after_id)}
+        try:
+            while not stop.is_set():
+                query = base_query.start_after(cursor) if cursor else base_query
+                with stage('company_scan'):
+                    docs = list(query.stream())
+                if docs:
+                    pages.put(docs)
+                if len(docs) < page_size:
+                    break
+                cursor = docs[-1]
+            pages.put(end)
+        except Exception as e:
+            pages.put(e)
+
+    fetcher = threading.Thread(target=_fetch_pages, daemon=True)
+    fetcher.start()
+
+    fetched = 0
+    try:
+        while True:
+            page = pages.get()
+            if page is end:
+                break
+            if isinstance(page, Exception):
+                raise page
+            for doc in page:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                fetched += 1
+                yield data
+    finally:
+        # 途中で打ち切られた場合は先読みスレッドを止める
+        stop.set()
+        while fetcher.is_alive():
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                fetcher.join(timeout=0.1)
+
+    logger.info(f'スキャンした企業数: {fetched}')
+
+
+def get_companies(company_ids: List[str]) -> List[dict]:
+    """指定した企業を1回の get_all でまとめて取得する。
+
+    name / indeedStatus のみを取得する。存在しない企業は含めない。
+
+    Args:
+        company_ids: 企業ドキュメントID
 
     Returns:
-        企業データのリスト（id 付き）
+        企業データ（id 付き、company_ids の順）
     """
     db = get_db()
-    docs = db.collection('companies').where('status', '==', 'active').stream()
+    refs = [db.collection('companies').document(company_id) for company_id in company_ids]
+    found = {}
+    for doc in db.get_all(refs, field_paths=COMPANY_FIELDS):
+        if doc.exists:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            found[doc.id] = data
+    return [found[company_id] for company_id in company_ids if company_id in found]
+
+
+def iter_known_indeed_urls() -> Iterator[dict]:
+    """Indeed 掲載が検出済みの企業を返すジェネレーター（スラッグ索引の構築用）。
 
-    companies = []
+    name と indeedStatus の URL・確認日時のみを取得する。
+
+    Yields:
+        企業データ（id 付き）
+    """
+    docs = (
+        get_db().collection('companies')
+        .where('indeedStatus.detected', '==', True)
+        .select([
+            'name',
+            'indeedStatus.indeedUrl',
+            'indeedStatus.verifiedAt',
+            'indeedStatus.lastCheckedAt',
+        ])
+        .stream()
+    )
     for doc in docs:
         data = doc.to_dict()
         data['id'] = doc.id
-        companies.append(data)
+        yield data
 
-    logger.info(f'取得した企業数: {len(companies)}')
-    return companies
+
+def watch_active_companies(on_snapshot: Callable) -> 'firestore.Watch':
+    """アクティブな企業の追加・変更を購読する（on_snapshot）。
+
+    on_snapshot(changes) は Firestore のリスナースレッドからスナップショットごとに呼ばれる。
+    changes は (change_type, 企業データ) のリストで、change_type は
+    'ADDED' / 'MODIFIED' / 'REMOVED'（REMOVED はアクティブでなくなった・削除された企業）。
+    初回のスナップショットでは、現在のアクティブな企業がすべて ADDED として届く。
+
+    Returns:
+        購読を止めるときに unsubscribe() を呼ぶ Watch
+    """
+    def _on_snapshot(_docs, changes, _read_time):
+        batch = []
+        for change in changes:
+            data = change.document.to_dict() or {}
+            data['id'] = change.document.id
+            batch.append((change.type.name, data))
+        on_snapshot(batch)
+
+    return (
+        get_db().collection('companies')
+        .where('status', '==', 'active')
+        .on_snapshot(_on_snapshot)
+    )
+
+
+def get_run_state(run_id: str) -> Optional[dict]:
+    """一括チェックの実行状態を取得する。
+
+    Args:
+        run_id: 実行ID
+
+    Returns:
+        実行状態（存在しなければ None）
+    """
+    snapshot = get_db().collection(RUNS_COLLECTION).document(run_id).get()
+    if not snapshot.exists:
+        return None
+    return snapshot.to_dict()
+
+
+def save_run_state(run_id: str, state: dict) -> None:
+    """一括チェックの実行状態（チェックポイント）を保存する。
+
+    Args:
+        run_id: 実行ID
+        state: 保存するフィールド（既存フィールドにマージ）
+    """
+    data = dict(state, updatedAt=datetime.now(timezone.utc))
+    get_db().collection(RUNS_COLLECTION).document(run_id).set(data, merge=True)
+
+
+def get_last_run_id(lease_name: str) -> Optional[str]:
+    """リース名ごとに最後に開始した実行の runId を取得する（未完了の実行の自動再開用）。"""
+    snapshot = get_db().collection(RUNS_COLLECTION).document(f'_last-{lease_name}').get()
+    if not snapshot.exists:
+        return None
+    return (snapshot.to_dict() or {}).get('runId')
+
+
+def set_last_run_id(lease_name: str, run_id: str) -> None:
+    """リース名ごとに最後に開始した実行の runId を保存する（リースを保持して呼ぶ）。"""
+    get_db().collection(RUNS_COLLECTION).document(f'_last-{lease_name}').set({
+        'runId': run_id,
+        'updatedAt': datetime.now(timezone.utc),
+    })
+
+
+def acquire_lease(name: str, owner: str, run_id: str, ttl: float) -> Optional[dict]:
+    """実行リースを取得する（トランザクション）。
+
+    リースがない・期限切れ・自分が保持している場合に取得できる。
+
+    Args:
+        name: リース名
+        owner: 取得するプロセスの識別子
+        run_id: リースを使う実行ID
+        ttl: 有効秒数（heartbeat で延長しなければこの秒数で期限切れ）
+
+    Returns:
+        取得できなければ保持中のリース（owner / runId / expiresAt など）、
+        取得できれば None
+    """
+    db = get_db()
+    ref = db.collection(LEASES_COLLECTION).document(name)
+
+    @_firestore().transactional
+    def _acquire(transaction):
+        snapshot = ref.get(transaction=transaction)
+        now = datetime.now(timezone.utc)
+        if snapshot.exists:
+            held = snapshot.to_dict()
+            if held.get('owner') != owner and held.get('expiresAt') and held['expiresAt'] > now:
+                return held
+        transaction.set(ref, {
+            'owner': owner,
+            'runId': run_id,
+            'acquiredAt': now,
+            'heartbeatAt': now,
+            'expiresAt': now + timedelta(seconds=ttl),
+        })
+        return None
+
+    return _acquire(db.transaction())
+
+
+def renew_lease(name: str, owner: str, ttl: float) -> bool:
+    """保持中の実行リースの期限を延長する（heartbeat）。
+
+    Returns:
+        延長できたか（他のプロセスに取られていれば False）
+    """
+    db = get_db()
+    ref = db.collection(LEASES_COLLECTION).document(name)
+
+    @_firestore().transactional
+    def _renew(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists or snapshot.to_dict().get('owner') != owner:
+            return False
+        now = datetime.now(timezone.utc)
+        transaction.update(ref, {
+            'heartbeatAt': now,
+            'expiresAt': now + timedelta(seconds=ttl),
+        })
+        return True
+
+    return _renew(db.transaction())
+
+
+def get_active_leases(prefix: str = '') -> Dict[str, dict]:
+    """期限内の実行リースを返す。
+
+    Args:
+        prefix: リース名の接頭辞（空なら全リース）
+
+    Returns:
+        リース名 → 保持中のリース（owner / runId / expiresAt など）
+    """
+    now = datetime.now(timezone.utc)
+    leases = {}
+    for snapshot in get_db().collection(LEASES_COLLECTION).stream():
+        if not snapshot.id.startswith(prefix):
+            continue
+        held = snapshot.to_dict() or {}
+        if held.get('expiresAt') and held['expiresAt'] > now:
+            leases[snapshot.id] = held
+    return leases
+
+
+def release_lease(name: str, owner: str) -> None:
+    """保持中の実行リースを解放する（他のプロセスのリースは消さない）。"""
+    db = get_db()
+    ref = db.collection(LEASES_COLLECTION).document(name)
+
+    @_firestore().transactional
+    def _release(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if snapshot.exists and snapshot.to_dict().get('owner') == owner:
+            transaction.delete(ref)
+
+    _release(db.transaction())
+
+
+def get_quota_usage(month: str) -> int:
+    """月間の SerpAPI クエリ使用量を取得する。
+
+    Args:
+        month: 対象月（YYYY-MM）
+
+    Returns:
+        使用済みクエリ数（記録がなければ 0）
+    """
+    snapshot = get_db().collection(QUOTA_COLLECTION).document(month).get()
+    if not snapshot.exists:
+        return 0
+    return (snapshot.to_dict() or {}).get('used', 0)
+
+
+def add_quota_usage(month: str, queries: int) -> int:
+    """月間の SerpAPI クエリ使用量を加算する。
+
+    並行して動く他のシャードの分も含めるため、加算後の値を読み直して返す。
+
+    Args:
+        month: 対象月（YYYY-MM）
+        queries: 加算するクエリ数
+
+    Returns:
+        加算後の使用済みクエリ数
+    """
+    ref = get_db().collection(QUOTA_COLLECTION).document(month)
+    if queries:
+        ref.set({
+            'used': _firestore().Increment(queries),
+            'updatedAt': datetime.now(timezone.utc),
+        }, merge=True)
+    return get_quota_usage(month)
+
+
+def is_status_unchanged(
+    current: Optional[dict],
+    detected: bool,
+    detected_by: Optional[str],
+    indeed_url: Optional[str] = None,
+    error: Optional[str] = None,
+) -> bool:
+    """判定結果が現在の indeedStatus と同じか（current が不明なら False）。"""
+    return current is not None and (
+        current.get('detected') == detected
+        and current.get('detectedBy') == detected_by
+        and (not indeed_url or current.get('indeedUrl') == indeed_url)
+        and current.get('error') == error
+    )
+
+
+def is_status_current(
+    current: Optional[dict],
+    detected: bool,
+    detected_by: Optional[str],
+    indeed_url: Optional[str] = None,
+    has_jobs_page: Optional[bool] = None,
+) -> bool:
+    """判定結果・企業ページ・/jobs の有無がすべて現在の indeedStatus と同じか。
+
+    同じなら、スケジュール（nextCheckAt）を進める必要がない限り書き込みを省略できる。
+    """
+    return is_status_unchanged(current, detected, detected_by, indeed_url) and (
+        has_jobs_page is None or current.get('hasJobsPage') == has_jobs_page
+    )
 
 
 def update_company_indeed_status(
@@ -46,15 +575,28 @@ def update_company_indeed_status(
     detected_by: Optional[str],
     indeed_url: Optional[str] = None,
     error: Optional[str] = None,
+    current: Optional[dict] = None,
+    writer: Optional[BatchWriter] = None,
+    schedule: Optional[dict] = None,
+    has_jobs_page: Optional[bool] = None,
+    verified: bool = False,
 ) -> None:
     """企業の indeedStatus を更新する。
 
+    lastCheckedAt は毎回更新するが、判定結果が前回（current）と同じ場合は
+    企業の updatedAt は更新しない。
+
     Args:
         company_id: 企業ドキュメントID
         detected: Indeed掲載が検出されたか
         detected_by: 'agent' / 'external' / None
         indeed_url: 検出されたIndeed URL
         error: エラーがあった場合の詳細
+        current: 現在の indeedStatus（差分判定用。不明なら None）
+        writer: 指定時はバッチ書き込みに積む（None なら即時書き込み）
+        schedule: indeedStatus に一緒に保存するスケジュール項目（nextCheckAt など）
+        has_jobs_page: Indeed の /jobs ページがあるか（None なら確認していないので書き込まない）
+        verified: 検索で indeed_url を確認した場合は True（verifiedAt を更新する）
     """
     db = get_db()
     now = datetime.now(timezone.utc)
@@ -63,40 +605,79 @@ def update_company_indeed_status(
         'indeedStatus.detected': detected,
         'indeedStatus.detectedBy': detected_by,
         'indeedStatus.lastCheckedAt': now,
-        'updatedAt': now,
     }
 
+    for key, value in (schedule or {}).items():
+        update_data[f'indeedStatus.{key}'] = value
+
+    if not is_status_unchanged(current, detected, detected_by, indeed_url, error):
+        update_data['updatedAt'] = now
+
     if indeed_url:
         update_data['indeedStatus.indeedUrl'] = indeed_url
 
+    if has_jobs_page is not None:
+        update_data['indeedStatus.hasJobsPage'] = has_jobs_page
+
+    if verified and indeed_url:
+        # スラッグ索引で検索を省略してよいかの判定に使う（索引による確認では更新しない）
+        update_data['indeedStatus.verifiedAt'] = now
+
     if error:
         update_data['indeedStatus.error'] = error
     else:
         # エラーがなければクリア
-        update_data['indeedStatus.error'] = firestore.DELETE_FIELD
+        update_data['indeedStatus.error'] = _firestore().DELETE_FIELD
 
-    db.collection('companies').document(company_id).update(update_data)
+    ref = db.collection('companies').document(company_id)
+    if writer is not None:
+        writer.update(ref, update_data, kind='companies')
+    else:
+        ref.update(update_data)
     logger.info(
         f'企業 {company_id} のIndeedステータスを更新: '
         f'detected={detected}, detectedBy={detected_by}'
     )
 
 
-def get_jobs_for_company(company_id: str) -> List[dict]:
+def update_company_jobs_page(
+    company_id: str,
+    has_jobs_page: bool,
+    writer: Optional[BatchWriter] = None,
+) -> None:
+    """企業の indeedStatus.hasJobsPage だけを更新する（/jobs の後追い確認用）。
+
+    Args:
+        company_id: 企業ドキュメントID
+        has_jobs_page: Indeed の /jobs ページがあるか
+        writer: 指定時はバッチ書き込みに積む（None なら即時書き込み）
+    """
+    ref = get_db().collection('companies').document(company_id)
+    update_data = {'indeedStatus.hasJobsPage': has_jobs_page}
+    if writer is not None:
+        writer.update(ref, update_data, kind='companies')
+    else:
+        ref.update(update_data)
+
+
+def get_jobs_for_company(
+    company_id: str,
+    fields: Optional[List[str]] = None,
+) -> List[dict]:
     """企業に紐づく全求人を取得する。
 
     Args:
         company_id: 企業ドキュメントID
+        fields: 取得するフィールド（None なら全フィールド）
 
     Returns:
         求人データのリスト
     """
     db = get_db()
-    docs = (
-        db.collection('jobs')
-        .where('companyId', '==', company_id)
-        .stream()
-    )
+    query = db.collection('jobs').where('companyId', '==', company_id)
+    if fields is not None:
+        query = query.select(fields)
+    docs = query.stream()
 
     jobs = []
     for doc in docs:
@@ -107,15 +688,114 @@ def get_jobs_for_company(company_id: str) -> List[dict]:
     return jobs
 
 
-def has_agent_exported_jobs(company_id: str) -> bool:
+class JobsIndex:
+    """companyId → 求人の indeedControl のインメモリ索引。
+
+    実行開始時に jobs コレクションを1回だけ読み込み、
+    企業ごとの has_agent_exported_jobs / get_jobs_for_company クエリを置き換える。
+    """
+
+    def __init__(self):
+        # companyId → {jobId: indeedControl}
+        self._by_company: Dict[str, Dict[str, dict]] = {}
+        # companyId → 募集中（status == 'active'）の求人数
+        self._active: Dict[str, int] = {}
+        self.job_count = 0
+
+    def add(
+        self,
+        company_id: str,
+        job_id: str,
+        indeed_control: dict,
+        active: bool = False,
+    ) -> None:
+        self._by_company.setdefault(company_id, {})[job_id] = indeed_control
+        if active:
+            self._active[company_id] = self._active.get(company_id, 0) + 1
+        self.job_count += 1
+
+    def active_jobs(self, company_id: str) -> int:
+        """企業の募集中の求人数（判定結果で canPost が左右される求人数）。"""
+        return self._active.get(company_id, 0)
+
+    def jobs_for(self, company_id: str) -> List[dict]:
+        """企業の求人を get_jobs_for_company と同じ形式で返す。"""
+        jobs = self._by_company.get(company_id, {})
+        return [
+            {'id': job_id, 'indeedControl': control}
+            for job_id, control in jobs.items()
+        ]
+
+    def has_exported(self, company_id: str) -> bool:
+        """Agent経由でエクスポート済みの求人があるか。"""
+        jobs = self._by_company.get(company_id, {})
+        return any(control.get('exported') is True for control in jobs.values())
+
+    def set_can_post(self, company_id: str, job_id: str, can_post: bool) -> None:
+        """書き込み後の状態を索引にも反映する。"""
+        control = self._by_company.get(company_id, {}).get(job_id)
+        if control is not None:
+            control['canPost'] = can_post
+            control.setdefault('exported', False)
+
+
+def _iter_jobs(company_ids: Optional[List[str]] = None) -> Iterator:
+    query = get_db().collection('jobs').select(
+        ['companyId', 'indeedControl', 'status']
+    )
+    if company_ids is None:
+        yield from query.stream()
+        return
+    for i in range(0, len(company_ids), IN_QUERY_LIMIT):
+        chunk = company_ids[i:i + IN_QUERY_LIMIT]
+        yield from query.where('companyId', 'in', chunk).stream()
+
+
+def build_jobs_index(company_ids: Optional[List[str]] = None) -> JobsIndex:
+    """jobs コレクションを1回ストリームして JobsIndex を構築する。
+
+    companyId / indeedControl / status のみを取得する（フィールドプロジェクション）。
+
+    Args:
+        company_ids: 指定時はこの企業の求人だけを in クエリで読み込む
+            （None なら全求人）
+
+    Returns:
+        JobsIndex
+    """
+    index = JobsIndex()
+    for doc in _iter_jobs(company_ids):
+        data = doc.to_dict()
+        company_id = data.get('companyId')
+        if not company_id:
+            continue
+        index.add(
+            company_id,
+            doc.id,
+            data.get('indeedControl') or {},
+            active=data.get('status') == 'active',
+        )
+
+    logger.info(f'求人索引を構築: 求人{index.job_count}件')
+    return index
+
+
+def has_agent_exported_jobs(
+    company_id: str,
+    jobs_index: Optional[JobsIndex] = None,
+) -> bool:
     """企業にAgent経由でエクスポートされた求人があるか確認する。
 
     Args:
         company_id: 企業ドキュメントID
+        jobs_index: 指定時はクエリせず索引から判定する
 
     Returns:
         1件以上あれば True
     """
+    if jobs_index is not None:
+        return jobs_index.has_exported(company_id)
+
     db = get_db()
     docs = (
         db.collection('jobs')
@@ -128,27 +808,44 @@ def has_agent_exported_jobs(company_id: str) -> bool:
     return any(True for _ in docs)
 
 
-def update_jobs_indeed_control(company_id: str, can_post: bool) -> int:
+def update_jobs_indeed_control(
+    company_id: str,
+    can_post: bool,
+    writer: Optional[BatchWriter] = None,
+    jobs_index: Optional[JobsIndex] = None,
+) -> int:
     """企業に紐づく全求人の indeedControl.canPost を更新する。
 
+    canPost が既に目的の値で exported も設定済みの求人は書き込まない。
+
     Args:
         company_id: 企業ドキュメントID
         can_post: Indeed出稿可能か
+        writer: 指定時はバッチ書き込みに積む（None なら即時書き込み）
+        jobs_index: 指定時は求人を再クエリせず索引から取得する
 
     Returns:
-        更新した求人数
+        更新した求人数（変更なしでスキップした求人は含まない）
     """
     db = get_db()
     now = datetime.now(timezone.utc)
 
-    jobs = get_jobs_for_company(company_id)
+    if jobs_index is not None:
+        jobs = jobs_index.jobs_for(company_id)
+    else:
+        jobs = get_jobs_for_company(company_id, fields=['indeedControl'])
     updated = 0
+    skipped = 0
 
     for job in jobs:
         job_ref = db.collection('jobs').document(job['id'])
 
         # indeedControl が存在しない場合は新規作成
-        current = job.get('indeedControl', {})
+        current = job.get('indeedControl') or {}
+
+        if current.get('canPost') == can_post and 'exported' in current:
+            skipped += 1
+            continue
 
         update_data = {
             'indeedControl.canPost': can_post,
@@ -159,10 +856,19 @@ def update_jobs_indeed_control(company_id: str, can_post: bool) -> int:
         if 'exported' not in current:
             update_data['indeedControl.exported'] = False
 
-        job_ref.update(update_data)
+        if writer is not None:
+            writer.update(job_ref, update_data, kind='jobs')
+        else:
+            job_ref.update(update_data)
+        if jobs_index is not None:
+            jobs_index.set_can_post(company_id, job['id'], can_post)
         updated += 1
 
+    if writer is not None and skipped:
+        writer.skip('jobs', skipped)
+
     logger.info(
         f'企業 {company_id} の求人 {updated}件 の canPost を {can_post} に更新'
+        f'（変更なし {skipped}件）'
     )
     return updated
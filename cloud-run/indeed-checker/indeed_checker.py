@@ -2,33 +2,77 @@
 
 SerpAPI (Google検索) を使って企業の Indeed 掲載有無を判定する。
 1. SerpAPI で「site:jp.indeed.com/cmp/ "企業名"」を検索
-2. 見つかった Indeed 企業ページの /jobs サブページを確認
+2. 見つかった Indeed 企業ページの /jobs サブページを確認（JOBS_CHECK_MODES 参照）
 """
 
 import logging
 import os
-import random
 import re
-import time
-from typing import Optional
-
-import requests
-
-from normalization import normalize_company_name
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from lookup_cache import get_lookup_cache
+from metrics import stage, startup_step
+from normalization import match_key, normalize_company_name
+from rate_controller import SERPAPI_ADAPTIVE, SERPAPI_INFLIGHT, AimdController
+from rate_limiter import ConcurrencyLimiter, TokenBucket
+from serp_archive import get_serp_archive
+
+if TYPE_CHECKING:
+    # requests を読み込むため、実行時は get_serpapi_client() の初回呼び出しで読み込む
+    from serpapi_client import SerpApiClient
 
 logger = logging.getLogger(__name__)
 
 # SerpAPI 設定
 SERPAPI_KEY = os.environ.get('SERPAPI_KEY', '')
-SERPAPI_URL = 'https://serpapi.com/search.json'
+SERPAPI_URL = os.environ.get('SERPAPI_URL', 'https://serpapi.com/search.json')
 
 # リクエスト間隔（秒）
 MIN_SLEEP = 2
 MAX_SLEEP = 4
 
+# SerpAPI への全体リクエストレート（リクエスト/秒）
+# デフォルトは従来の平均間隔（MIN_SLEEP〜MAX_SLEEP の中央値）相当。
+# 適応制御（SERPAPI_ADAPTIVE）が有効なら開始時のレートで、以降は応答を見て
+# SERPAPI_MIN_QPS〜SERPAPI_MAX_QPS の範囲で調整される
+SERPAPI_QPS = float(
+    os.environ.get('SERPAPI_QPS', 2 / (MIN_SLEEP + MAX_SLEEP))
+)
+SERPAPI_BURST = float(os.environ.get('SERPAPI_BURST', 1))
+
 # HTTP タイムアウト（秒）
 REQUEST_TIMEOUT = 20
 
+# リトライ設定（タイムアウト・5xx・429 時の指数バックオフ）
+SERPAPI_MAX_RETRIES = int(os.environ.get('SERPAPI_MAX_RETRIES', 3))
+SERPAPI_BACKOFF_BASE = float(os.environ.get('SERPAPI_BACKOFF_BASE', 1.0))
+SERPAPI_BACKOFF_MAX = float(os.environ.get('SERPAPI_BACKOFF_MAX', 30.0))
+# 1回の検索（リトライの待ちを含む）の期限（秒）。Retry-After はこの範囲でそのまま守る
+SERPAPI_RETRY_DEADLINE = float(os.environ.get('SERPAPI_RETRY_DEADLINE', 120.0))
+
+# /jobs サブページの確認方法（デフォルトは従来どおり full。他は明示したときだけ使う）
+#   full:     /jobs を追加の SerpAPI クエリで確認する（掲載ありの企業は2クエリ）
+#   single:   /cmp/ 検索の結果に含まれる /jobs リンクから判定する（追加クエリなし）
+#   deferred: 一括チェックでは確認せず、予算が残っていれば最後にまとめて確認する
+#   off:      確認しない
+# /jobs の有無は detected / canPost の判定には影響しない
+JOBS_CHECK_MODES = ('full', 'single', 'deferred', 'off')
+JOBS_CHECK_MODE = os.environ.get('JOBS_CHECK_MODE', 'full')
+
+# 1社分の /cmp/ 検索の取得件数
+CMP_RESULTS = 5
+
+# OR でまとめて検索する場合の、企業名1つあたりの取得件数と1クエリの上限
+RESULTS_PER_NAME = 5
+MAX_RESULTS_PER_QUERY = 100
+
+# 1クエリにまとめる企業名の最大数（Google のクエリ長の制限に収まる範囲）
+MAX_SEARCH_BATCH = 10
+SEARCH_BATCH_SIZE = int(os.environ.get('SEARCH_BATCH_SIZE', 1))
+
 # User-Agent
 USER_AGENT = (
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
@@ -43,13 +87,22 @@ class IndeedCheckResult:
         self,
         detected: bool = False,
         indeed_url: Optional[str] = None,
-        has_jobs_page: bool = False,
+        has_jobs_page: Optional[bool] = False,
         error: Optional[str] = None,
+        cached: bool = False,
+        queries: int = 0,
+        indexed: bool = False,
     ):
         self.detected = detected
         self.indeed_url = indeed_url
+        # /jobs を確認していない場合は None
         self.has_jobs_page = has_jobs_page
         self.error = error
+        self.cached = cached
+        # このチェックで発行した SerpAPI 検索クエリ数
+        self.queries = queries
+        # スラッグ索引で企業ページを特定した（/cmp/ 検索をしていない）
+        self.indexed = indexed
 
     def to_dict(self) -> dict:
         return {
@@ -57,90 +110,193 @@ class IndeedCheckResult:
             'indeedUrl': self.indeed_url,
             'hasJobsPage': self.has_jobs_page,
             'error': self.error,
+            'cached': self.cached,
+            'queries': self.queries,
+            'indexed': self.indexed,
         }
 
 
-def _sleep_between_requests():
-    """リクエスト間にランダムスリープを入れる。"""
-    duration = random.uniform(MIN_SLEEP, MAX_SLEEP)
-    logger.debug(f'{duration:.1f}秒スリープ')
-    time.sleep(duration)
+# プロセス全体で共有するレートリミッター（ワーカー間で共有）
+_rate_limiter = TokenBucket(rate=SERPAPI_QPS, capacity=SERPAPI_BURST)
 
+# 適応制御: 同時リクエスト数の上限と、レート・上限を調整するコントローラー
+_concurrency = ConcurrencyLimiter(SERPAPI_INFLIGHT) if SERPAPI_ADAPTIVE else None
+_controller = AimdController(_rate_limiter, _concurrency) if SERPAPI_ADAPTIVE else None
 
-def search_indeed_company(company_name: str) -> Optional[str]:
-    """SerpAPI (Google検索) で Indeed 企業ページを検索する。
+_client = None
+_client_lock = threading.Lock()
 
-    「site:jp.indeed.com/cmp/ "企業名"」で検索し、
-    Indeed 企業ページの URL を返す。
 
-    Args:
-        company_name: 正規化済み企業名
+@contextmanager
+def serpapi_rate(qps: Optional[float]) -> Iterator[None]:
+    """with の間だけ SerpAPI リクエストレートを qps にし、終わったら元に戻す。
 
-    Returns:
-        Indeed 企業ページURL（見つかった場合）、またはNone
+    レートはプロセス全体で共有しているため、/run?qps の指定をその実行の間に限る。
+    適応制御が有効な場合は qps がレートの上限になり（そこから下げることはある）、
+    終了時は元の上限に戻してそこから通常どおり増減させる。qps が None なら何もしない。
     """
-    if not SERPAPI_KEY:
-        raise ValueError('SERPAPI_KEY 環境変数が必要です')
+    if not qps:
+        yield
+        return
+    if _controller is not None:
+        previous = _controller.set_max_rate(qps)
+        try:
+            yield
+        finally:
+            _controller.set_max_rate(previous, apply=False)
+        return
+    previous = _rate_limiter.rate
+    _rate_limiter.set_rate(qps)
+    try:
+        yield
+    finally:
+        _rate_limiter.set_rate(previous)
 
-    # Indeed 企業ページに絞った検索クエリ
-    query = f'site:jp.indeed.com/cmp/ "{company_name}"'
 
-    params = {
-        'api_key': SERPAPI_KEY,
+def get_serpapi_client() -> 'SerpApiClient':
+    """SerpAPI クライアントのシングルトンを返す。
+
+    requests（HTTP スタック）は起動を速くするため、初回の呼び出しで読み込む。
+    """
+    global _client
+    if _client is None:
+        with _client_lock, startup_step('serpapi_client'):
+            if _client is None:
+                from serpapi_client import SerpApiClient
+
+                _client = SerpApiClient(
+                    api_key=SERPAPI_KEY,
+                    base_url=SERPAPI_URL,
+                    timeout=REQUEST_TIMEOUT,
+                    max_retries=SERPAPI_MAX_RETRIES,
+                    backoff_base=SERPAPI_BACKOFF_BASE,
+                    backoff_max=SERPAPI_BACKOFF_MAX,
+                    retry_deadline=SERPAPI_RETRY_DEADLINE,
+                    rate_limiter=_rate_limiter,
+                    archive=get_serp_archive(),
+                    concurrency=_concurrency,
+                    controller=_controller,
+                )
+    return _client
+
+
+def _cmp_url(link: str) -> Optional[str]:
+    """リンクから /cmp/企業名 部分のみ抽出する（クエリパラメータ除去）。"""
+    cmp_match = re.match(r'(https?://jp\.indeed\.com/cmp/[^/?#]+)', link)
+    return cmp_match.group(1) if cmp_match else None
+
+
+def _cmp_url_from_results(company_name: str, results: List[dict]) -> Optional[str]:
+    """検索結果から Indeed 企業ページの URL を取り出す。"""
+    # /cmp/ を含むURLを探す
+    for result in results:
+        found_url = _cmp_url(result.get('link', ''))
+        if found_url:
+            logger.info(
+                f'"{company_name}" の Indeed ページ発見: {found_url}'
+            )
+            return found_url
+
+    logger.info(
+        f'"{company_name}" の検索結果に /cmp/ ページなし'
+    )
+    return None
+
+
+def jobs_link_in_results(cmp_url: str, results: List[dict]) -> bool:
+    """検索結果（サイトリンクを含む）に企業ページの /jobs リンクがあるか。"""
+    jobs_url = cmp_url.rstrip('/') + '/jobs'
+    for result in results:
+        links = [result.get('link', '')]
+        sitelinks = result.get('sitelinks') or {}
+        for key in ('inline', 'expanded'):
+            links.extend(item.get('link', '') for item in sitelinks.get(key) or [])
+        if any(link.startswith(jobs_url) for link in links):
+            return True
+    return False
+
+
+def _search_params(query: str, num: int) -> dict:
+    """SerpAPI の検索パラメータ（api_key 以外。アーカイブのキーにもなる）。"""
+    return {
         'engine': 'google',
         'q': query,
-        'num': 5,
+        'num': num,
         'gl': 'jp',
         'hl': 'ja',
     }
 
+
+def _cmp_query(company_name: str) -> str:
+    """1社分の /cmp/ 検索のクエリ。"""
+    # Indeed 企業ページに絞った検索クエリ
+    return f'site:jp.indeed.com/cmp/ "{company_name}"'
+
+
+def _search_organic(query: str, num: int, label: str) -> List[dict]:
+    """SerpAPI で Google 検索し、organic_results を返す。
+
+    検索結果が0件の場合、SerpAPI は organic_results のない error ペイロードを返す。
+    これはエラーではなく0件の検索結果として扱う（掲載なしとしてキャッシュ・スケジュールする）。
+    """
+    import requests
+
+    from serpapi_client import is_no_results
+
+    if not SERPAPI_KEY:
+        raise ValueError('SERPAPI_KEY 環境変数が必要です')
+
     try:
-        resp = requests.get(
-            SERPAPI_URL,
-            params=params,
-            timeout=REQUEST_TIMEOUT,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        with stage('cmp_search'):
+            data = get_serpapi_client().search(_search_params(query, num))
 
         # エラーチェック
+        if is_no_results(data):
+            return []
         if 'error' in data:
             logger.error(f'SerpAPI エラー: {data["error"]}')
             raise RuntimeError(f'SerpAPI エラー: {data["error"]}')
 
-        results = data.get('organic_results', [])
-        if not results:
-            logger.info(f'"{company_name}" の Indeed ページは見つかりません')
-            return None
-
-        # /cmp/ を含むURLを探す
-        for result in results:
-            link = result.get('link', '')
-            if '/cmp/' in link:
-                # /cmp/企業名 部分のみ抽出（クエリパラメータ除去）
-                cmp_match = re.match(
-                    r'(https?://jp\.indeed\.com/cmp/[^/?#]+)', link
-                )
-                if cmp_match:
-                    found_url = cmp_match.group(1)
-                    logger.info(
-                        f'"{company_name}" の Indeed ページ発見: {found_url}'
-                    )
-                    return found_url
-
-        logger.info(
-            f'"{company_name}" の検索結果に /cmp/ ページなし'
-        )
-        return None
+        return data.get('organic_results', [])
 
     except requests.exceptions.Timeout:
-        logger.warning(f'SerpAPI タイムアウト: {company_name}')
+        logger.warning(f'SerpAPI タイムアウト: {label}')
         raise
     except requests.exceptions.RequestException as e:
         logger.error(f'SerpAPI リクエストエラー: {e}')
         raise
 
 
+def search_cmp_results(company_name: str) -> List[dict]:
+    """SerpAPI (Google検索) で Indeed 企業ページを検索し、検索結果を返す。
+
+    「site:jp.indeed.com/cmp/ "企業名"」で検索する。
+
+    Args:
+        company_name: 正規化済み企業名
+
+    Returns:
+        organic_results のリスト
+    """
+    return _search_organic(_cmp_query(company_name), CMP_RESULTS, company_name)
+
+
+def search_indeed_company(company_name: str) -> Optional[str]:
+    """SerpAPI (Google検索) で Indeed 企業ページを検索する。
+
+    Args:
+        company_name: 正規化済み企業名
+
+    Returns:
+        Indeed 企業ページURL（見つかった場合）、またはNone
+    """
+    results = search_cmp_results(company_name)
+    if not results:
+        logger.info(f'"{company_name}" の Indeed ページは見つかりません')
+        return None
+    return _cmp_url_from_results(company_name, results)
+
+
 def check_jobs_page(cmp_url: str) -> bool:
     """Indeed 企業ページの /jobs サブページが存在するか確認する。
 
@@ -160,7 +316,6 @@ def check_jobs_page(cmp_url: str) -> bool:
     query = f'site:{jobs_url}'
 
     params = {
-        'api_key': SERPAPI_KEY,
         'engine': 'google',
         'q': query,
         'num': 1,
@@ -169,13 +324,8 @@ def check_jobs_page(cmp_url: str) -> bool:
     }
 
     try:
-        resp = requests.get(
-            SERPAPI_URL,
-            params=params,
-            timeout=REQUEST_TIMEOUT,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        with stage('jobs_check'):
+            data = get_serpapi_client().search(params)
 
         results = data.get('organic_results', [])
         if results:
@@ -195,21 +345,133 @@ def check_jobs_page(cmp_url: str) -> bool:
         return False
 
 
-def check_company_indeed(company: dict) -> IndeedCheckResult:
+def _finish_check(
+    normalized: str,
+    company_id: str,
+    indeed_url: Optional[str],
+    results: List[dict],
+    jobs_check: str,
+) -> IndeedCheckResult:
+    """/cmp/ 検索の結果から判定結果を作り、キャッシュに保存する。
+
+    queries には /jobs の確認で使ったクエリ数だけを入れる
+    （/cmp/ 検索の分は呼び出し側で加算する）。
+    """
+    cache = get_lookup_cache()
+
+    if not indeed_url:
+        if cache is not None:
+            cache.put(normalized, None, False)
+        return IndeedCheckResult(detected=False)
+
+    # /jobs ページの確認
+    queries = 0
+    has_jobs = None
+    if jobs_check == 'full':
+        queries += 1
+        try:
+            has_jobs = check_jobs_page(indeed_url)
+        except Exception as e:
+            logger.warning(
+                f'/jobs チェック失敗 ({company_id}): {e}'
+            )
+            has_jobs = False
+    elif jobs_check == 'single':
+        has_jobs = jobs_link_in_results(indeed_url, results)
+
+    if cache is not None:
+        cache.put(normalized, indeed_url, has_jobs)
+
+    return IndeedCheckResult(
+        detected=True,
+        indeed_url=indeed_url,
+        has_jobs_page=has_jobs,
+        queries=queries,
+    )
+
+
+def _cached_result(normalized: str) -> Optional[IndeedCheckResult]:
+    """キャッシュにあれば判定結果を返す。"""
+    cache = get_lookup_cache()
+    if cache is None:
+        return None
+    cached = cache.get(normalized)
+    if cached is None:
+        return None
+    logger.info(f'キャッシュヒット: "{normalized}"')
+    indeed_url = cached.get('indeedUrl')
+    return IndeedCheckResult(
+        detected=bool(indeed_url),
+        indeed_url=indeed_url,
+        has_jobs_page=cached.get('hasJobsPage', False),
+        cached=True,
+    )
+
+
+def _indexed_result(
+    normalized: str,
+    company_id: str,
+    slug_index,
+    jobs_check: str,
+) -> Optional[IndeedCheckResult]:
+    """スラッグ索引で企業ページを特定できれば判定結果を返す。
+
+    /cmp/ 検索の結果がないため、jobs_check が single の場合も /jobs は確認しない。
+    """
+    if slug_index is None:
+        return None
+    indeed_url = slug_index.resolve(normalized)
+    if not indeed_url:
+        return None
+    logger.info(f'スラッグ索引で特定: "{normalized}" → {indeed_url}')
+
+    queries = 0
+    has_jobs = None
+    if jobs_check == 'full':
+        queries += 1
+        try:
+            has_jobs = check_jobs_page(indeed_url)
+        except Exception as e:
+            logger.warning(f'/jobs チェック失敗 ({company_id}): {e}')
+            has_jobs = False
+
+    return IndeedCheckResult(
+        detected=True,
+        indeed_url=indeed_url,
+        has_jobs_page=has_jobs,
+        queries=queries,
+        indexed=True,
+    )
+
+
+def check_company_indeed(
+    company: dict,
+    use_cache: bool = True,
+    jobs_check: str = JOBS_CHECK_MODE,
+    slug_index=None,
+) -> IndeedCheckResult:
     """1社分の Indeed 掲載チェックを実行する。
 
     処理フロー:
     1. 企業名を正規化
-    2. SerpAPI で Indeed 企業ページを検索
-    3. 見つかったら /jobs ページ確認
-    4. 結果を返す
+    2. キャッシュにあればそれを返す
+    3. スラッグ索引で企業ページを特定できればそれを返す
+    4. SerpAPI で Indeed 企業ページを検索
+    5. 見つかったら /jobs ページ確認（jobs_check に従う）
+    6. 結果をキャッシュして返す
 
     Args:
         company: Firestore の企業ドキュメント
+        use_cache: False の場合はキャッシュを参照せず再検索する（結果は保存する）
+        jobs_check: /jobs の確認方法（JOBS_CHECK_MODES のいずれか。
+            deferred はここでは確認しない）
+        slug_index: 検索前に参照する SlugIndex（None なら参照しない）
 
     Returns:
         IndeedCheckResult
     """
+    import requests
+
     company_name = company.get('name', '')
     company_id = company.get('id', 'unknown')
 
@@ -222,30 +484,28 @@ def check_company_indeed(company: dict) -> IndeedCheckResult:
         f'企業 "{company_name}" → 正規化 "{normalized}" (ID: {company_id})'
     )
 
-    try:
-        # 1. SerpAPI で Indeed 企業ページを検索
-        indeed_url = search_indeed_company(normalized)
-        _sleep_between_requests()
+    if use_cache:
+        cached = _cached_result(normalized)
+        if cached is not None:
+            return cached
 
-        if not indeed_url:
-            return IndeedCheckResult(detected=False)
+    indexed = _indexed_result(normalized, company_id, slug_index, jobs_check)
+    if indexed is not None:
+        return indexed
 
-        # 2. /jobs ページの確認（SerpAPIの追加クエリ消費を避けるため、
-        #    バッチ実行時はスキップ可能）
-        has_jobs = False
-        try:
-            has_jobs = check_jobs_page(indeed_url)
-            _sleep_between_requests()
-        except Exception as e:
-            logger.warning(
-                f'/jobs チェック失敗 ({company_id}): {e}'
-            )
+    try:
+        # 1. SerpAPI で Indeed 企業ページを検索
+        results = search_cmp_results(normalized)
+        indeed_url = None
+        if results:
+            indeed_url = _cmp_url_from_results(normalized, results)
+        else:
+            logger.info(f'"{normalized}" の Indeed ページは見つかりません')
 
-        return IndeedCheckResult(
-            detected=True,
-            indeed_url=indeed_url,
-            has_jobs_page=has_jobs,
-        )
+        # 2. /jobs ページの確認・キャッシュ保存
+        result = _finish_check(normalized, company_id, indeed_url, results, jobs_check)
+        result.queries += 1
+        return result
 
     except requests.exceptions.Timeout:
         return IndeedCheckResult(
@@ -256,3 +516,204 @@ def check_company_indeed(company: dict) -> IndeedCheckResult:
         return IndeedCheckResult(
             error=f'チェックエラー: {str(e)}'
         )
+
+
+def cmp_slug(cmp_url: str) -> str:
+    """企業ページ URL の /cmp/ 以降（URL デコード済み）。"""
+    return unquote(cmp_url.rsplit('/cmp/', 1)[-1])
+
+
+# スラッグ末尾の法人格（Aoi-Kk・Blue-Sky-Inc など）
+_SLUG_CORPORATE_TOKENS = {'kk', 'co', 'ltd', 'inc', 'corp', 'corporation', 'llc', 'gk', 'yk'}
+
+# 検索結果のタイトルの区切り（「企業名の求人・企業情報 | Indeed」など）と、企業名の後に付く定型句
+_TITLE_SEPARATOR = re.compile(r'\s+[|｜\-–—]\s+')
+_TITLE_SUFFIX = re.compile(
+    r'\s*の?\s*(?:求人・企業情報|企業情報|会社情報|求人情報|求人|口コミ・評判|口コミ|評判)\s*$'
+)
+
+
+def _slug_key(cmp_url: str) -> str:
+    """スラッグの照合キー（末尾の法人格のトークンは除く）。"""
+    tokens = [token for token in re.split(r'[-_\s]+', cmp_slug(cmp_url)) if token]
+    while len(tokens) > 1 and tokens[-1].casefold() in _SLUG_CORPORATE_TOKENS:
+        tokens.pop()
+    return match_key(' '.join(tokens))
+
+
+def _title_key(title: str) -> str:
+    """検索結果のタイトルから取り出した企業名の照合キー。"""
+    name = _TITLE_SEPARATOR.split(title, 1)[0]
+    return match_key(normalize_company_name(_TITLE_SUFFIX.sub('', name)))
+
+
+def attribute_cmp_results(
+    names: List[str],
+    results: List[dict],
+) -> Dict[str, Optional[str]]:
+    """OR 検索の結果を企業名ごとに振り分ける。
+
+    各 /cmp/ ページのスラッグ（末尾の法人格を除く）、またはタイトルから取り出した企業名が
+    正規化企業名と丸ごと一致するかで照合する（部分一致は使わない。「ABC」を
+    「ABCマート」のページに振り分けないため）。
+    1つの企業ページだけに一致し、そのページが他の企業名に一致しない場合だけ確定とする。
+
+    Args:
+        names: 検索した正規化企業名
+        results: OR 検索の organic_results
+
+    Returns:
+        企業名 → 企業ページURL（確定できなければ None）
+    """
+    keys = {name: match_key(name) for name in names}
+    # 企業ページ URL → 一致した企業名
+    matches: Dict[str, set] = {}
+    for result in results:
+        cmp_url = _cmp_url(result.get('link', ''))
+        if not cmp_url:
+            continue
+        page_keys = {_slug_key(cmp_url), _title_key(result.get('title', ''))}
+        matched = matches.setdefault(cmp_url, set())
+        for name, key in keys.items():
+            if key and key in page_keys:
+                matched.add(name)
+
+    resolved: Dict[str, Optional[str]] = {name: None for name in names}
+    ambiguous = set()
+    for cmp_url, matched in matches.items():
+        if len(matched) != 1:
+            ambiguous.update(matched)
+            continue
+        name = next(iter(matched))
+        if resolved[name] is not None and resolved[name] != cmp_url:
+            ambiguous.add(name)
+        resolved[name] = cmp_url
+    for name in ambiguous:
+        resolved[name] = None
+    return resolved
+
+
+def _archive_attributed(normalized: str, indeed_url: str, results: List[dict]) -> None:
+    """OR 検索で確定した企業の結果を、1社分の検索のクエリでもアーカイブに保存する。
+
+    再判定（replay.py）は1社ずつ検索し直すので、OR 検索のクエリで保存しただけでは
+    一括検索で確定した企業がアーカイブにないクエリ（missing）になる。
+    """
+    archive = get_serp_archive()
+    if archive is None or archive.replay:
+        return
+    archive.record(
+        _search_params(_cmp_query(normalized), CMP_RESULTS),
+        {'organic_results': [
+            result for result in results if _cmp_url(result.get('link', '')) == indeed_url
+        ]},
+    )
+
+
+def search_cmp_results_batch(names: List[str]) -> List[dict]:
+    """複数の企業名を OR でまとめて1クエリで検索する。
+
+    「site:jp.indeed.com/cmp/ ("A" OR "B" OR ...)」で検索し、
+    件数は企業名の数に合わせて増やす。
+
+    Args:
+        names: 正規化済み企業名
+
+    Returns:
+        organic_results のリスト
+    """
+    terms = ' OR '.join(f'"{name}"' for name in names)
+    query = f'site:jp.indeed.com/cmp/ ({terms})'
+    num = min(MAX_RESULTS_PER_QUERY, RESULTS_PER_NAME * len(names))
+    return _search_organic(query, num, f'{len(names)}社の一括検索')
+
+
+def check_companies_batched(
+    companies: List[dict],
+    use_cache: bool = True,
+    jobs_check: str = JOBS_CHECK_MODE,
+    slug_index=None,
+) -> Tuple[List[IndeedCheckResult], dict]:
+    """複数社をまとめて Indeed 掲載チェックする。
+
+    キャッシュにもスラッグ索引にもない企業名を OR 検索1回にまとめ、結果を企業名ごとに振り分ける。
+    振り分けられなかった企業（曖昧・不一致）は1社ずつ検索し直す。
+    Google は似た結果を省略するので、OR 検索に出てこなかったことは掲載なしの根拠にしない
+    （掲載なしと誤判定すると、その企業の求人が canPost=True になる）。
+
+    OR 検索のクエリ数は先頭の検索企業の結果に計上する。
+    アーカイブには、確定した企業ごとに振り分けた結果を1社分の検索のクエリでも保存する。
+
+    Args:
+        companies: 企業データ（正規化名がそれぞれ異なること）
+        use_cache: False の場合はキャッシュを参照せず再検索する（結果は保存する）
+        jobs_check: /jobs の確認方法
+        slug_index: 検索前に参照する SlugIndex（None なら参照しない）
+
+    Returns:
+        (companies と同じ順の IndeedCheckResult のリスト, 振り分けの集計)
+    """
+    results: List[Optional[IndeedCheckResult]] = [None] * len(companies)
+    stats = {'batched': 0, 'resolved': 0, 'fallback': 0}
+
+    # 1. 企業名の正規化とキャッシュ・スラッグ索引の参照
+    pending: List[Tuple[int, str]] = []
+    for i, company in enumerate(companies):
+        normalized = normalize_company_name(company.get('name', ''))
+        if not normalized or '"' in normalized:
+            results[i] = check_company_indeed(company, use_cache, jobs_check, slug_index)
+            continue
+        if use_cache:
+            results[i] = _cached_result(normalized)
+        if results[i] is None:
+            results[i] = _indexed_result(
+                normalized, company.get('id', 'unknown'), slug_index, jobs_check
+            )
+        if results[i] is None:
+            pending.append((i, normalized))
+
+    if len(pending) == 1:
+        i, _ = pending[0]
+        results[i] = check_company_indeed(companies[i], False, jobs_check)
+        pending = []
+
+    if not pending:
+        return results, stats
+
+    # 2. OR 検索でまとめて検索
+    names = [normalized for _, normalized in pending]
+    stats['batched'] = len(names)
+    try:
+        organic = search_cmp_results_batch(names)
+    except Exception as e:
+        logger.error(f'一括検索失敗 ({len(names)}社): {e}')
+        for i, _ in pending:
+            results[i] = IndeedCheckResult(error=f'チェックエラー: {str(e)}')
+        return results, stats
+
+    resolved = attribute_cmp_results(names, organic)
+
+    # 3. 振り分け結果から判定。確定できなければ1社ずつ検索し直す
+    for i, normalized in pending:
+        company = companies[i]
+        company_id = company.get('id', 'unknown')
+        indeed_url = resolved[normalized]
+        if indeed_url:
+            stats['resolved'] += 1
+            _archive_attributed(normalized, indeed_url, organic)
+            try:
+                results[i] = _finish_check(
+                    normalized, company_id, indeed_url, organic, jobs_check
+                )
+            except Exception as e:
+                logger.error(f'チェック失敗 ({company_id}): {e}')
+                results[i] = IndeedCheckResult(error=f'チェックエラー: {str(e)}')
+        else:
+            stats['fallback'] += 1
+            results[i] = check_company_indeed(company, False, jobs_check)
+
+    results[pending[0][0]].queries += 1
+    logger.info(
+        f'一括検索: {len(names)}社 → 確定{stats["resolved"]} / 個別検索{stats["fallback"]}'
+    )
+    return results, stats
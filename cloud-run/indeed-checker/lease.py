@@ -0,0 +1,153 @@
+"""実行リースモジュール
+
+全企業の一括チェック（/run）が複数インスタンス・複数の呼び出し元から
+同時に走らないよう、Firestore の indeedCheckerLeases/{リース名} にリースを取る。
+
+- 実行開始時に取得し、実行中は heartbeat で期限を延長する
+- 終了時に解放する。クラッシュしたインスタンスのリースは期限切れ後に取得できる
+- シャード実行ではシャードごとに別のリースを取る
+- シャードなしの /run とシャード実行は同じ企業を処理するため、取得後に互いのリースを確認し、
+  保持されていれば解放して競合とする（/run-sharded が run のリースを持って起動したシャードは除く）
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Dict, Optional
+
+from firestore_service import acquire_lease, get_active_leases, release_lease, renew_lease
+
+logger = logging.getLogger(__name__)
+
+# リースの有効秒数（heartbeat が途絶えてからこの秒数で他の実行が取得できる）
+RUN_LEASE_TTL_SECONDS = float(os.environ.get('RUN_LEASE_TTL_SECONDS', 300))
+
+# 有効秒数の何分の1ごとに heartbeat するか
+HEARTBEAT_DIVISOR = 3
+
+# /run-sharded（シャードを起動するコーディネーター）の実行IDの接尾辞
+COORDINATOR_RUN_SUFFIX = '-sharded'
+
+# このプロセスの識別子（リースの owner の接頭辞）
+_PROCESS_ID = f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_lease_name(shard: int = 0, shards: int = 1) -> str:
+    """/run のリース名（シャード実行ではシャードごと）。"""
+    if shards > 1:
+        return f'run-shard{shard}of{shards}'
+    return 'run'
+
+
+def active_run_leases() -> Dict[str, dict]:
+    """期限内の /run・/run-sharded・シャード実行のリース（リース名 → 保持中のリース）。"""
+    return get_active_leases(prefix='run')
+
+
+def _conflicts(name: str, other: str, holder: dict) -> bool:
+    """リース name で実行するとき、保持中のリース other の実行と企業が重なるか。"""
+    if other == name:
+        return False
+    if name == 'run':
+        # シャードなしの /run・/run-sharded は、どのシャード実行とも重なる
+        return other.startswith('run-shard')
+    shards = name.rsplit('of', 1)[1]
+    if other == 'run':
+        # /run-sharded が起動したシャードなら重ならない
+        return not (holder.get('runId') or '').endswith(COORDINATOR_RUN_SUFFIX)
+    # シャード数の違うシャード実行とは重なる
+    return other.startswith('run-shard') and other.rsplit('of', 1)[1] != shards
+
+
+class LeaseHeld(Exception):
+    """他の実行がリースを保持している。"""
+
+    def __init__(self, name: str, holder: dict):
+        self.name = name
+        self.holder = holder
+        super().__init__(
+            f'リース {name} は実行 {holder.get("runId")} が保持しています'
+        )
+
+    @property
+    def run_id(self) -> Optional[str]:
+        return self.holder.get('runId')
+
+
+class RunLease:
+    """実行リース（取得・heartbeat・解放）。
+
+    Args:
+        name: リース名
+        run_id: リースを使う実行ID
+        ttl: 有効秒数
+    """
+
+    def __init__(self, name: str, run_id: str, ttl: float = RUN_LEASE_TTL_SECONDS):
+        self.name = name
+        self.run_id = run_id
+        self.ttl = ttl
+        self.owner = f'{_PROCESS_ID}-{uuid.uuid4().hex[:6]}'
+        # heartbeat で延長できなかった（他の実行に取られた）
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self) -> None:
+        """リースを取得して heartbeat を開始する。
+
+        Raises:
+            LeaseHeld: 他の実行が保持している（企業が重なる別のリースを含む）
+        """
+        holder = acquire_lease(self.name, self.owner, self.run_id, self.ttl)
+        if holder is not None:
+            raise LeaseHeld(self.name, holder)
+        # 取得してから確認するので、同時に取得した /run とシャード実行の少なくとも一方が相手を見つける
+        try:
+            conflict = next(
+                ((other, held) for other, held in active_run_leases().items()
+                 if _conflicts(self.name, other, held)),
+                None,
+            )
+        except Exception:
+            release_lease(self.name, self.owner)
+            raise
+        if conflict is not None:
+            release_lease(self.name, self.owner)
+            raise LeaseHeld(*conflict)
+        logger.info(f'リース {self.name} を取得 (runId={self.run_id})')
+        self._thread = threading.Thread(
+            target=self._heartbeat, name=f'lease-{self.name}', daemon=True
+        )
+        self._thread.start()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / HEARTBEAT_DIVISOR):
+            try:
+                renewed = renew_lease(self.name, self.owner, self.ttl)
+            except Exception as e:
+                # 一時的なエラーは次の heartbeat で再試行する（期限内なら保持したまま）
+                logger.warning(f'リース {self.name} の延長エラー: {e}')
+                continue
+            if not renewed:
+                logger.error(f'リース {self.name} を失いました (runId={self.run_id})')
+                self.lost.set()
+                return
+
+    def release(self) -> None:
+        """heartbeat を止めてリースを解放する。"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.lost.is_set():
+            return
+        try:
+            release_lease(self.name, self.owner)
+        except Exception as e:
+            # 解放できなくても期限切れで取得できるようになる
+            logger.error(f'リース {self.name} の解放エラー: {e}')
+            return
+        logger.info(f'リース {self.name} を解放 (runId={self.run_id})')
+
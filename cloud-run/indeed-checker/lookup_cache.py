@@ -0,0 +1,205 @@
+"""SerpAPI 検索結果キャッシュモジュール
+
+正規化済み企業名をキーに、Indeed 企業ページ検索と /jobs チェックの結果を
+TTL 付きで保存する。掲載あり（positive）と掲載なし（negative）で
+別々の TTL を持つ。
+
+バックエンド:
+- sqlite: ローカルファイル（開発用）
+- firestore: Firestore コレクション（Cloud Run 用）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from metrics import CACHE_HITS, CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+# キャッシュ設定
+CACHE_BACKEND = os.environ.get('INDEED_CACHE_BACKEND', 'none')
+CACHE_SQLITE_PATH = os.environ.get(
+    'INDEED_CACHE_SQLITE_PATH', '/tmp/indeed_lookup_cache.sqlite3'
+)
+CACHE_COLLECTION = os.environ.get('INDEED_CACHE_COLLECTION', 'indeedLookupCache')
+CACHE_POSITIVE_TTL_DAYS = float(os.environ.get('INDEED_CACHE_POSITIVE_TTL_DAYS', 30))
+CACHE_NEGATIVE_TTL_DAYS = float(os.environ.get('INDEED_CACHE_NEGATIVE_TTL_DAYS', 7))
+
+
+class SqliteCacheBackend:
+    """SQLite ファイルに保存するバックエンド（開発用）。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS lookup_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM lookup_cache WHERE key = ?',
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: dict, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO lookup_cache (key, value, expires_at) '
+                'VALUES (?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._conn.commit()
+
+
+class FirestoreCacheBackend:
+    """Firestore コレクションに保存するバックエンド（Cloud Run 用）。
+
+    expiresAt フィールドに Firestore の TTL ポリシーを設定すれば
+    期限切れドキュメントは自動削除される。
+    """
+
+    def __init__(self, collection: str):
+        self.collection = collection
+
+    def _ref(self, key: str):
+        from firestore_service import get_db
+
+        # 企業名には "/" などドキュメントIDに使えない文字が含まれうるためハッシュ化
+        doc_id = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return get_db().collection(self.collection).document(doc_id)
+
+    def get(self, key: str) -> Optional[tuple]:
+        snapshot = self._ref(key).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        expires_at = data.get('expiresAt')
+        if expires_at is None:
+            return None
+        return data.get('value', {}), expires_at.timestamp()
+
+    def set(self, key: str, value: dict, expires_at: float) -> None:
+        self._ref(key).set({
+            'key': key,
+            'value': value,
+            'expiresAt': datetime.fromtimestamp(expires_at, tz=timezone.utc),
+        })
+
+
+class LookupCache:
+    """正規化企業名 → 検索結果 の TTL キャッシュ。
+
+    値は {'indeedUrl': str | None, 'hasJobsPage': bool | None}（None は /jobs 未確認）。
+    indeedUrl がある結果は positive TTL、ない結果は negative TTL で保持する。
+    """
+
+    def __init__(
+        self,
+        backend,
+        positive_ttl_days: float = CACHE_POSITIVE_TTL_DAYS,
+        negative_ttl_days: float = CACHE_NEGATIVE_TTL_DAYS,
+    ):
+        self.backend = backend
+        self.positive_ttl = positive_ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        # 統計はプロセス全体の累計（スレッド間で共有するので、実行ごとにリセットしない）
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._errors = 0
+
+    def stats(self, since: Optional[dict] = None) -> dict:
+        """ヒット・ミス・保存・エラーの件数。since（stats() の値）からの差分も返せる。"""
+        with self._lock:
+            counts = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'writes': self._writes,
+                'errors': self._errors,
+            }
+        if since:
+            counts = {key: value - since.get(key, 0) for key, value in counts.items()}
+        return counts
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, normalized_name: str) -> Optional[dict]:
+        """キャッシュを参照する。期限切れ・未登録・エラー時は None。"""
+        try:
+            entry = self.backend.get(normalized_name)
+        except Exception as e:
+            logger.warning(f'キャッシュ参照エラー ({normalized_name}): {e}')
+            self._count('_errors')
+            entry = None
+
+        if entry is None or entry[1] <= time.time():
+            self._count('_misses')
+            CACHE_MISSES.inc()
+            return None
+
+        self._count('_hits')
+        CACHE_HITS.inc()
+        return entry[0]
+
+    def put(
+        self,
+        normalized_name: str,
+        indeed_url: Optional[str],
+        has_jobs_page: Optional[bool],
+    ) -> None:
+        """検索結果を保存する。保存失敗はチェック結果に影響させない。"""
+        ttl = self.positive_ttl if indeed_url else self.negative_ttl
+        if ttl <= 0:
+            return
+        value = {'indeedUrl': indeed_url, 'hasJobsPage': has_jobs_page}
+        try:
+            self.backend.set(normalized_name, value, time.time() + ttl)
+            self._count('_writes')
+        except Exception as e:
+            logger.warning(f'キャッシュ保存エラー ({normalized_name}): {e}')
+            self._count('_errors')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_lookup_cache() -> Optional[LookupCache]:
+    """設定に応じたキャッシュのシングルトンを返す。無効時は None。"""
+    global _cache
+    if CACHE_BACKEND in ('', 'none'):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_BACKEND == 'sqlite':
+                    backend = SqliteCacheBackend(CACHE_SQLITE_PATH)
+                elif CACHE_BACKEND == 'firestore':
+                    backend = FirestoreCacheBackend(CACHE_COLLECTION)
+                else:
+                    raise ValueError(
+                        f'不明な INDEED_CACHE_BACKEND: {CACHE_BACKEND}'
+                    )
+                _cache = LookupCache(backend)
+                logger.info(f'検索結果キャッシュ有効: backend={CACHE_BACKEND}')
+    return _cache
@@ -2,24 +2,62 @@
 
 Cloud Scheduler から毎週月曜 3:00 AM (JST) にトリガーされる。
 手動実行も /run エンドポイントで可能。
+
+Cloud Run はゼロまでスケールするため、起動時には Flask とアプリケーションの
+モジュールだけを読み込む。google.cloud.firestore と requests は初回の
+Firestore アクセス・検索で読み込む（WARMUP_ON_START で起動直後に用意できる）。
 """
 
 import json
 import logging
 import os
 import sys
+import threading
 import time
 from datetime import datetime, timezone
 
-from flask import Flask, jsonify, request
+_import_started = time.monotonic()
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+_flask_imported = time.monotonic()
 
 from firestore_service import (
-    get_all_companies,
+    add_quota_usage,
+    get_companies,
+    get_last_run_id,
+    get_run_state,
     has_agent_exported_jobs,
+    iter_active_companies,
+    ping,
+    set_last_run_id,
     update_company_indeed_status,
     update_jobs_indeed_control,
 )
-from indeed_checker import check_company_indeed
+from indeed_checker import (
+    JOBS_CHECK_MODE,
+    JOBS_CHECK_MODES,
+    SEARCH_BATCH_SIZE,
+    check_company_indeed,
+    get_serpapi_client,
+)
+from lease import COORDINATOR_RUN_SUFFIX, LeaseHeld, RunLease, run_lease_name
+from metrics import STARTUP_SECONDS, record_startup, render_metrics, startup_step
+from quota import current_month
+from run_log import FOLLOW_INTERVAL, has_result_log, iter_result_lines
+from runner import (
+    CHECK_WORKERS,
+    RUN_TIME_BUDGET_SECONDS,
+    WRITE_WORKERS,
+    CheckRun,
+    get_active_run,
+    new_run_id,
+)
+from scheduler import next_schedule
+from sharding import MAX_SHARDS, coordinator_base_url, filter_shard, run_shards
+from watcher import WATCH_COMPANIES, get_watcher, start_watcher
+
+_app_imported = time.monotonic()
 
 # ログ設定（Cloud Run 向け構造化ログ）
 logging.basicConfig(
@@ -31,6 +69,48 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# /check-batch で1回に指定できる企業数
+CHECK_BATCH_MAX = 500
+
+# 起動直後にバックグラウンドで Firestore クライアントと SerpAPI の接続を用意するか
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0') == '1'
+
+# 初回使用時に読み込むモジュール（起動時に読み込まれていないことをログで確認する）
+LAZY_MODULES = ('google.cloud.firestore', 'requests')
+
+
+def startup_report() -> dict:
+    """起動・初回使用時の手順ごとの所要時間（ミリ秒）と、遅延読み込みの状況。"""
+    return {
+        'startup_ms': {
+            step: round(seconds * 1000, 1) for step, seconds in STARTUP_SECONDS.items()
+        },
+        'loaded': {name: name in sys.modules for name in LAZY_MODULES},
+    }
+
+
+def warmup() -> dict:
+    """Firestore クライアントと SerpAPI の接続を先に用意する（検索クエリは使わない）。"""
+    with startup_step('warmup'):
+        try:
+            ping()
+        except Exception as e:
+            logger.warning(f'Firestore のウォームアップに失敗: {e}')
+        get_serpapi_client().warmup()
+    return startup_report()
+
+
+record_startup('import_flask', _flask_imported - _import_started)
+record_startup('import_app', _app_imported - _flask_imported)
+logger.info(json.dumps({'startup': startup_report()}, ensure_ascii=False))
+
+if WARMUP_ON_START:
+    threading.Thread(target=warmup, name='warmup', daemon=True).start()
+
+if WATCH_COMPANIES:
+    # gunicorn の worker は1つなので、プロセスごとに1つだけ購読する
+    start_watcher()
+
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -38,6 +118,55 @@ def health():
     return jsonify({'status': 'ok', 'timestamp': datetime.now(timezone.utc).isoformat()})
 
 
+@app.route('/warmup', methods=['GET'])
+def warmup_endpoint():
+    """Firestore クライアントと SerpAPI の接続を用意する。
+
+    管理画面から /check-single を呼ぶ前や、Cloud Run の起動プローブから呼ぶ。
+    2回目以降はすぐに返る。
+    """
+    return jsonify(warmup()), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """処理段階ごとのレイテンシ・SerpAPI・キャッシュのメトリクス（Prometheus 形式）。
+
+    値はこのインスタンスの起動からの累計。
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def _run_in_background(run: CheckRun, companies) -> None:
+    """非同期モードの実行本体（バックグラウンドスレッド）。"""
+    try:
+        run.execute(companies)
+    except Exception as e:
+        logger.error(f'致命的エラー ({run.run_id}): {e}', exc_info=True)
+    finally:
+        if run.lease is not None:
+            run.lease.release()
+
+
+def _lease_conflict(e: LeaseHeld):
+    return jsonify({
+        'error': f'別の実行が進行中です（{e.name}）',
+        'runId': e.run_id,
+        'expiresAt': e.holder.get('expiresAt'),
+    }), 409
+
+
+def _pending_run_id(lease_name: str):
+    """同じリースで最後に開始した実行が未完了ならその runId を返す（なければ None）。"""
+    run_id = get_last_run_id(lease_name)
+    if run_id is None or get_active_run(run_id) is not None:
+        return None
+    state = get_run_state(run_id)
+    if state is None or state.get('status') == 'completed':
+        return None
+    return run_id
+
+
 @app.route('/run', methods=['POST'])
 def run_checker():
     """Indeed 掲載チェックを実行するメインエンドポイント。
@@ -45,123 +174,225 @@ def run_checker():
     Cloud Scheduler または手動で呼び出される。
     全アクティブ企業に対して Indeed 掲載チェックを行い、
     結果を Firestore に書き込む。
+
+    同じ対象（シャード）の実行が進行中なら、その runId 付きの 409 を返す
+    （Firestore の実行リース。クラッシュした実行のリースは RUN_LEASE_TTL_SECONDS 後に取得できる）。
+    シャードなしの実行とシャード実行も、企業が重なるため互いに 409 になる
+    （/run-sharded が起動したシャードを除く）。
+
+    処理時間が max_seconds を超えると status='partial' で返す。
+    続きはレスポンスの resume（/run?resume=<runId>）で再開する。
+    resume を省略しても、同じ対象（シャード）で最後に開始した実行が未完了
+    （partial・failed、タイムアウトなどで中断）なら、その続きから再開する（fresh=1 で新規実行）。
+    企業ごとの結果はレスポンスに含めず、/runs/<runId>/results で取得する。
+
+    Query Parameters:
+        workers: 並列ワーカー数（省略時は CHECK_WORKERS 環境変数）
+        refresh: 1 の場合は検索結果キャッシュとスラッグ索引を使わずに再検索する
+        resume: 中断した実行の runId（指定時はチェックポイントから再開）。
+            pending なら未完了の実行があるときだけ再開し、なければ何もしない
+        fresh: 1 の場合は未完了の実行があっても再開せず、新しく実行する
+        max_seconds: 処理する最大秒数（省略時は RUN_TIME_BUDGET_SECONDS、0 で無制限）
+        shard, shards: 企業IDのハッシュで shards 個に分割したうち shard 番目だけを処理する
+        qps: この実行の間の SerpAPI リクエストレート（省略時は SERPAPI_QPS。
+            適応制御が有効ならレートの上限。実行が終わると元に戻す）
+        full: 1 の場合は次回チェック日時（nextCheckAt）に関係なく全企業をチェックする
+        budget: この実行で使える SerpAPI クエリ数（指定時は優先度順にチェックする）
+        jobs_check: /jobs サブページの確認方法 full / single / deferred / off
+            （省略時は JOBS_CHECK_MODE 環境変数）
+        batch: 1クエリに OR でまとめる企業名の数（省略時は SEARCH_BATCH_SIZE、1 でまとめない）
+        write_workers: WriteBatch をコミットする専用スレッド数（省略時は WRITE_WORKERS）
+        async: 1 の場合は開始だけして 202 を返す（進捗は /runs/<runId>）
     """
-    start_time = time.time()
-    logger.info('=== Indeed 掲載チェック開始 ===')
-
-    # 実行結果サマリー
-    summary = {
-        'total': 0,
-        'checked': 0,
-        'detected': 0,
-        'not_detected': 0,
-        'errors': 0,
-        'jobs_updated': 0,
-        'details': [],
-    }
+    resume_id = request.args.get('resume')
+    shard = request.args.get('shard', default=0, type=int)
+    shards = request.args.get('shards', default=1, type=int)
+    if not 1 <= shards <= MAX_SHARDS or not 0 <= shard < shards:
+        return jsonify({'error': 'shard / shards の指定が不正です'}), 400
+    run_async = request.args.get('async', '0') == '1'
+    jobs_check = request.args.get('jobs_check', JOBS_CHECK_MODE)
+    if jobs_check not in JOBS_CHECK_MODES:
+        return jsonify({
+            'error': f'jobs_check は {" / ".join(JOBS_CHECK_MODES)} のいずれかで指定してください'
+        }), 400
 
-    try:
-        # 1. 全アクティブ企業を取得
-        companies = get_all_companies()
-        summary['total'] = len(companies)
-        logger.info(f'チェック対象企業数: {len(companies)}')
-
-        # 2. 各企業をチェック
-        for i, company in enumerate(companies, 1):
-            company_id = company.get('id', '')
-            company_name = company.get('name', '不明')
-
-            logger.info(
-                f'[{i}/{len(companies)}] チェック中: '
-                f'{company_name} (ID: {company_id})'
-            )
+    fresh = request.args.get('fresh', '0') == '1'
+    if (resume_id is None and not fresh) or resume_id == 'pending':
+        try:
+            pending_id = _pending_run_id(run_lease_name(shard, shards))
+        except Exception as e:
+            logger.error(f'致命的エラー: {e}', exc_info=True)
+            return jsonify({'error': str(e)}), 500
+        if resume_id == 'pending' and pending_id is None:
+            return jsonify({'status': 'idle', 'message': '未完了の実行はありません'}), 200
+        if pending_id is not None:
+            logger.info(f'未完了の実行 {pending_id} を続きから再開します')
+        resume_id = pending_id
+
+    run = CheckRun(
+        workers=request.args.get('workers', default=CHECK_WORKERS, type=int),
+        use_cache=request.args.get('refresh', '0') != '1',
+        run_id=resume_id,
+        time_budget=request.args.get(
+            'max_seconds', default=RUN_TIME_BUDGET_SECONDS, type=float
+        ),
+        shard=shard,
+        shards=shards,
+        full=request.args.get('full', '0') == '1',
+        budget=request.args.get('budget', type=int),
+        jobs_check=jobs_check,
+        search_batch=request.args.get('batch', default=SEARCH_BATCH_SIZE, type=int),
+        write_workers=request.args.get('write_workers', default=WRITE_WORKERS, type=int),
+        qps=request.args.get('qps', type=float) or None,
+    )
 
-            # Indeed チェック実行
-            result = check_company_indeed(company)
-
-            detail = {
-                'companyId': company_id,
-                'companyName': company_name,
-                'result': result.to_dict(),
-            }
-
-            if result.error:
-                # エラーの場合は前回の状態を維持し、エラーだけ記録
-                summary['errors'] += 1
-                try:
-                    update_company_indeed_status(
-                        company_id=company_id,
-                        detected=company.get('indeedStatus', {}).get('detected', False),
-                        detected_by=company.get('indeedStatus', {}).get('detectedBy'),
-                        indeed_url=company.get('indeedStatus', {}).get('indeedUrl'),
-                        error=result.error,
-                    )
-                except Exception as e:
-                    logger.error(f'Firestore更新エラー ({company_id}): {e}')
-            else:
-                summary['checked'] += 1
-
-                # detectedBy を判定
-                detected_by = None
-                if result.detected:
-                    summary['detected'] += 1
-                    # Agent経由のエクスポート済み求人があるか確認
-                    if has_agent_exported_jobs(company_id):
-                        detected_by = 'agent'
-                    else:
-                        detected_by = 'external'
-                    detail['detectedBy'] = detected_by
-                else:
-                    summary['not_detected'] += 1
-
-                # Firestore 更新: 企業
-                try:
-                    update_company_indeed_status(
-                        company_id=company_id,
-                        detected=result.detected,
-                        detected_by=detected_by,
-                        indeed_url=result.indeed_url,
-                    )
-                except Exception as e:
-                    logger.error(f'企業ステータス更新エラー ({company_id}): {e}')
-                    summary['errors'] += 1
-
-                # Firestore 更新: 求人（can_post は detected の逆）
-                can_post = not result.detected
-                try:
-                    updated_count = update_jobs_indeed_control(
-                        company_id, can_post
-                    )
-                    summary['jobs_updated'] += updated_count
-                    detail['jobsUpdated'] = updated_count
-                except Exception as e:
-                    logger.error(f'求人ステータス更新エラー ({company_id}): {e}')
-                    summary['errors'] += 1
-
-            summary['details'].append(detail)
-
-        elapsed = time.time() - start_time
-        summary['elapsed_seconds'] = round(elapsed, 1)
-
-        logger.info('=== Indeed 掲載チェック完了 ===')
-        logger.info(json.dumps({
-            'total': summary['total'],
-            'checked': summary['checked'],
-            'detected': summary['detected'],
-            'not_detected': summary['not_detected'],
-            'errors': summary['errors'],
-            'jobs_updated': summary['jobs_updated'],
-            'elapsed_seconds': summary['elapsed_seconds'],
-        }, ensure_ascii=False))
+    try:
+        if resume_id:
+            if get_active_run(resume_id) is not None:
+                return jsonify({
+                    'error': f'実行 {resume_id} は実行中です',
+                    'runId': resume_id,
+                }), 409
+            state = get_run_state(resume_id)
+            if state is None:
+                return jsonify({'error': f'実行 {resume_id} が見つかりません'}), 404
+            if state.get('status') == 'completed':
+                return jsonify({
+                    'error': f'実行 {resume_id} は完了済みです',
+                    'runId': resume_id,
+                }), 409
+            run.restore(state)
+
+        lease = RunLease(run_lease_name(run.shard, run.shards), run.run_id)
+        try:
+            lease.acquire()
+        except LeaseHeld as e:
+            return _lease_conflict(e)
+        run.lease = lease
+        set_last_run_id(lease.name, run.run_id)
+    except Exception as e:
+        logger.error(f'致命的エラー: {e}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
 
+    background = False
+    try:
+        # 全アクティブ企業をページ単位でストリームしながらチェック
+        # （再開時はチェックポイントの cursor より後から）
+        companies = iter_active_companies(start_after_id=run.cursor)
+        if run.shards > 1:
+            companies = filter_shard(companies, run.shard, run.shards)
+
+        if run_async:
+            # Cloud Run ではレスポンス後も CPU を割り当てる設定
+            # （--no-cpu-throttling）が必要
+            threading.Thread(
+                target=_run_in_background,
+                args=(run, companies),
+                name=f'run-{run.run_id}',
+                daemon=True,
+            ).start()
+            background = True
+            return jsonify({
+                'runId': run.run_id,
+                'status': 'running',
+                'progress': f'/runs/{run.run_id}',
+                'results': f'/runs/{run.run_id}/results',
+            }), 202
+
+        summary = run.execute(companies)
         return jsonify(summary), 200
 
     except Exception as e:
         logger.error(f'致命的エラー: {e}', exc_info=True)
         return jsonify({
             'error': str(e),
-            'summary': summary,
+            'summary': run.snapshot(),
         }), 500
+    finally:
+        if not background:
+            lease.release()
+
+
+@app.route('/runs/<run_id>', methods=['GET'])
+def run_status(run_id):
+    """実行の進捗を返す。
+
+    このインスタンスで実行中ならメモリ上の最新サマリー、
+    そうでなければ Firestore のチェックポイントを返す。
+    """
+    run = get_active_run(run_id)
+    if run is not None:
+        return jsonify(run.snapshot()), 200
+
+    state = get_run_state(run_id)
+    if state is None:
+        return jsonify({'error': f'実行 {run_id} が見つかりません'}), 404
+    # チェックポイントの集計値を実行中サマリーと同じ形に揃える
+    state.update(state.pop('counters', None) or {})
+    state['runId'] = run_id
+    if has_result_log(run_id):
+        state['results'] = f'/runs/{run_id}/results'
+    return jsonify(state), 200
+
+
+@app.route('/runs/<run_id>/results', methods=['GET'])
+def run_results(run_id):
+    """企業ごとの結果を NDJSON でストリーミングする。
+
+    実行中の場合は、実行が終わるまで追記された結果を順次返す。
+    結果ログは実行したインスタンスのローカルにあるため、
+    別インスタンスに振り分けられた場合は 404 になる。
+    """
+    if not has_result_log(run_id):
+        return jsonify({'error': f'実行 {run_id} の結果ログがありません'}), 404
+
+    lines = iter_result_lines(
+        run_id, is_running=lambda: get_active_run(run_id) is not None
+    )
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+
+@app.route('/run-sharded', methods=['POST'])
+def run_sharded():
+    """全シャードの /run を並列に起動し、サマリーをマージするコーディネーター。
+
+    各シャードは別インスタンスで実行されるため、Cloud Run の
+    max-instances はシャード数 + 1 以上にしておくこと。
+    /run と同じリースを取るため、シャードなしの /run とは同時に実行できない。
+
+    Query Parameters:
+        shards: シャード数（必須）
+        workers, refresh, max_seconds, qps, full, jobs_check, batch, fresh:
+            各シャードの /run にそのまま渡す（各シャードの未完了の実行は続きから再開する）
+        budget: 実行全体のクエリ予算（シャード数で割り振る）
+    """
+    shards = request.args.get('shards', type=int)
+    if not shards or not 1 <= shards <= MAX_SHARDS:
+        return jsonify({'error': f'shards は 1〜{MAX_SHARDS} で指定してください'}), 400
+
+    if 'budget' in request.args and request.args.get('budget', type=int) is None:
+        return jsonify({'error': 'budget は整数で指定してください'}), 400
+
+    params = {
+        key: request.args[key]
+        for key in (
+            'workers', 'refresh', 'max_seconds', 'qps', 'full', 'budget', 'jobs_check',
+            'batch', 'fresh',
+        )
+        if key in request.args
+    }
+    base_url = coordinator_base_url(request.host_url)
+    lease = RunLease(run_lease_name(), f'{new_run_id()}{COORDINATOR_RUN_SUFFIX}')
+    try:
+        lease.acquire()
+    except LeaseHeld as e:
+        return _lease_conflict(e)
+    try:
+        merged = run_shards(base_url, shards, params)
+    finally:
+        lease.release()
+    status_code = 500 if merged['status'] == 'failed' else 200
+    return jsonify(merged), status_code
 
 
 @app.route('/check-single', methods=['POST'])
@@ -179,7 +410,14 @@ def check_single():
         return jsonify({'error': 'companyName は必須です'}), 400
 
     company = {'id': company_id, 'name': company_name}
-    result = check_company_indeed(company)
+    # 手動チェックは常に最新の検索結果を取得し、/jobs も確認する（キャッシュは更新される）
+    result = check_company_indeed(company, use_cache=False, jobs_check='full')
+
+    # 月間のクエリ使用量に計上する
+    try:
+        add_quota_usage(current_month(), result.queries)
+    except Exception as e:
+        logger.error(f'クエリ使用量の記録エラー: {e}')
 
     # Firestore に結果を書き込む
     if company_id and not result.error:
@@ -196,6 +434,10 @@ def check_single():
                 detected=result.detected,
                 detected_by=detected_by,
                 indeed_url=result.indeed_url,
+                has_jobs_page=result.has_jobs_page if result.detected else None,
+                verified=result.detected,
+                # 単体チェックは前回の状態を読まないので、間隔は基本値に戻す
+                schedule=next_schedule(company, False, None, datetime.now(timezone.utc)),
             )
 
             can_post = not result.detected
@@ -210,6 +452,9 @@ def check_single():
                 detected=False,
                 detected_by=None,
                 error=result.error,
+                schedule=next_schedule(
+                    company, False, result.error, datetime.now(timezone.utc)
+                ),
             )
         except Exception as e:
             logger.error(f'単体チェック エラー記録失敗 ({company_id}): {e}')
@@ -221,6 +466,107 @@ def check_single():
     }), 200
 
 
+@app.route('/check-batch', methods=['POST'])
+def check_batch():
+    """指定した企業をまとめてチェックし、企業ごとの結果を NDJSON でストリーミングする。
+
+    企業は1回の get_all で読み込み、/run と同じワーカープール・レートリミッター・
+    バッチ書き込みでチェックする。/check-single と同じく、常に最新の検索結果を取得し、
+    次回チェック日時に関係なくチェックする。
+
+    結果は完了した順に1社1行で返し、最後の行に実行サマリー（{"summary": ...}）を返す。
+    結果は /runs/<runId>/results でも取得できる。
+    async=1 なら開始だけして 202 を返す（進捗は /runs/<runId>、結果は /runs/<runId>/results）。
+    応答時間に上限のある呼び出し元（管理画面の API ルート）はこちらを使う。
+
+    Request Body:
+        { "companyIds": ["xxx", "yyy", ...] }
+
+    Query Parameters:
+        workers: 並列ワーカー数（省略時は CHECK_WORKERS 環境変数）
+        jobs_check: /jobs サブページの確認方法（省略時は full）
+        async: 1 の場合は開始だけして 202 を返す
+    """
+    data = request.get_json(silent=True) or {}
+    company_ids = data.get('companyIds')
+    if (not isinstance(company_ids, list) or not company_ids
+            or not all(isinstance(company_id, str) and company_id for company_id in company_ids)):
+        return jsonify({'error': 'companyIds は企業IDの配列で指定してください'}), 400
+    company_ids = list(dict.fromkeys(company_ids))
+    if len(company_ids) > CHECK_BATCH_MAX:
+        return jsonify({'error': f'companyIds は{CHECK_BATCH_MAX}件までです'}), 400
+    jobs_check = request.args.get('jobs_check', 'full')
+    if jobs_check not in JOBS_CHECK_MODES:
+        return jsonify({
+            'error': f'jobs_check は {" / ".join(JOBS_CHECK_MODES)} のいずれかで指定してください'
+        }), 400
+
+    try:
+        companies = get_companies(company_ids)
+    except Exception as e:
+        logger.error(f'一括チェックの企業取得エラー: {e}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
+    found = {company['id'] for company in companies}
+    run = CheckRun(
+        workers=request.args.get('workers', default=CHECK_WORKERS, type=int),
+        use_cache=False,
+        time_budget=0,
+        full=True,
+        jobs_check=jobs_check,
+        company_ids=sorted(found),
+    )
+    thread = threading.Thread(
+        target=_run_in_background,
+        args=(run, companies),
+        name=f'run-{run.run_id}',
+        daemon=True,
+    )
+
+    if request.args.get('async', '0') == '1':
+        thread.start()
+        logger.info(f'一括チェック開始（非同期）: {len(companies)}社 (runId={run.run_id})')
+        return jsonify({
+            'runId': run.run_id,
+            'status': 'running',
+            'notFound': [company_id for company_id in company_ids if company_id not in found],
+            'progress': f'/runs/{run.run_id}',
+            'results': f'/runs/{run.run_id}/results',
+        }), 202
+
+    def _stream():
+        for company_id in company_ids:
+            if company_id not in found:
+                yield json.dumps(
+                    {'companyId': company_id, 'error': '企業が見つかりません'},
+                    ensure_ascii=False,
+                ) + '\n'
+        thread.start()
+        # 結果ログは実行開始時に作られる
+        while thread.is_alive() and not has_result_log(run.run_id):
+            time.sleep(FOLLOW_INTERVAL)
+        if has_result_log(run.run_id):
+            yield from iter_result_lines(run.run_id, is_running=thread.is_alive)
+        yield json.dumps(
+            {'summary': run.snapshot()}, ensure_ascii=False, default=str
+        ) + '\n'
+
+    logger.info(f'一括チェック開始: {len(companies)}社 (runId={run.run_id})')
+    return Response(
+        stream_with_context(_stream()),
+        mimetype='application/x-ndjson',
+        headers={'X-Run-Id': run.run_id},
+    )
+
+
+@app.route('/watch', methods=['GET'])
+def watch_status():
+    """企業の変更監視（WATCH_COMPANIES=1）の状態を返す。"""
+    watcher = get_watcher()
+    if watcher is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify({'enabled': True, **watcher.snapshot()}), 200
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
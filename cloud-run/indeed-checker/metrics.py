@@ -0,0 +1,247 @@
+"""メトリクスモジュール
+
+処理段階ごとのレイテンシのヒストグラムと、SerpAPI・キャッシュのカウンター、
+処理中の企業数のゲージをプロセス全体で集計する。
+起動時・初回使用時の読み込みと初期化の所要時間（STARTUP_SECONDS）も記録する。
+/metrics で Prometheus のテキスト形式で公開し、/run のサマリーにも段階ごとの集計を含める。
+
+段階（STAGES）:
+    company_scan     Firestore の企業スキャン（1ページの取得）
+    normalize        企業名の正規化（グループ化の1回分）
+    cmp_search       /cmp/ 検索（レート制限の待ち時間を含む）
+    jobs_check       /jobs サブページの確認（同上）
+    rate_limit_wait  SerpAPI のレート制限の待ち時間
+    inflight_wait    SerpAPI の同時リクエスト数の上限で待った時間
+    serpapi_request  SerpAPI への HTTP リクエスト（リトライごと）
+    company_write    企業の indeedStatus 書き込み（バッチ時は積むまで）
+    jobs_write       求人の canPost 書き込み（同上）
+    batch_commit     WriteBatch のコミット
+    commit_wait      コミット待ちのバッチが上限に達し、空くまで待った時間（書き込みが検索に追いついていない）
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    'company_scan',
+    'normalize',
+    'cmp_search',
+    'jobs_check',
+    'rate_limit_wait',
+    'inflight_wait',
+    'serpapi_request',
+    'company_write',
+    'jobs_write',
+    'batch_commit',
+    'commit_wait',
+)
+
+# ヒストグラムのバケット上限（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """ラベル値ごとのヒストグラム（スレッドセーフ）。"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # ラベル値 → [バケットごとの件数..., 合計, 件数]
+        self._series: Dict[str, List[float]] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.setdefault(
+                label_value, [0] * len(self.buckets) + [0.0, 0]
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self) -> Dict[str, Tuple[int, float]]:
+        """ラベル値ごとの (件数, 合計秒数)。"""
+        with self._lock:
+            return {key: (int(s[-1]), s[-2]) for key, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = {key: list(s) for key, s in self._series.items()}
+        for key, s in sorted(series.items()):
+            label = f'{self.label}="{key}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, s):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {int(s[-1])}')
+            lines.append(f'{self.name}_sum{{{label}}} {s[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {int(s[-1])}')
+        return lines
+
+
+class Counter:
+    """単調増加のカウンター（スレッドセーフ）。"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} counter',
+            f'{self.name} {self.value}',
+        ]
+
+
+class Gauge(Counter):
+    """増減する値（スレッドセーフ）。"""
+
+    def dec(self, n: int = 1) -> None:
+        self.inc(-n)
+
+    def set(self, value) -> None:
+        with self._lock:
+            self.value = value
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} gauge',
+            f'{self.name} {self.value}',
+        ]
+
+
+STAGE_SECONDS = Histogram(
+    'indeed_checker_stage_seconds', '処理段階ごとの所要時間（秒）', 'stage'
+)
+SERPAPI_CALLS = Counter('indeed_checker_serpapi_calls_total', 'SerpAPI への HTTP リクエスト数')
+SERPAPI_RETRIES = Counter('indeed_checker_serpapi_retries_total', 'SerpAPI のリトライ数')
+SERPAPI_ERRORS = Counter('indeed_checker_serpapi_errors_total', 'SerpAPI の失敗数（リトライ後）')
+SERPAPI_RATE_LIMITED = Counter(
+    'indeed_checker_serpapi_rate_limited_total', 'SerpAPI の HTTP 429 応答数'
+)
+CACHE_HITS = Counter('indeed_checker_cache_hits_total', '検索結果キャッシュのヒット数')
+CACHE_MISSES = Counter('indeed_checker_cache_misses_total', '検索結果キャッシュのミス数')
+COMPANIES_CHECKED = Counter('indeed_checker_companies_checked_total', 'チェックした企業数')
+COMPANIES_INFLIGHT = Gauge('indeed_checker_companies_inflight', '投入済み・未完了の企業数')
+SERPAPI_RATE = Gauge('indeed_checker_serpapi_rate', 'SerpAPI のレート制限（リクエスト/秒）')
+SERPAPI_INFLIGHT_LIMIT = Gauge(
+    'indeed_checker_serpapi_inflight_limit', 'SerpAPI の同時リクエスト数の上限'
+)
+
+_METRICS = (
+    STAGE_SECONDS,
+    SERPAPI_CALLS,
+    SERPAPI_RETRIES,
+    SERPAPI_ERRORS,
+    SERPAPI_RATE_LIMITED,
+    CACHE_HITS,
+    CACHE_MISSES,
+    COMPANIES_CHECKED,
+    COMPANIES_INFLIGHT,
+    SERPAPI_RATE,
+    SERPAPI_INFLIGHT_LIMIT,
+)
+
+
+@contextmanager
+def stage(name: str):
+    """with ブロックの所要時間を段階 name のヒストグラムに記録する。"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(name, time.monotonic() - started)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(name, seconds)
+
+
+# 起動・初回使用時の手順ごとの所要時間（秒）。手順は1プロセスで1回だけ記録される
+#   import_flask      Flask の読み込み
+#   import_app        アプリケーションモジュールの読み込み
+#   firestore_import  google.cloud.firestore の読み込み（初回の Firestore アクセス時）
+#   firestore_client  Firestore クライアントの作成
+#   serpapi_client    requests の読み込みと SerpAPI クライアントの作成（初回の検索時）
+#   warmup            ウォームアップ（/warmup・WARMUP_ON_START）
+STARTUP_SECONDS: Dict[str, float] = {}
+
+
+def record_startup(name: str, seconds: float) -> None:
+    if name in STARTUP_SECONDS:
+        return
+    STARTUP_SECONDS[name] = seconds
+    logger.info(f'起動時間 {name}: {seconds * 1000:.0f}ms')
+
+
+@contextmanager
+def startup_step(name: str):
+    """with ブロックの所要時間を起動・初回使用時の手順 name として記録する。"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record_startup(name, time.monotonic() - started)
+
+
+def _render_startup() -> List[str]:
+    name = 'indeed_checker_startup_seconds'
+    lines = [
+        f'# HELP {name} 起動・初回使用時の読み込みと初期化の所要時間（秒）',
+        f'# TYPE {name} gauge',
+    ]
+    for step, seconds in sorted(STARTUP_SECONDS.items()):
+        lines.append(f'{name}{{step="{step}"}} {seconds:.6f}')
+    return lines
+
+
+def render_metrics() -> str:
+    """Prometheus のテキスト形式（version 0.0.4）。"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.extend(_render_startup())
+    return '\n'.join(lines) + '\n'
+
+
+def stage_summary(since: Dict[str, Tuple[int, float]]) -> dict:
+    """since（STAGE_SECONDS.totals() の値）からの段階ごとの件数・合計・平均。
+
+    プロセス全体の集計の差分なので、同時に動いている別の処理
+    （変更監視・/check-single など）の分も含まれる。
+    """
+    summary = {}
+    for name, (count, total) in STAGE_SECONDS.totals().items():
+        base_count, base_total = since.get(name, (0, 0.0))
+        count -= base_count
+        total -= base_total
+        if count <= 0:
+            continue
+        summary[name] = {
+            'count': count,
+            'total_seconds': round(total, 3),
+            'avg_ms': round(total / count * 1000, 1),
+        }
+    return summary
@@ -5,6 +5,7 @@ Indeed検索用に企業名から不要な文字列を除去・変換する。
 
 import re
 import unicodedata
+from functools import lru_cache
 
 
 # 除去対象の法人格
@@ -28,12 +29,32 @@ CORPORATE_SUFFIXES = [
     '(合)',
 ]
 
+# 正規化結果を保持する企業名の数（同じ企業名は planner・scheduler などで何度も正規化される）
+NORMALIZE_CACHE_SIZE = 65536
 
+# 法人格を1回で除去する正規表現。NFKC 後の文字列に適用するので、法人格も NFKC で揃える
+# （㈱・（株）→ (株)、ＮＰＯ法人 → NPO法人 など全角の表記ゆれもまとめて除去できる）。
+# 長いものから並べて、短い法人格が先に一致しないようにする
+_SUFFIX_PATTERN = re.compile('|'.join(
+    re.escape(suffix)
+    for suffix in sorted(
+        {unicodedata.normalize('NFKC', suffix) for suffix in CORPORATE_SUFFIXES},
+        key=len,
+        reverse=True,
+    )
+))
+
+_SPACES_PATTERN = re.compile(r'\s+')
+
+_MATCH_KEY_PATTERN = re.compile(r'[\s\-_・.,、。()（）]+')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_company_name(name: str) -> str:
     """企業名を正規化する。
 
-    1. 法人格を除去
-    2. 全角英数字・記号を半角に変換
+    1. 全角英数字・記号を半角に変換（NFKC）
+    2. 法人格を除去
     3. 余分な空白を除去
     4. trim処理
 
@@ -46,19 +67,22 @@ def normalize_company_name(name: str) -> str:
     if not name:
         return ''
 
-    result = name
+    # 全角英数字を半角に変換（NFKC正規化）
+    result = unicodedata.normalize('NFKC', name)
 
     # 法人格を除去
-    for suffix in CORPORATE_SUFFIXES:
-        result = result.replace(suffix, '')
+    result = _SUFFIX_PATTERN.sub('', result)
 
-    # 全角英数字を半角に変換（NFKC正規化）
-    result = unicodedata.normalize('NFKC', result)
+    # 余分な空白を除去して trim
+    return _SPACES_PATTERN.sub(' ', result).strip()
 
-    # 余分な空白を除去
-    result = re.sub(r'\s+', ' ', result)
 
-    # trim
-    result = result.strip()
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def match_key(text: str) -> str:
+    """照合用に文字列を揃える（NFKC・小文字化・空白や区切り記号の除去）。
 
-    return result
+    Indeed の /cmp/ スラッグ（例: Blue-Sky）と企業名（例: Blue Sky）を
+    同じキーで比較するために使う。
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return _MATCH_KEY_PATTERN.sub('', text)
@@ -0,0 +1,116 @@
+"""実行計画モジュール
+
+チェック対象企業を正規化済み企業名でグループ化する。
+同じ正規化名になる企業（チェーン店・フランチャイズなど）は
+1回だけ検索し、結果をグループ内の全企業に適用する。
+
+企業はページ単位でストリームされるため、ページ内はグループ化で、
+ページをまたぐ重複は SharedResults で実行中の検索結果を共有して排除する。
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import stage
+from normalization import normalize_company_name
+
+logger = logging.getLogger(__name__)
+
+
+class CheckGroup:
+    """同じ正規化名を持つ企業のグループ。"""
+
+    def __init__(self, normalized: Optional[str], companies: List[dict]):
+        self.normalized = normalized
+        self.companies = companies
+
+    @property
+    def representative(self) -> dict:
+        """検索に使う代表企業（グループの先頭）。"""
+        return self.companies[0]
+
+
+def plan_check_groups(companies: Iterable[dict]) -> List[CheckGroup]:
+    """企業を正規化名でグループ化する。
+
+    企業名が空の企業はグループ化せず、それぞれ単独のグループにする
+    （チェック時にエラーとして記録されるため）。
+
+    Args:
+        companies: 企業データ（id, name 付き）
+
+    Returns:
+        CheckGroup のリスト（元の順序で最初に出現した順）
+    """
+    groups: Dict[str, CheckGroup] = {}
+    ordered: List[CheckGroup] = []
+
+    companies = list(companies)
+    with stage('normalize'):
+        names = [normalize_company_name(company.get('name', '')) for company in companies]
+    for company, normalized in zip(companies, names):
+        if not normalized:
+            ordered.append(CheckGroup(None, [company]))
+            continue
+
+        group = groups.get(normalized)
+        if group is None:
+            group = CheckGroup(normalized, [company])
+            groups[normalized] = group
+            ordered.append(group)
+        else:
+            group.companies.append(company)
+
+    duplicates = sum(len(g.companies) - 1 for g in ordered)
+    if duplicates:
+        logger.info(
+            f'正規化名の重複: {duplicates}社を{len(ordered)}グループに集約'
+        )
+    return ordered
+
+
+class SharedResults:
+    """実行中の正規化名 → 検索結果 の共有メモ（スレッドセーフ）。
+
+    同じ正規化名の検索が別ページから同時に要求された場合、
+    最初の呼び出しだけが検索し、他は結果を待って再利用する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def claim(self, normalized: str) -> Tuple[Future, bool]:
+        """正規化名の結果の Future を取得する。
+
+        Returns:
+            (Future, この呼び出しで計算を引き受けたか) のタプル。
+            引き受けた場合は必ず set_result / set_exception すること。
+        """
+        with self._lock:
+            future = self._futures.get(normalized)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[normalized] = future
+        return future, owner
+
+    def get_or_compute(self, normalized: str, compute: Callable) -> Tuple[object, bool]:
+        """結果を取得する。未計算なら compute() を実行する。
+
+        Returns:
+            (結果, この呼び出しで計算したか) のタプル
+        """
+        future, owner = self.claim(normalized)
+        if not owner:
+            return future.result(), False
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result, True
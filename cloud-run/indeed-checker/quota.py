@@ -0,0 +1,121 @@
+"""SerpAPI クエリ予算モジュール
+
+1回の実行ごとの予算と、月間の予算（SerpAPI プランの上限）を管理する。
+月間使用量は Firestore の indeedCheckerQuota/{YYYY-MM} に記録し、
+複数シャード・複数実行で共有する。
+
+企業1社のチェックは最大2クエリ（/cmp/ 検索 + /jobs 確認）を使うため、
+投入前に最大値を予約し、完了時に実際の使用量で精算する。
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from firestore_service import add_quota_usage, get_quota_usage
+
+logger = logging.getLogger(__name__)
+
+# 月間のクエリ上限（0 は無制限）
+SERPAPI_MONTHLY_QUOTA = int(os.environ.get('SERPAPI_MONTHLY_QUOTA', 0))
+
+# 1社のチェックで使う最大クエリ数
+QUERIES_PER_CHECK = 2
+
+
+def current_month(now: Optional[datetime] = None) -> str:
+    """予算を集計する月（UTC の YYYY-MM）。"""
+    return (now or datetime.now(timezone.utc)).strftime('%Y-%m')
+
+
+class QueryBudget:
+    """実行ごと・月ごとのクエリ予算（スレッドセーフ）。
+
+    Args:
+        run_limit: この実行で使えるクエリ数（None なら無制限）
+        monthly_limit: 月間のクエリ上限（0 なら無制限）
+        run_used: この実行で使用済みのクエリ数（再開時に引き継ぐ）
+    """
+
+    def __init__(
+        self,
+        run_limit: Optional[int] = None,
+        monthly_limit: int = SERPAPI_MONTHLY_QUOTA,
+        run_used: int = 0,
+    ):
+        self.run_limit = run_limit
+        self.monthly_limit = monthly_limit
+        self.month = current_month()
+        self.run_used = run_used
+        self.month_used = 0
+        self._reserved = 0
+        self._unflushed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        """予算の上限が設定されているか。"""
+        return self.run_limit is not None or self.monthly_limit > 0
+
+    def load(self) -> None:
+        """Firestore から今月の使用量を読み込む。"""
+        try:
+            month_used = get_quota_usage(self.month)
+        except Exception as e:
+            logger.error(f'クエリ使用量の取得エラー ({self.month}): {e}')
+            return
+        with self._lock:
+            self.month_used = month_used
+
+    def _remaining(self) -> Optional[int]:
+        remaining = []
+        if self.run_limit is not None:
+            remaining.append(self.run_limit - self.run_used - self._reserved)
+        if self.monthly_limit > 0:
+            remaining.append(
+                self.monthly_limit - self.month_used - self._unflushed - self._reserved
+            )
+        return min(remaining) if remaining else None
+
+    def try_reserve(self, queries: int = QUERIES_PER_CHECK) -> bool:
+        """クエリを予約する。予算が足りなければ False を返す。"""
+        with self._lock:
+            remaining = self._remaining()
+            if remaining is not None and remaining < queries:
+                return False
+            self._reserved += queries
+            return True
+
+    def settle(self, reserved: int, used: int) -> None:
+        """予約を解放し、実際に使ったクエリ数を計上する。"""
+        with self._lock:
+            self._reserved -= reserved
+            self.run_used += used
+            self._unflushed += used
+
+    def flush(self) -> None:
+        """未記録の使用量を Firestore に加算し、今月の使用量を読み直す。"""
+        with self._lock:
+            unflushed, self._unflushed = self._unflushed, 0
+        try:
+            month_used = add_quota_usage(self.month, unflushed)
+        except Exception as e:
+            logger.error(f'クエリ使用量の記録エラー ({self.month}): {e}')
+            with self._lock:
+                self._unflushed += unflushed
+            return
+        with self._lock:
+            self.month_used = month_used
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'month': self.month,
+                'runLimit': self.run_limit,
+                'runUsed': self.run_used,
+                'monthlyLimit': self.monthly_limit or None,
+                'monthUsed': self.month_used + self._unflushed,
+                'remaining': self._remaining(),
+            }
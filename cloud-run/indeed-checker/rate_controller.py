@@ -0,0 +1,244 @@
+"""SerpAPI 流量の適応制御モジュール
+
+SerpAPI の応答（レイテンシ・エラー）を見ながら、トークンバケットのレート（ペース）と
+同時リクエスト数の上限を AIMD（加算増加・乗算減少）で調整する。
+
+- 増加: ADAPT_WINDOW 件ごとに、エラー率と p95 レイテンシが目標内で、
+  レート・上限が実際に律速していた（待ちが発生した）場合だけ上げる。
+  最初に下げるまではレートを倍々に（スロースタート）、その後は RATE_STEP ずつ上げる
+- 減少: タイムアウト・HTTP 429・error ペイロードは即座にレートと上限を BACKOFF_FACTOR 倍にする。
+  ウィンドウのエラー率（5xx を含む）や p95 レイテンシが目標を超えた場合は DECREASE_FACTOR 倍。
+  同じ混雑で続けて下げないよう、下げてから COOLDOWN_SECONDS は下げない
+- レートは [min_rate, max_rate]、上限は [min_inflight, max_inflight] の範囲に収める
+- 調整のたびにログを出す
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from metrics import SERPAPI_INFLIGHT_LIMIT, SERPAPI_RATE
+from rate_limiter import ConcurrencyLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 適応制御の有効・無効（無効なら SERPAPI_QPS の固定レート、同時リクエスト数の上限なし）
+SERPAPI_ADAPTIVE = os.environ.get('SERPAPI_ADAPTIVE', '1') == '1'
+
+# レート（リクエスト/秒）と同時リクエスト数の範囲。
+# 上限のデフォルトは従来の固定ペース（約0.33）の少し上に留める。SerpAPI プランの
+# スループット上限・月間クエリ数に余裕がある場合だけ SERPAPI_MAX_QPS で上げる
+SERPAPI_MIN_QPS = float(os.environ.get('SERPAPI_MIN_QPS', 0.1))
+SERPAPI_MAX_QPS = float(os.environ.get('SERPAPI_MAX_QPS', 0.5))
+SERPAPI_MIN_INFLIGHT = 1
+SERPAPI_MAX_INFLIGHT = int(os.environ.get('SERPAPI_MAX_INFLIGHT', 4))
+# 同時リクエスト数の上限の初期値（CHECK_WORKERS のデフォルトと同じ）
+SERPAPI_INFLIGHT = int(os.environ.get('SERPAPI_INFLIGHT', 4))
+
+# 目標: p95 レイテンシ（秒）とエラー率
+SERPAPI_TARGET_LATENCY = float(os.environ.get('SERPAPI_TARGET_LATENCY', 5.0))
+SERPAPI_TARGET_ERROR_RATE = float(os.environ.get('SERPAPI_TARGET_ERROR_RATE', 0.02))
+
+# 何件の応答ごとに増減を判断するか
+ADAPT_WINDOW = 20
+# 加算増加の幅（リクエスト/秒）
+RATE_STEP = 0.1
+# 即時の減少（タイムアウト・429・error ペイロード）とウィンドウでの減少の倍率
+BACKOFF_FACTOR = 0.5
+DECREASE_FACTOR = 0.75
+# 減少の後、次に減少させるまでの秒数
+COOLDOWN_SECONDS = 5.0
+
+# 応答の分類
+OUTCOME_OK = 'ok'
+OUTCOME_ERROR = 'error'                  # 5xx など
+OUTCOME_THROTTLED = 'throttled'          # HTTP 429
+OUTCOME_TIMEOUT = 'timeout'              # タイムアウト・接続エラー
+OUTCOME_ERROR_PAYLOAD = 'error_payload'  # HTTP 200 の error（検索結果なしを除く）
+
+# 即座に減少させる応答（値はログに出す理由）
+BACKOFF_OUTCOMES = {
+    OUTCOME_THROTTLED: 'HTTP 429',
+    OUTCOME_TIMEOUT: 'タイムアウト',
+    OUTCOME_ERROR_PAYLOAD: 'error ペイロード',
+}
+
+
+def _p95(values: List[float]) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class AimdController:
+    """SerpAPI のレートと同時リクエスト数の上限を調整する（スレッドセーフ）。
+
+    Args:
+        bucket: レートを調整するトークンバケット
+        limiter: 上限を調整する同時実行リミッター
+        min_rate, max_rate: レートの範囲
+        min_inflight, max_inflight: 同時リクエスト数の範囲
+        target_latency: p95 レイテンシの目標（秒）
+        target_error_rate: エラー率の目標
+        window: 何件の応答ごとに増減を判断するか
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        limiter: ConcurrencyLimiter,
+        min_rate: float = SERPAPI_MIN_QPS,
+        max_rate: float = SERPAPI_MAX_QPS,
+        min_inflight: int = SERPAPI_MIN_INFLIGHT,
+        max_inflight: int = SERPAPI_MAX_INFLIGHT,
+        target_latency: float = SERPAPI_TARGET_LATENCY,
+        target_error_rate: float = SERPAPI_TARGET_ERROR_RATE,
+        window: int = ADAPT_WINDOW,
+    ):
+        self.bucket = bucket
+        self.limiter = limiter
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.min_inflight = min_inflight
+        self.max_inflight = max(max_inflight, min_inflight)
+        self.target_latency = target_latency
+        self.target_error_rate = target_error_rate
+        self.window = window
+        self._lock = threading.Lock()
+        # (エラーか, レイテンシ, レートで待ったか, 上限で待ったか)
+        self._samples: List[Tuple[bool, Optional[float], bool, bool]] = []
+        self._slow_start = True
+        self._cooldown_until = 0.0
+        self._increases = 0
+        self._decreases = 0
+        self._last_reason: Optional[str] = None
+        self._apply(
+            self._clamp_rate(bucket.rate),
+            self._clamp_inflight(limiter.limit),
+            None,
+        )
+
+    def _clamp_rate(self, rate: float) -> float:
+        return min(self.max_rate, max(self.min_rate, rate))
+
+    def _clamp_inflight(self, limit: int) -> int:
+        return min(self.max_inflight, max(self.min_inflight, limit))
+
+    def _apply(self, rate: float, limit: int, reason: Optional[str]) -> None:
+        """レートと上限を変更し、変わったらログに出す（ロックを取って呼ぶ）。"""
+        old_rate, old_limit = self.bucket.rate, self.limiter.limit
+        if rate != old_rate:
+            self.bucket.set_rate(rate, log=False)
+        if limit != old_limit:
+            self.limiter.set_limit(limit)
+        SERPAPI_RATE.set(rate)
+        SERPAPI_INFLIGHT_LIMIT.set(limit)
+        if reason is not None and (rate != old_rate or limit != old_limit):
+            self._last_reason = reason
+            logger.info(
+                f'SerpAPI 流量を調整: {old_rate:.3f} → {rate:.3f} リクエスト/秒, '
+                f'同時 {old_limit} → {limit} ({reason})'
+            )
+
+    def set_max_rate(self, rate: float, apply: bool = True) -> float:
+        """レートの上限を変更する（/run?qps の指定）。
+
+        apply なら レートも上限の値にする。apply=False（元の上限に戻すとき）は
+        レートを上限内に収めるだけで、そこからは通常どおり増減させる。
+
+        Returns:
+            変更前の上限
+        """
+        with self._lock:
+            previous = self.max_rate
+            self.max_rate = max(rate, self.min_rate)
+            target = rate if apply else self.bucket.rate
+            self._apply(self._clamp_rate(target), self.limiter.limit, f'上限を {rate:g} に指定')
+        return previous
+
+    def record(
+        self,
+        outcome: str,
+        latency: Optional[float] = None,
+        rate_limited: bool = False,
+        queued: bool = False,
+    ) -> None:
+        """1回の SerpAPI リクエストの結果を記録し、必要ならレートと上限を変える。
+
+        Args:
+            outcome: OUTCOME_* のいずれか
+            latency: 応答までの秒数（タイムアウトなどでは None）
+            rate_limited: トークンバケットで待ったか（レートが律速していたか）
+            queued: 同時リクエスト数の上限で待ったか
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((outcome != OUTCOME_OK, latency, rate_limited, queued))
+            if outcome in BACKOFF_OUTCOMES:
+                self._decrease(now, BACKOFF_FACTOR, BACKOFF_OUTCOMES[outcome])
+            if len(self._samples) >= self.window:
+                self._evaluate(now)
+
+    def _decrease(self, now: float, factor: float, reason: str) -> None:
+        if now < self._cooldown_until:
+            return
+        self._slow_start = False
+        self._cooldown_until = now + COOLDOWN_SECONDS
+        self._decreases += 1
+        self._apply(
+            self._clamp_rate(self.bucket.rate * factor),
+            self._clamp_inflight(int(self.limiter.limit * factor)),
+            reason,
+        )
+
+    def _evaluate(self, now: float) -> None:
+        samples, self._samples = self._samples, []
+        errors = sum(1 for error, _, _, _ in samples if error)
+        error_rate = errors / len(samples)
+        p95 = _p95([latency for error, latency, _, _ in samples
+                    if not error and latency is not None])
+
+        if error_rate > self.target_error_rate:
+            self._decrease(now, DECREASE_FACTOR, f'エラー率 {error_rate:.0%}')
+            return
+        if p95 is not None and p95 > self.target_latency:
+            self._decrease(now, DECREASE_FACTOR, f'p95 レイテンシ {p95:.1f}秒')
+            return
+
+        # 目標内でも、レート・上限で待っていなければ上げる意味がない
+        rate_bound = any(rate_limited for _, _, rate_limited, _ in samples)
+        inflight_bound = any(queued for _, _, _, queued in samples)
+        if not rate_bound and not inflight_bound:
+            return
+
+        rate = self.bucket.rate
+        if rate_bound:
+            rate = rate * 2 if self._slow_start else rate + RATE_STEP
+        limit = self.limiter.limit + (1 if inflight_bound else 0)
+        rate, limit = self._clamp_rate(rate), self._clamp_inflight(limit)
+        if rate == self.bucket.rate and limit == self.limiter.limit:
+            return
+        self._increases += 1
+        p95_text = f'{p95:.1f}秒' if p95 is not None else '-'
+        self._apply(
+            rate,
+            limit,
+            f'{"スロースタート" if self._slow_start else "加算増加"}: '
+            f'エラー率 {error_rate:.0%}, p95 {p95_text}',
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rate': round(self.bucket.rate, 3),
+                'inflightLimit': self.limiter.limit,
+                'minRate': self.min_rate,
+                'maxRate': self.max_rate,
+                'slowStart': self._slow_start,
+                'increases': self._increases,
+                'decreases': self._decreases,
+                'lastReason': self._last_reason,
+            }
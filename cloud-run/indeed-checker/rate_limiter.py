@@ -0,0 +1,111 @@
+"""レート制限モジュール
+
+SerpAPI へのリクエストレートをプロセス全体で制御するトークンバケットと、
+同時リクエスト数の上限を変えられるリミッター。
+複数ワーカーから同時に呼ばれても、全体のリクエストレート・同時リクエスト数が
+設定値を超えないようにする。
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット。
+
+    rate（トークン/秒）で補充され、最大 capacity 個まで貯まる。
+    acquire() はトークンが1個以上になるまでブロックする。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError('rate は正の値が必要です')
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def set_rate(self, rate: float, log: bool = True) -> None:
+        """補充レートを変更する（貯まっているトークンは維持）。"""
+        if rate <= 0:
+            raise ValueError('rate は正の値が必要です')
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+        if log:
+            logger.info(f'レート制限を変更: {rate:.3f} リクエスト/秒')
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """トークンを取得する。取得できるまで待機する。
+
+        Args:
+            tokens: 取得するトークン数
+
+        Returns:
+            待機した秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                # 不足分が貯まるまでの時間
+                wait = (tokens - self._tokens) / self.rate
+
+            logger.debug(f'レート制限で{wait:.2f}秒待機')
+            time.sleep(wait)
+            waited += wait
+
+
+class ConcurrencyLimiter:
+    """同時実行数の上限を実行中に変えられるセマフォ（スレッドセーフ）。
+
+    上限を下げても実行中のものは止めず、実行中の数が新しい上限を
+    下回るまで acquire() を待たせる。
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError('limit は1以上が必要です')
+        self.limit = limit
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def set_limit(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError('limit は1以上が必要です')
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+    def acquire(self) -> float:
+        """空きができるまで待って1つ確保する。
+
+        Returns:
+            待機した秒数
+        """
+        waited = 0.0
+        with self._cond:
+            while self._active >= self.limit:
+                started = time.monotonic()
+                self._cond.wait()
+                waited += time.monotonic() - started
+            self._active += 1
+        return waited
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
@@ -0,0 +1,169 @@
+"""アーカイブ再判定モジュール
+
+SerpAPI アーカイブ（serp_archive）に保存したレスポンスだけを使って
+全アクティブ企業の check_company_indeed をやり直し、Firestore の現在の
+indeedStatus との差分を NDJSON で出力する。SerpAPI へのリクエストも
+Firestore への書き込みもしない（企業の読み取りのみ）。
+
+/cmp/ URL の抽出や企業名の照合ルールを変えたときの影響を、
+有料の再検索なしで確認するために使う。
+
+使い方（cloud-run/indeed-checker で実行）:
+    python replay.py --archive /path/to/archive > diff.ndjson
+    python replay.py --archive gs://bucket/serp-archive --jobs-check single --all
+
+差分の種類（change）:
+    detected     掲載なし → 掲載あり
+    undetected   掲載あり → 掲載なし
+    url_changed  企業ページ URL が変わった
+    jobs_changed /jobs の有無が変わった（両方で確認済みの場合のみ）
+    unchecked    Firestore に判定結果がない
+    missing      アーカイブにないクエリがあった（記録後に追加・改名された企業など）
+    error        その他のエラー
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CHANGES = (
+    'detected',
+    'undetected',
+    'url_changed',
+    'jobs_changed',
+    'unchecked',
+    'missing',
+    'error',
+)
+
+
+def diff_status(status: Optional[dict], result) -> Optional[str]:
+    """現在の indeedStatus と再判定の結果の差分の種類（差分がなければ None）。"""
+    if result.error:
+        return 'error'
+    if not status or 'detected' not in status:
+        return 'unchecked'
+    if bool(status.get('detected')) != result.detected:
+        return 'detected' if result.detected else 'undetected'
+    if not result.detected:
+        return None
+    if status.get('indeedUrl') != result.indeed_url:
+        return 'url_changed'
+    before_jobs = status.get('hasJobsPage')
+    if None not in (before_jobs, result.has_jobs_page) and before_jobs != result.has_jobs_page:
+        return 'jobs_changed'
+    return None
+
+
+def replay_companies(
+    companies: Iterable[dict],
+    jobs_check: str,
+    include_unchanged: bool = False,
+) -> Iterator[dict]:
+    """企業ごとにアーカイブで再判定し、差分のレコードを返すジェネレーター。
+
+    同じ正規化名の企業は1回だけ再判定する。最後に {"summary": ...} を返す。
+    """
+    from indeed_checker import check_company_indeed
+    from normalization import normalize_company_name
+    from serp_archive import get_serp_archive
+
+    archive = get_serp_archive()
+    started = time.monotonic()
+    summary = {'companies': 0, 'replayed': 0, 'unchanged': 0}
+    summary.update({change: 0 for change in CHANGES})
+    memo = {}
+
+    for company in companies:
+        summary['companies'] += 1
+        normalized = normalize_company_name(company.get('name', ''))
+        if normalized not in memo:
+            misses = archive.stats()['misses']
+            result = check_company_indeed(
+                company, use_cache=False, jobs_check=jobs_check
+            )
+            missed = archive.stats()['misses'] > misses
+            memo[normalized] = (result, missed)
+            summary['replayed'] += 1
+        result, missed = memo[normalized]
+
+        status = company.get('indeedStatus') or {}
+        change = diff_status(status, result)
+        if missed and change is not None:
+            change = 'missing'
+        summary[change or 'unchanged'] += 1
+        if change is None and not include_unchanged:
+            continue
+        yield {
+            'companyId': company.get('id'),
+            'name': company.get('name'),
+            'change': change,
+            'before': {
+                'detected': status.get('detected'),
+                'indeedUrl': status.get('indeedUrl'),
+                'hasJobsPage': status.get('hasJobsPage'),
+            },
+            'after': {
+                'detected': result.detected,
+                'indeedUrl': result.indeed_url,
+                'hasJobsPage': result.has_jobs_page,
+                'error': result.error,
+            },
+        }
+
+    summary['archive'] = archive.stats()
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    yield {'summary': summary}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='SerpAPI アーカイブで再判定し、差分を出力する')
+    parser.add_argument(
+        '--archive',
+        default=os.environ.get('SERP_ARCHIVE_PATH', ''),
+        help='アーカイブのパス（ディレクトリ or gs://…、省略時は SERP_ARCHIVE_PATH）',
+    )
+    parser.add_argument(
+        '--jobs-check',
+        default=os.environ.get('JOBS_CHECK_MODE', 'full'),
+        help='/jobs の確認方法（記録したときの設定に合わせる）',
+    )
+    parser.add_argument('--all', action='store_true', help='差分のない企業も出力する')
+    parser.add_argument('--limit', type=int, help='再判定する企業数の上限')
+    args = parser.parse_args(argv)
+
+    if not args.archive:
+        parser.error('--archive または SERP_ARCHIVE_PATH が必要です')
+
+    # チェッカーのモジュールは読み込み時に設定を読むので、その前に replay モードにする。
+    # 検索結果キャッシュは参照も更新もしない。API キーは送信されない（ダミーで可）
+    os.environ['SERP_ARCHIVE_PATH'] = args.archive
+    os.environ['SERP_ARCHIVE_MODE'] = 'replay'
+    os.environ['INDEED_CACHE_BACKEND'] = 'none'
+    os.environ.setdefault('SERPAPI_KEY', 'replay')
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    from firestore_service import iter_active_companies
+    from indeed_checker import JOBS_CHECK_MODES
+
+    if args.jobs_check not in JOBS_CHECK_MODES:
+        parser.error(f'--jobs-check は {" / ".join(JOBS_CHECK_MODES)} のいずれかで指定してください')
+
+    companies = iter_active_companies()
+    if args.limit:
+        companies = (company for _, company in zip(range(args.limit), companies))
+
+    for record in replay_companies(companies, args.jobs_check, include_unchanged=args.all):
+        print(json.dumps(record, ensure_ascii=False, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
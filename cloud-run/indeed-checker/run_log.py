@@ -0,0 +1,127 @@
+"""実行結果ログモジュール
+
+一括チェックの企業ごとの結果を、実行IDごとの NDJSON ファイルに追記する。
+結果をメモリやレスポンスに溜め込まず、/runs/<runId>/results で
+ストリーミングして返す。
+
+Cloud Run の /tmp はメモリ上にあるため、新しい実行を始めるたびに
+RUN_RESULTS_RETENTION_HOURS より前に更新が止まったログを削除する。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# 結果ログの保存先ディレクトリ
+RESULTS_DIR = os.environ.get('RUN_RESULTS_DIR', '/tmp/indeed-checker-runs')
+
+# 結果ログを残す時間（最後の追記からの時間。0 なら削除しない）
+RETENTION_HOURS = float(os.environ.get('RUN_RESULTS_RETENTION_HOURS', 24))
+
+# 追記中のログを追いかけるときのポーリング間隔（秒）
+FOLLOW_INTERVAL = 0.5
+
+
+def result_log_path(run_id: str) -> str:
+    """実行IDに対応する結果ログのパス。"""
+    # 実行IDはパスの一部になるため、ディレクトリ区切りを含めない
+    safe_id = run_id.replace('/', '_').replace('..', '_')
+    return os.path.join(RESULTS_DIR, f'{safe_id}.ndjson')
+
+
+def prune_result_logs(now: Optional[float] = None) -> int:
+    """保存期間を過ぎた結果ログを削除する。
+
+    Args:
+        now: 現在時刻（UNIX 時間。None なら time.time()）
+
+    Returns:
+        削除したファイル数
+    """
+    if RETENTION_HOURS <= 0 or not os.path.isdir(RESULTS_DIR):
+        return 0
+    cutoff = (now if now is not None else time.time()) - RETENTION_HOURS * 3600
+    removed = 0
+    for entry in os.scandir(RESULTS_DIR):
+        if not entry.name.endswith('.ndjson'):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f'結果ログの削除に失敗: {entry.path} ({e})')
+    if removed:
+        logger.info(f'保存期間を過ぎた結果ログを削除: {removed}件')
+    return removed
+
+
+class ResultLog:
+    """企業ごとの結果を NDJSON で追記するログ（スレッドセーフ）。
+
+    再開時は同じファイルに追記する。開くときに保存期間を過ぎた他のログを削除する。
+    """
+
+    def __init__(self, run_id: str):
+        self.path = result_log_path(run_id)
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        prune_result_logs()
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def iter_result_lines(
+    run_id: str,
+    is_running: Optional[Callable[[], bool]] = None,
+) -> Iterator[str]:
+    """結果ログを1行ずつ返す。
+
+    is_running が True を返す間は、ファイル末尾に達しても追記を待ち続ける。
+
+    Args:
+        run_id: 実行ID
+        is_running: 実行中かどうかを返す関数（None なら現在の内容だけを返す）
+
+    Yields:
+        NDJSON の1行（改行付き）
+    """
+    path = result_log_path(run_id)
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        while True:
+            line = f.readline()
+            if line:
+                buffer += line
+                if buffer.endswith('\n'):
+                    yield buffer
+                    buffer = ''
+                continue
+            if is_running is None or not is_running():
+                # 実行終了後にもう一度だけ読み切る
+                rest = buffer + f.read()
+                for remaining in rest.splitlines():
+                    if remaining:
+                        yield remaining + '\n'
+                return
+            time.sleep(FOLLOW_INTERVAL)
+
+
+def has_result_log(run_id: str) -> bool:
+    """このインスタンスに結果ログがあるか。"""
+    return os.path.exists(result_log_path(run_id))
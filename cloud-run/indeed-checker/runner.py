@@ -0,0 +1,1023 @@
+"""一括チェック実行モジュール
+
+/run から呼ばれる一括チェックの本体。
+企業をストリームで受け取り、正規化名でグループ化してワーカープールでチェックし、
+結果を Firestore にバッチ書き込みする。
+
+各段階は上限付きのキューでつながり、後ろの段階が詰まると前の段階が待つ:
+    scan     企業のページ取得（バックグラウンドで prefetch_pages ページまで先読み）
+    plan     正規化名によるグループ化（PLAN_CHUNK_SIZE 社ずつ）
+    search   SerpAPI 検索（workers 並列、投入済み・未完了は workers × INFLIGHT_PER_WORKER まで）
+    resolve  detectedBy の判定と書き込み内容の作成（検索ワーカー上。求人索引を引くだけで I/O なし）
+    write    WriteBatch のコミット（WRITE_WORKERS 並列、コミット待ちは WRITE_QUEUE_DEPTH バッチまで）
+Firestore の読み書きは search と別のスレッドで行うので、実行のペースは検索（レート制限）だけで決まる。
+
+実行ごとに実行IDを発行し、一定件数ごとに「どこまで終わったか」
+（スキャン順で連続して完了した最後の企業ID）と途中集計を Firestore に保存する。
+タイムアウトや再起動で中断しても、/run?resume=<runId>（省略時は未完了の最後の実行）で続きから再開できる。
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from firestore_service import (
+    BatchWriter,
+    JobsIndex,
+    build_jobs_index,
+    has_agent_exported_jobs,
+    is_status_current,
+    is_status_unchanged,
+    save_run_state,
+    update_company_indeed_status,
+    update_company_jobs_page,
+    update_jobs_indeed_control,
+)
+from indeed_checker import (
+    JOBS_CHECK_MODE,
+    MAX_SEARCH_BATCH,
+    SEARCH_BATCH_SIZE,
+    IndeedCheckResult,
+    check_companies_batched,
+    check_company_indeed,
+    check_jobs_page,
+    get_serpapi_client,
+    serpapi_rate,
+)
+from lookup_cache import get_lookup_cache
+from metrics import COMPANIES_CHECKED, COMPANIES_INFLIGHT, STAGE_SECONDS, stage, stage_summary
+from planner import CheckGroup, SharedResults, plan_check_groups
+from lease import RunLease
+from quota import QUERIES_PER_CHECK, QueryBudget
+from run_log import ResultLog
+from scheduler import due_reason, next_schedule
+from slug_index import SlugIndex, build_slug_index
+
+logger = logging.getLogger(__name__)
+
+# 並列ワーカー数
+CHECK_WORKERS = int(os.environ.get('CHECK_WORKERS', 4))
+MAX_CHECK_WORKERS = 32
+
+# 何社ずつまとめてグループ化するか（企業スキャンのページサイズと揃える）
+PLAN_CHUNK_SIZE = 200
+
+# ワーカー1つあたりの投入済み・未完了グループの上限（メモリを一定に保つ）
+INFLIGHT_PER_WORKER = 4
+
+# WriteBatch をコミットする専用スレッド数と、コミット待ちのバッチ数の上限。
+# 2以上にするとバッチ間のコミット順は保証されない（1実行で同じドキュメントを
+# 書くのは後追いの /jobs 確認だけで、その前にすべてコミットする）
+WRITE_WORKERS = int(os.environ.get('WRITE_WORKERS', 1))
+MAX_WRITE_WORKERS = 8
+WRITE_QUEUE_DEPTH = int(os.environ.get('WRITE_QUEUE_DEPTH', 2))
+
+# 何社完了するごとにチェックポイントを保存するか
+CHECKPOINT_EVERY = int(os.environ.get('CHECKPOINT_EVERY', 50))
+
+# Cloud Run のリクエストタイムアウト（gcloud run deploy --timeout と揃える）と、
+# 投入を止めてから残りの完了待ち・コミット・チェックポイント保存に見込む秒数
+SERVICE_TIMEOUT_SECONDS = float(os.environ.get('SERVICE_TIMEOUT_SECONDS', 900))
+RUN_TIME_MARGIN_SECONDS = float(os.environ.get('RUN_TIME_MARGIN_SECONDS', 120))
+
+# 1回の /run で処理する最大秒数（デフォルトはサービスのタイムアウトから余裕分を引いた値）。
+# 超えたら新規投入を止め、チェックポイントを保存して partial で返す。0 は無制限。
+RUN_TIME_BUDGET_SECONDS = float(os.environ.get(
+    'RUN_TIME_BUDGET_SECONDS',
+    max(SERVICE_TIMEOUT_SECONDS - RUN_TIME_MARGIN_SECONDS, SERVICE_TIMEOUT_SECONDS / 2),
+))
+
+# 優先度の並べ替えで、未チェックの企業の最終チェック日時として扱う値
+NEVER_CHECKED = datetime.min.replace(tzinfo=timezone.utc)
+
+# チェックポイントに保存する集計項目
+COUNTER_KEYS = [
+    'total', 'checked', 'detected', 'not_detected', 'errors', 'jobs_updated', 'not_due',
+]
+
+
+# このプロセスで実行中の CheckRun（/runs/<runId> の進捗表示用）
+_active_runs: Dict[str, 'CheckRun'] = {}
+_active_runs_lock = threading.Lock()
+
+
+def get_active_run(run_id: str) -> Optional['CheckRun']:
+    """このプロセスで実行中の CheckRun を返す（なければ None）。"""
+    with _active_runs_lock:
+        return _active_runs.get(run_id)
+
+
+def new_run_id() -> str:
+    """実行IDを発行する（日時 + ランダム）。"""
+    now = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    return f'{now}-{uuid.uuid4().hex[:6]}'
+
+
+class ProgressCursor:
+    """スキャン順に完了を追跡し、再開位置を求める。
+
+    並列実行では完了順がスキャン順と一致しないため、
+    「スキャン順で先頭から連続して完了した最後の企業ID」を再開位置とし、
+    その範囲の集計だけを確定済み（committed）として扱う。
+
+    ordered=False（優先度順の実行）ではスキャン順が再開に使えないため、
+    cursor は追跡せず、完了した企業の集計をそのまま確定し、完了した企業IDを done に記録する
+    （再開時はこれで飛ばす。変化のない企業は書き込まないので lastCheckedAt では判定できない）。
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        counters: Optional[dict] = None,
+        ordered: bool = True,
+        done: Optional[Iterable[str]] = None,
+    ):
+        self.cursor = cursor
+        self.ordered = ordered
+        self.counters = {key: 0 for key in COUNTER_KEYS}
+        self.counters.update(counters or {})
+        self.done: Set[str] = set(done or ())
+        # company_id → 完了時の counts（未完了は None）
+        self._pending: 'OrderedDict[str, Optional[dict]]' = OrderedDict()
+
+    def scanned(self, company_id: str) -> None:
+        if self.ordered:
+            self._pending[company_id] = None
+
+    def _commit(self, counts: dict) -> None:
+        self.counters['total'] += 1
+        for key, value in counts.items():
+            if key in self.counters:
+                self.counters[key] += value
+
+    def completed(self, company_id: str, counts: dict) -> None:
+        if not self.ordered:
+            if company_id not in self.done:
+                self.done.add(company_id)
+                self._commit(counts)
+            return
+        if company_id not in self._pending:
+            return
+        self._pending[company_id] = counts
+        while self._pending:
+            first_id, first_counts = next(iter(self._pending.items()))
+            if first_counts is None:
+                break
+            self._pending.popitem(last=False)
+            self.cursor = first_id
+            self._commit(first_counts)
+
+
+def apply_result(
+    company: dict,
+    result: IndeedCheckResult,
+    writer: Optional[BatchWriter] = None,
+    jobs_index: Optional[JobsIndex] = None,
+) -> tuple:
+    """チェック結果を1社分の Firestore データに反映する。
+
+    Args:
+        company: Firestore の企業ドキュメント
+        result: check_company_indeed の結果
+        writer: 書き込みをまとめるバッチライター（None なら即時書き込み）
+        jobs_index: 求人索引（None なら企業ごとにクエリする）
+
+    Returns:
+        (detail, counts) のタプル。counts はサマリーへの加算値。
+    """
+    company_id = company.get('id', '')
+    company_name = company.get('name', '不明')
+    counts = {
+        'checked': 0,
+        'detected': 0,
+        'not_detected': 0,
+        'errors': 0,
+        'jobs_updated': 0,
+    }
+
+    detail = {
+        'companyId': company_id,
+        'companyName': company_name,
+        'result': result.to_dict(),
+    }
+
+    current_status = company.get('indeedStatus') or {}
+    now = datetime.now(timezone.utc)
+
+    if result.error:
+        # エラーの場合は前回の状態を維持し、エラーだけ記録（次回の実行で再チェック）
+        counts['errors'] += 1
+        try:
+            update_company_indeed_status(
+                company_id=company_id,
+                detected=current_status.get('detected', False),
+                detected_by=current_status.get('detectedBy'),
+                indeed_url=current_status.get('indeedUrl'),
+                error=result.error,
+                current=current_status,
+                writer=writer,
+                schedule=next_schedule(company, False, result.error, now),
+            )
+        except Exception as e:
+            logger.error(f'Firestore更新エラー ({company_id}): {e}')
+        return detail, counts
+
+    counts['checked'] += 1
+    COMPANIES_CHECKED.inc()
+
+    # detectedBy を判定
+    detected_by = None
+    if result.detected:
+        counts['detected'] += 1
+        # Agent経由のエクスポート済み求人があるか確認
+        if has_agent_exported_jobs(company_id, jobs_index=jobs_index):
+            detected_by = 'agent'
+        else:
+            detected_by = 'external'
+        detail['detectedBy'] = detected_by
+    else:
+        counts['not_detected'] += 1
+
+    # Firestore 更新: 企業（同じ結果が続くほど次回チェックを先に延ばす）
+    unchanged = is_status_unchanged(
+        current_status, result.detected, detected_by, result.indeed_url
+    )
+    has_jobs_page = result.has_jobs_page if result.detected else None
+    # 期限前にチェックした企業（full・/check-batch・変更監視）で何も変わっていなければ書き込まない。
+    # 保存済みの nextCheckAt はそのまま有効（期限が来た企業はスケジュールを進めるため書き込む）
+    if due_reason(company, now) is None and is_status_current(
+        current_status, result.detected, detected_by, result.indeed_url, has_jobs_page
+    ):
+        if writer is not None:
+            writer.skip('companies')
+    else:
+        try:
+            with stage('company_write'):
+                update_company_indeed_status(
+                    company_id=company_id,
+                    detected=result.detected,
+                    detected_by=detected_by,
+                    indeed_url=result.indeed_url,
+                    current=current_status,
+                    writer=writer,
+                    schedule=next_schedule(company, unchanged, None, now),
+                    has_jobs_page=has_jobs_page,
+                    verified=result.detected and not result.cached and not result.indexed,
+                )
+        except Exception as e:
+            logger.error(f'企業ステータス更新エラー ({company_id}): {e}')
+            counts['errors'] += 1
+
+    # Firestore 更新: 求人（can_post は detected の逆）
+    can_post = not result.detected
+    try:
+        with stage('jobs_write'):
+            updated_count = update_jobs_indeed_control(
+                company_id, can_post, writer=writer, jobs_index=jobs_index
+            )
+        counts['jobs_updated'] += updated_count
+        detail['jobsUpdated'] = updated_count
+    except Exception as e:
+        logger.error(f'求人ステータス更新エラー ({company_id}): {e}')
+        counts['errors'] += 1
+
+    return detail, counts
+
+
+class CheckRun:
+    """1回分の一括チェック実行。
+
+    Args:
+        workers: 並列ワーカー数
+        use_cache: 検索結果キャッシュとスラッグ索引を参照するか
+        run_id: 実行ID（省略時は新規発行）
+        time_budget: 処理する最大秒数（0 なら無制限）
+        shard: 担当するシャード番号（shards と組で指定）
+        shards: シャード数（1 ならシャーディングなし）
+        full: True なら次回チェック日時に関係なく全企業をチェックする
+        budget: この実行で使える SerpAPI クエリ数（None なら無制限）
+        jobs_check: /jobs サブページの確認方法（indeed_checker.JOBS_CHECK_MODES）
+        search_batch: 1クエリに OR でまとめる企業名の数（1 ならまとめない）
+        company_ids: チェックする企業が決まっている場合の企業ID
+            （求人索引をこの企業の求人だけで作る。None なら全求人）
+        write_workers: WriteBatch をコミットする専用スレッド数
+        qps: この実行の間だけ使う SerpAPI リクエストレート（適応制御では上限。None なら変えない）
+
+    クエリ予算（実行ごと・月間）が設定されている場合は、企業を優先度順
+    （未チェック → 募集中の求人が多い → 最終チェックが古い）に並べ替えてから
+    チェックし、予算が尽きたら status='partial' で止める。
+    """
+
+    def __init__(
+        self,
+        workers: int = CHECK_WORKERS,
+        use_cache: bool = True,
+        run_id: Optional[str] = None,
+        time_budget: float = RUN_TIME_BUDGET_SECONDS,
+        shard: int = 0,
+        shards: int = 1,
+        full: bool = False,
+        budget: Optional[int] = None,
+        jobs_check: str = JOBS_CHECK_MODE,
+        search_batch: int = SEARCH_BATCH_SIZE,
+        company_ids: Optional[List[str]] = None,
+        write_workers: int = WRITE_WORKERS,
+        qps: Optional[float] = None,
+    ):
+        self.workers = max(1, min(workers, MAX_CHECK_WORKERS))
+        self.use_cache = use_cache
+        self.run_id = run_id or new_run_id()
+        if shards > 1 and not run_id:
+            self.run_id = f'{self.run_id}-shard{shard}of{shards}'
+        self.time_budget = time_budget
+        self.shard = shard
+        self.shards = shards
+        self.full = full
+        self.budget = QueryBudget(run_limit=budget)
+        self.progress = ProgressCursor(ordered=not self.prioritized)
+        self.jobs_check = jobs_check
+        self.search_batch = max(1, min(search_batch, MAX_SEARCH_BATCH))
+        self.company_ids = company_ids
+        self.qps = qps
+        # jobs_check='deferred' で後から /jobs を確認する企業（indeedUrl ごと）
+        self._deferred_jobs: Dict[str, dict] = {}
+        # 呼び出し元が取得した実行リース（失ったら新規投入を止める）
+        self.lease: Optional[RunLease] = None
+        self.write_workers = max(1, min(write_workers, MAX_WRITE_WORKERS))
+        self.writer = BatchWriter(
+            commit_workers=self.write_workers, max_pending=WRITE_QUEUE_DEPTH
+        )
+        self.shared_results = SharedResults()
+        self.slice = 1
+        self.summary = {
+            'runId': self.run_id,
+            'status': 'pending',
+            'results': f'/runs/{self.run_id}/results',
+            'total': 0,
+            'processed': 0,
+            'checked': 0,
+            'detected': 0,
+            'not_detected': 0,
+            'errors': 0,
+            'jobs_updated': 0,
+            'not_due': 0,
+            'workers': self.workers,
+            'write_workers': self.write_workers,
+            'shard': shard if shards > 1 else None,
+            'shards': shards,
+            'full': full,
+            'stopReason': None,
+            'jobs_check': {'mode': jobs_check, 'deferred': 0, 'checked': 0, 'found': 0},
+            'search_batch': {
+                'size': self.search_batch,
+                'queries': 0,
+                'batched': 0,
+                'resolved': 0,
+                'fallback': 0,
+            },
+            'due': {'new': 0, 'renamed': 0, 'error': 0, 'due': 0},
+            'dedup': {
+                'groups': 0,
+                'duplicates': 0,
+                'queries_saved': 0,
+            },
+        }
+        self._summary_lock = threading.Lock()
+        self._since_checkpoint = 0
+        self._jobs_index_future = None
+        self._slug_index_future = None
+        self._result_log = None
+        self._start_time = None
+        self._checkpoint_executor: Optional[ThreadPoolExecutor] = None
+
+    def snapshot(self) -> dict:
+        """実行中のサマリーのコピーを返す（別スレッドから呼べる）。"""
+        with self._summary_lock:
+            snapshot = copy.deepcopy(self.summary)
+        if self._start_time is not None and 'elapsed_seconds' not in snapshot:
+            snapshot['elapsed_seconds'] = round(time.time() - self._start_time, 1)
+        return snapshot
+
+    @property
+    def prioritized(self) -> bool:
+        """企業を優先度順に並べ替えてチェックするか（予算の上限があるとき）。"""
+        return self.budget.limited
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """再開位置（この企業IDより後から再開する）。
+
+        優先度順の実行ではスキャン順とドキュメントID順が一致しないため None
+        （再開時は全企業をスキャンし直し、この実行でチェック済みの企業を飛ばす）。
+        """
+        if self.prioritized:
+            return None
+        return self.progress.cursor
+
+    def restore(self, state: dict) -> None:
+        """保存されたチェックポイントから再開できるよう状態を復元する。
+
+        Args:
+            state: get_run_state で取得した実行状態
+        """
+        # シャードの割り当ては最初の実行と同じにする
+        self.shard = state.get('shard', 0)
+        self.shards = state.get('shards', 1)
+        self.summary['shard'] = self.shard if self.shards > 1 else None
+        self.summary['shards'] = self.shards
+        self.full = state.get('full', False)
+        self.summary['full'] = self.full
+        self.jobs_check = state.get('jobsCheck', self.jobs_check)
+        if self.qps is None:
+            self.qps = state.get('qps')
+        self.summary['jobs_check']['mode'] = self.jobs_check
+        budget = state.get('budget') or {}
+        if self.budget.run_limit is None:
+            self.budget.run_limit = budget.get('runLimit')
+        self.budget.run_used = budget.get('runUsed', 0)
+        self.progress = ProgressCursor(
+            state.get('cursor'),
+            state.get('counters') or {},
+            ordered=not self.prioritized,
+            done=state.get('done'),
+        )
+        for key in COUNTER_KEYS:
+            self.summary[key] = self.progress.counters[key]
+        self.summary['processed'] = self.progress.counters['total']
+        self.slice = state.get('slices', 0) + 1
+        logger.info(
+            f'実行 {self.run_id} を再開: cursor={self.cursor}, '
+            f'処理済み{self.progress.counters["total"]}社'
+        )
+
+    def _checkpoint(self, status: str, wait: bool = True, **extra) -> None:
+        """書き込みをコミットしてからチェックポイントを保存する。
+
+        cursor より前の企業の書き込みは必ずコミット済みになる。
+        wait=False なら、コミットの完了待ちと保存をチェックポイント用スレッドで行い、
+        呼び出し元（投入・集計のループ）は Firestore を待たない（保存は呼んだ順）。
+        """
+        state = {
+            'status': status,
+            'cursor': self.cursor,
+            'counters': dict(self.progress.counters),
+            # 優先度順の実行で完了した企業ID（スキャン順の実行では cursor で足りる）
+            'done': None if self.progress.ordered else sorted(self.progress.done),
+            'slices': self.slice,
+            'shard': self.shard,
+            'shards': self.shards,
+            'full': self.full,
+            'jobsCheck': self.jobs_check,
+            'qps': self.qps,
+            'budget': {
+                'runLimit': self.budget.run_limit,
+                'runUsed': self.budget.run_used,
+            },
+            **extra,
+        }
+        self._since_checkpoint = 0
+        commits = self.writer.flush(wait=False)
+
+        def _save() -> None:
+            try:
+                for future in commits:
+                    future.result()
+            except Exception as e:
+                # コミットできていない書き込みより後ろを cursor として保存しない
+                logger.error(f'バッチコミットエラー（チェックポイントを保存しません）: {e}')
+                return
+            self.budget.flush()
+            try:
+                save_run_state(self.run_id, state)
+            except Exception as e:
+                logger.error(f'チェックポイント保存エラー ({self.run_id}): {e}')
+
+        if not wait and self._checkpoint_executor is not None:
+            self._checkpoint_executor.submit(_save)
+            return
+        if self._checkpoint_executor is not None:
+            # 先に投入した保存が後から上書きしないよう、完了を待ってから保存する
+            self._checkpoint_executor.shutdown(wait=True)
+            self._checkpoint_executor = None
+        _save()
+
+    def _slug_index(self) -> Optional[SlugIndex]:
+        """スラッグ索引（構築に失敗した・使わない場合は None）。
+
+        求人索引と違い、なくても検索で判定できるので失敗しても中断しない。
+        """
+        if self._slug_index_future is None:
+            return None
+        try:
+            return self._slug_index_future.result()
+        except Exception as e:
+            logger.error(f'スラッグ索引の構築エラー（索引なしで続行）: {e}')
+            self._slug_index_future = None
+            return None
+
+    def _apply_group(self, group: CheckGroup, result: IndeedCheckResult) -> list:
+        """グループの全企業にチェック結果を反映する（ワーカースレッドで実行）。
+
+        Returns:
+            企業ごとの (company, detail, counts) のリスト
+        """
+        # 求人索引はスキャンと並行して構築しているので、書き込み直前に待つ
+        jobs_index = self._jobs_index_future.result()
+
+        # 検索で確認した企業ページは、同じ実行の後続の企業でも索引から引けるようにする
+        slug_index = self._slug_index()
+        if (slug_index is not None and result.detected
+                and not result.cached and not result.indexed):
+            now = datetime.now(timezone.utc)
+            for company in group.companies:
+                slug_index.add(
+                    result.indeed_url,
+                    name=company.get('name', ''),
+                    verified_at=now,
+                )
+
+        outcomes = []
+        for company in group.companies:
+            try:
+                detail, counts = apply_result(
+                    company, result, self.writer, jobs_index
+                )
+            except Exception as e:
+                logger.error(f'チェック処理エラー ({company.get("id", "")}): {e}')
+                detail = None
+                counts = {'errors': 1}
+            outcomes.append((company, detail, counts))
+        return outcomes
+
+    def _process_group(self, group: CheckGroup) -> tuple:
+        """同じ正規化名の企業グループを1回だけ検索し、全企業に反映する
+        （ワーカースレッドで実行）。
+
+        Returns:
+            (result, searched, outcomes) のタプル。searched はこのグループで
+            検索を実行したか、outcomes は企業ごとの (company, detail, counts)。
+        """
+        def _check():
+            return check_company_indeed(
+                group.representative,
+                use_cache=self.use_cache,
+                jobs_check=self.jobs_check,
+                slug_index=self._slug_index(),
+            )
+
+        # Indeed チェック実行（代表企業の名前で1回だけ。別ページの同名企業とも共有）
+        if group.normalized:
+            result, searched = self.shared_results.get_or_compute(
+                group.normalized, _check
+            )
+        else:
+            result, searched = _check(), True
+
+        return result, searched, self._apply_group(group, result)
+
+    def _process_batch(self, groups: List[CheckGroup]) -> List[tuple]:
+        """複数グループを OR 検索1回にまとめてチェックし、全企業に反映する
+        （ワーカースレッドで実行）。
+
+        別ページで同じ正規化名を検索中・検索済みのグループは、その結果を待って使う。
+
+        Returns:
+            グループごとの (result, searched, outcomes) のリスト
+        """
+        claims = [self.shared_results.claim(group.normalized) for group in groups]
+        owned = [
+            (group, future)
+            for group, (future, owner) in zip(groups, claims)
+            if owner
+        ]
+
+        if owned:
+            try:
+                results, stats = check_companies_batched(
+                    [group.representative for group, _ in owned],
+                    use_cache=self.use_cache,
+                    jobs_check=self.jobs_check,
+                    slug_index=self._slug_index(),
+                )
+            except BaseException as e:
+                for _, future in owned:
+                    future.set_exception(e)
+                raise
+            for (_, future), result in zip(owned, results):
+                future.set_result(result)
+            with self._summary_lock:
+                batch_summary = self.summary['search_batch']
+                if stats['batched']:
+                    batch_summary['queries'] += 1
+                for key, value in stats.items():
+                    batch_summary[key] += value
+
+        processed = []
+        for group, (future, owner) in zip(groups, claims):
+            result = future.result()
+            processed.append((result, owner, self._apply_group(group, result)))
+        return processed
+
+    def _process(self, groups: List[CheckGroup]) -> List[tuple]:
+        if len(groups) == 1:
+            return [self._process_group(groups[0])]
+        return self._process_batch(groups)
+
+    @staticmethod
+    def _reservation(groups: List[CheckGroup]) -> int:
+        """投入単位ごとに予約するクエリ数（一括検索ならその1クエリを加える）。"""
+        return QUERIES_PER_CHECK * len(groups) + (1 if len(groups) > 1 else 0)
+
+    def _collect(self, future, groups: List[CheckGroup]) -> None:
+        """完了した投入単位の結果を集計し、結果ログに書き出す（メインスレッドで実行）。"""
+        COMPANIES_INFLIGHT.dec(sum(len(group.companies) for group in groups))
+        try:
+            processed = future.result()
+        except Exception as e:
+            logger.error(
+                f'チェック処理エラー ({groups[0].representative.get("id", "")}): {e}'
+            )
+            self.budget.settle(self._reservation(groups), 0)
+            companies = [company for group in groups for company in group.companies]
+            with self._summary_lock:
+                self.summary['errors'] += len(companies)
+                self.summary['processed'] += len(companies)
+            for company in companies:
+                self.progress.completed(company.get('id', ''), {'errors': 1})
+                self._result_log.append({
+                    'companyId': company.get('id', ''),
+                    'companyName': company.get('name', '不明'),
+                    'error': str(e),
+                })
+            self._since_checkpoint += len(companies)
+            return
+
+        self.budget.settle(
+            self._reservation(groups),
+            sum(result.queries for result, searched, _ in processed if searched),
+        )
+        for group, (result, searched, outcomes) in zip(groups, processed):
+            self._collect_group(group, result, searched, outcomes)
+
+        if self._since_checkpoint >= CHECKPOINT_EVERY:
+            self._checkpoint('running', wait=False)
+
+    def _collect_group(
+        self,
+        group: CheckGroup,
+        result: IndeedCheckResult,
+        searched: bool,
+        outcomes: list,
+    ) -> None:
+        for company, detail, counts in outcomes:
+            self.progress.completed(company.get('id', ''), counts)
+            self._since_checkpoint += 1
+            with self._summary_lock:
+                self.summary['processed'] += 1
+                for key, value in counts.items():
+                    self.summary[key] += value
+                processed = self.summary['processed']
+            if detail is None:
+                continue
+            if (self.jobs_check == 'deferred' and result.detected
+                    and result.has_jobs_page is None):
+                self._defer_jobs_check(group.normalized, result.indeed_url, company)
+            self._result_log.append(detail)
+            logger.info(
+                f'[{processed}] 完了: '
+                f'{detail["companyName"]} (ID: {company.get("id", "")})'
+            )
+
+        # 重複企業の分だけ検索クエリを節約できた
+        # （別ページで検索済みの名前ならグループ全体が重複扱い）
+        saved = len(group.companies) - (1 if searched else 0)
+        with self._summary_lock:
+            if not searched:
+                self.summary['dedup']['duplicates'] += 1
+            self.summary['dedup']['queries_saved'] += result.queries * saved
+
+    def _defer_jobs_check(
+        self,
+        normalized: Optional[str],
+        indeed_url: str,
+        company: dict,
+    ) -> None:
+        entry = self._deferred_jobs.setdefault(indeed_url, {
+            'normalized': normalized,
+            'companies': [],
+        })
+        entry['companies'].append((company.get('id', ''), company.get('name', '不明')))
+        with self._summary_lock:
+            self.summary['jobs_check']['deferred'] += 1
+
+    def _check_deferred_jobs(self, executor, deadline: Optional[float]) -> None:
+        """後回しにした /jobs の確認を、時間と予算が残っている分だけ行う。
+
+        1つの企業ページにつき1クエリ。結果は indeedStatus.hasJobsPage と
+        キャッシュ、結果ログに書き出す。
+        """
+        if not self._deferred_jobs:
+            return
+        logger.info(f'/jobs の後追い確認: {len(self._deferred_jobs)}ページ')
+        # 同じ企業の indeedStatus を書き直すので、先に検索結果の書き込みをコミットしておく
+        self.writer.flush()
+        cache = get_lookup_cache()
+        max_inflight = self.workers * INFLIGHT_PER_WORKER
+        inflight = {}
+
+        def _collect_jobs(future) -> None:
+            indeed_url = inflight.pop(future)
+            entry = self._deferred_jobs.pop(indeed_url)
+            has_jobs = future.result()
+            self.budget.settle(1, 1)
+            for company_id, company_name in entry['companies']:
+                update_company_jobs_page(company_id, has_jobs, writer=self.writer)
+                self._result_log.append({
+                    'companyId': company_id,
+                    'companyName': company_name,
+                    'indeedUrl': indeed_url,
+                    'hasJobsPage': has_jobs,
+                    'deferred': True,
+                })
+            if cache is not None and entry['normalized']:
+                cache.put(entry['normalized'], indeed_url, has_jobs)
+            with self._summary_lock:
+                self.summary['jobs_check']['checked'] += len(entry['companies'])
+                if has_jobs:
+                    self.summary['jobs_check']['found'] += len(entry['companies'])
+
+        for indeed_url in list(self._deferred_jobs):
+            while len(inflight) >= max_inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect_jobs(future)
+            if deadline is not None and time.time() >= deadline:
+                break
+            if not self.budget.try_reserve(1):
+                break
+            inflight[executor.submit(check_jobs_page, indeed_url)] = indeed_url
+        for future in list(inflight):
+            _collect_jobs(future)
+
+        if self._deferred_jobs:
+            logger.info(
+                f'/jobs の後追い確認を打ち切り（時間または予算切れ）: '
+                f'残り{len(self._deferred_jobs)}ページ'
+            )
+
+    def _scan(self, companies: Iterable[dict]) -> Iterator[dict]:
+        """期限が来た企業だけを返す（期限前の企業は検索せずに完了扱い）。"""
+        for company in companies:
+            if company.get('id', '') in self.progress.done:
+                # 優先度順の実行を再開した場合: この実行でチェック済み
+                continue
+
+            reason = 'due' if self.full else due_reason(
+                company, datetime.now(timezone.utc)
+            )
+            if reason is not None:
+                with self._summary_lock:
+                    self.summary['due'][reason] += 1
+                yield company
+                continue
+
+            company_id = company.get('id', '')
+            self.progress.scanned(company_id)
+            self.progress.completed(company_id, {'not_due': 1})
+            with self._summary_lock:
+                self.summary['total'] += 1
+                self.summary['not_due'] += 1
+                self.summary['processed'] += 1
+
+    def _prioritize(self, companies: Iterable[dict]) -> List[dict]:
+        """企業を優先度順に並べる。
+
+        未チェック → 募集中の求人が多い（canPost が左右される）→
+        最終チェックが古い の順。
+        """
+        companies = list(companies)
+        jobs_index = self._jobs_index_future.result()
+
+        def _priority(company: dict) -> tuple:
+            last_checked = (company.get('indeedStatus') or {}).get('lastCheckedAt')
+            return (
+                last_checked is not None,
+                -jobs_index.active_jobs(company.get('id', '')),
+                last_checked or NEVER_CHECKED,
+            )
+
+        companies.sort(key=_priority)
+        logger.info(f'優先度順に並べ替え: {len(companies)}社')
+        return companies
+
+    def _plan(self, chunk: List[dict]) -> List[CheckGroup]:
+        groups = plan_check_groups(chunk)
+        with self._summary_lock:
+            self.summary['dedup']['groups'] += len(groups)
+            self.summary['dedup']['duplicates'] += len(chunk) - len(groups)
+        return groups
+
+    def execute(self, companies: Iterable[dict]) -> dict:
+        """企業をストリームで受け取りながらチェックする。
+
+        time_budget を超えた場合は新規投入を止め、投入済みの完了を待って
+        status='partial' で返す（続きは resume で再開する）。
+
+        企業ごとの結果はサマリーに含めず、結果ログ（NDJSON）に書き出す。
+
+        Args:
+            companies: チェック対象企業（ジェネレーター可。再開時は cursor より後）
+
+        Returns:
+            実行結果サマリー
+        """
+        with serpapi_rate(self.qps):
+            return self._execute(companies)
+
+    def _execute(self, companies: Iterable[dict]) -> dict:
+        start_time = time.time()
+        self._start_time = start_time
+        deadline = start_time + self.time_budget if self.time_budget > 0 else None
+        summary = self.summary
+        summary['status'] = 'running'
+        with _active_runs_lock:
+            _active_runs[self.run_id] = self
+        self._result_log = ResultLog(self.run_id)
+        logger.info(
+            f'=== Indeed 掲載チェック開始 (runId={self.run_id}, '
+            f'slice={self.slice}, shard={self.shard}/{self.shards}, '
+            f'workers={self.workers}) ===')
+        started_at = datetime.now(timezone.utc)
+        if self.slice == 1:
+            self._checkpoint('running', startedAt=started_at)
+        else:
+            self._checkpoint('running', resumedAt=started_at)
+        # 途中のチェックポイントは投入・集計のループを止めずに保存する
+        self._checkpoint_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='checkpoint'
+        )
+        status = 'failed'
+
+        # SerpAPI クライアント・キャッシュは /check-batch や変更監視と共有しているので、
+        # リセットせずに開始時点の値からの差分をこの実行の集計とする
+        serpapi_client = get_serpapi_client()
+        serpapi_since = serpapi_client.snapshot()
+        cache = get_lookup_cache()
+        cache_since = cache.stats() if cache is not None else None
+
+        self.budget.load()
+        stage_totals = STAGE_SECONDS.totals()
+        max_inflight = self.workers * INFLIGHT_PER_WORKER
+
+        try:
+            with ThreadPoolExecutor(max_workers=2) as index_executor, \
+                    ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # 求人を1回だけ読み込んで索引化（企業スキャン・検索と並行）
+                self._jobs_index_future = index_executor.submit(
+                    build_jobs_index, self.company_ids
+                )
+                # 検出済みの企業ページの索引（refresh 時は検索し直すので使わない）
+                if self.use_cache:
+                    self._slug_index_future = index_executor.submit(build_slug_index)
+
+                inflight = {}
+
+                def _submit(groups: List[CheckGroup]) -> bool:
+                    """グループを投入する。クエリ予算が尽きたら False を返す。
+
+                    search_batch > 1 なら、正規化名のあるグループを
+                    search_batch 件ずつまとめて1つの投入単位にする。
+                    """
+                    # 求人索引の構築に失敗していたら検索クエリを消費する前に中断
+                    if self._jobs_index_future.done():
+                        self._jobs_index_future.result()
+
+                    def _collect_some() -> None:
+                        done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._collect(future, inflight.pop(future))
+
+                    units = []
+                    batch = []
+                    for group in groups:
+                        if self.search_batch <= 1 or not group.normalized:
+                            units.append([group])
+                            continue
+                        batch.append(group)
+                        if len(batch) >= self.search_batch:
+                            units.append(batch)
+                            batch = []
+                    if batch:
+                        units.append(batch)
+
+                    for unit in units:
+                        while len(inflight) >= max_inflight:
+                            _collect_some()
+                        # 予約が足りなければ投入済みの精算を待つ（キャッシュヒットや
+                        # 掲載なしは予約より少ないクエリで済む）。それでも足りなければ終了。
+                        # 投入されなかった企業は未完了のまま残り、再開時にチェックされる
+                        while not self.budget.try_reserve(self._reservation(unit)):
+                            if not inflight:
+                                return False
+                            _collect_some()
+                        inflight[executor.submit(self._process, unit)] = unit
+                        COMPANIES_INFLIGHT.inc(sum(len(group.companies) for group in unit))
+                    return True
+
+                # 1. 企業をストリームで受け取り、一定件数ごとにグループ化して投入
+                #    （予算の上限があるときは全件を読んで優先度順に並べ替える）
+                due_companies = self._scan(companies)
+                if self.prioritized:
+                    due_companies = self._prioritize(due_companies)
+
+                stop_reason = None
+                chunk = []
+                for company in due_companies:
+                    if self.lease is not None and self.lease.lost.is_set():
+                        logger.error('実行リースを失ったため中断')
+                        stop_reason = 'lease_lost'
+                        break
+                    if deadline is not None and time.time() >= deadline:
+                        logger.warning(
+                            f'処理時間の上限（{self.time_budget:g}秒）に達したため中断'
+                        )
+                        stop_reason = 'time_budget'
+                        break
+                    self.progress.scanned(company.get('id', ''))
+                    with self._summary_lock:
+                        summary['total'] += 1
+                    chunk.append(company)
+                    if len(chunk) >= PLAN_CHUNK_SIZE:
+                        submitted = _submit(self._plan(chunk))
+                        chunk = []
+                        if not submitted:
+                            stop_reason = 'query_budget'
+                            break
+                if chunk and stop_reason is None and not _submit(self._plan(chunk)):
+                    stop_reason = 'query_budget'
+
+                if stop_reason == 'query_budget':
+                    logger.warning(
+                        f'SerpAPI クエリ予算を使い切ったため中断: {self.budget.stats()}'
+                    )
+                status = 'partial' if stop_reason else 'completed'
+                with self._summary_lock:
+                    summary['stopReason'] = stop_reason
+
+                logger.info(
+                    f'スキャン企業数: {summary["total"]} '
+                    f'（期限前でスキップ: {summary["not_due"]}）'
+                )
+
+                # 2. 残りの完了を待つ
+                for future in list(inflight):
+                    self._collect(future, inflight.pop(future))
+
+                # 3. jobs_check='deferred' なら、残りの時間と予算で /jobs を確認する
+                if status == 'completed':
+                    self._check_deferred_jobs(executor, deadline)
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            # 4. 残りの書き込みをコミットしてチェックポイントを保存
+            #    （致命的エラー時も処理済み分は失わず、cursor から再開できる）
+            try:
+                self._checkpoint(status)
+            except Exception as e:
+                logger.error(f'バッチコミットエラー: {e}')
+            try:
+                self.writer.close()
+            except Exception as e:
+                logger.error(f'バッチコミットエラー: {e}')
+            self._result_log.close()
+            with self._summary_lock:
+                summary['cursor'] = self.cursor
+                summary['writes'] = self.writer.stats()
+                summary['elapsed_seconds'] = round(time.time() - start_time, 1)
+                summary['serpapi'] = serpapi_client.stats(since=serpapi_since)
+                summary['cache'] = cache.stats(since=cache_since) if cache is not None else None
+                summary['budget'] = self.budget.stats()
+                summary['timings'] = stage_summary(stage_totals)
+                slug_index = self._slug_index()
+                summary['slug_index'] = slug_index.stats() if slug_index is not None else None
+                if status == 'partial':
+                    summary['resume'] = f'/run?resume={self.run_id}'
+                summary['status'] = status
+            with _active_runs_lock:
+                _active_runs.pop(self.run_id, None)
+
+        if status == 'partial':
+            logger.info(f'=== Indeed 掲載チェック中断（再開: {summary["resume"]}） ===')
+        else:
+            logger.info('=== Indeed 掲載チェック完了 ===')
+        logger.info(json.dumps(summary, ensure_ascii=False))
+        return summary
@@ -0,0 +1,102 @@
+"""チェックスケジュールモジュール
+
+企業ごとに次回チェック日時（indeedStatus.nextCheckAt）を決め、
+/run で期限が来た企業だけをチェックする。
+
+- 未チェック・企業名が変わった・前回エラーの企業は即時チェック
+- 同じ結果が続く企業ほどチェック間隔を延ばす（上限あり）
+- 結果が変わったら間隔を基本値に戻す
+"""
+
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from normalization import normalize_company_name
+
+logger = logging.getLogger(__name__)
+
+# 結果が変わった直後のチェック間隔（日）。週次実行に合わせる
+SCHEDULE_BASE_INTERVAL_DAYS = float(os.environ.get('SCHEDULE_BASE_INTERVAL_DAYS', 7))
+
+# チェック間隔の上限（日）
+SCHEDULE_MAX_INTERVAL_DAYS = float(os.environ.get('SCHEDULE_MAX_INTERVAL_DAYS', 56))
+
+# 同じ結果が1回続くごとに間隔を何倍にするか
+SCHEDULE_GROWTH = 2.0
+
+# 実行開始からチェックまでのずれを吸収する猶予（時間）。
+# 前回の実行中にチェックした企業が、次の定期実行で期限直前として漏れないようにする
+SCHEDULE_SLACK_HOURS = float(os.environ.get('SCHEDULE_SLACK_HOURS', 12))
+
+# 同じ日に期限が集中しないよう、間隔を最大この割合だけ前倒しする
+SCHEDULE_JITTER = 0.1
+
+
+def due_reason(company: dict, now: datetime) -> Optional[str]:
+    """企業をいまチェックすべき理由を返す（期限前なら None）。
+
+    Args:
+        company: 企業データ（name / indeedStatus）
+        now: 現在時刻（タイムゾーン付き）
+
+    Returns:
+        'new' / 'renamed' / 'error' / 'due'、または None
+    """
+    status = company.get('indeedStatus') or {}
+    if not status.get('lastCheckedAt') or not status.get('nextCheckAt'):
+        return 'new'
+    if status.get('error'):
+        return 'error'
+    if status.get('checkedName') != normalize_company_name(company.get('name', '')):
+        return 'renamed'
+    if status['nextCheckAt'] <= now + timedelta(hours=SCHEDULE_SLACK_HOURS):
+        return 'due'
+    return None
+
+
+def _jitter(company_id: str) -> float:
+    """企業ごとに固定の前倒し割合（0〜SCHEDULE_JITTER）。"""
+    digest = hashlib.sha1(company_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF * SCHEDULE_JITTER
+
+
+def check_interval(stable_runs: int) -> timedelta:
+    """同じ結果が stable_runs 回続いた企業のチェック間隔。"""
+    days = SCHEDULE_BASE_INTERVAL_DAYS * SCHEDULE_GROWTH ** min(stable_runs, 16)
+    return timedelta(days=min(days, SCHEDULE_MAX_INTERVAL_DAYS))
+
+
+def next_schedule(
+    company: dict,
+    unchanged: bool,
+    error: Optional[str],
+    now: datetime,
+) -> dict:
+    """チェック後に indeedStatus へ保存するスケジュール項目を求める。
+
+    Args:
+        company: 企業データ（id / name / indeedStatus）
+        unchanged: 判定結果が前回と同じだったか
+        error: チェックエラー（エラー時は次回の実行で再チェックする）
+        now: チェック時刻
+
+    Returns:
+        nextCheckAt / stableRuns / checkedName の辞書
+    """
+    status = company.get('indeedStatus') or {}
+    checked_name = normalize_company_name(company.get('name', ''))
+
+    if error:
+        return {'nextCheckAt': now, 'stableRuns': 0, 'checkedName': checked_name}
+
+    stable_runs = status.get('stableRuns', 0) + 1 if unchanged else 0
+    interval = check_interval(stable_runs)
+    interval -= interval * _jitter(company.get('id', ''))
+    return {
+        'nextCheckAt': now + interval,
+        'stableRuns': stable_runs,
+        'checkedName': checked_name,
+    }
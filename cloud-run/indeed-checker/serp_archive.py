@@ -0,0 +1,189 @@
+"""SerpAPI レスポンスのアーカイブモジュール
+
+SerpAPI の生のレスポンスを、検索パラメータ（api_key を除く）のハッシュをキーに
+gzip 圧縮した JSON で保存する。/cmp/ URL の抽出や企業名の照合ルールを変えたときに、
+保存済みのレスポンスで判定をやり直せる（replay.py。SerpAPI のクエリを使わない）。
+
+モード（SERP_ARCHIVE_MODE）:
+- record: 成功したレスポンスを保存する（同じクエリは最新で上書き）
+- replay: ネットワークに出ず、保存済みのレスポンスを返す。未保存のクエリは ArchiveMiss
+
+保存先（SERP_ARCHIVE_PATH）:
+- ローカルディレクトリ: <パス>/<ハッシュ先頭2文字>/<ハッシュ>.json.gz
+- gs://バケット/接頭辞: Cloud Storage（google-cloud-storage が必要）
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# アーカイブ設定（パス未設定なら無効）
+ARCHIVE_PATH = os.environ.get('SERP_ARCHIVE_PATH', '')
+ARCHIVE_MODES = ('record', 'replay')
+ARCHIVE_MODE = os.environ.get('SERP_ARCHIVE_MODE', 'record')
+
+
+class ArchiveMiss(LookupError):
+    """replay モードで、クエリのレスポンスがアーカイブにない。"""
+
+
+def archive_key(params: dict) -> str:
+    """検索パラメータ（api_key を除く）から決まるアーカイブのキー。"""
+    canonical = json.dumps(
+        {key: str(value) for key, value in params.items() if key != 'api_key'},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LocalArchiveBackend:
+    """ローカルディレクトリに保存するバックエンド。"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f'{key}.json.gz')
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 書きかけのファイルを読まないよう、一時ファイルに書いてから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class GcsArchiveBackend:
+    """Cloud Storage（gs://バケット/接頭辞）に保存するバックエンド。"""
+
+    def __init__(self, url: str):
+        try:
+            from google.cloud import storage
+        except ImportError as e:
+            raise RuntimeError(
+                'gs:// のアーカイブには google-cloud-storage が必要です'
+            ) from e
+        bucket, _, prefix = url[len('gs://'):].partition('/')
+        self.prefix = prefix.strip('/')
+        self._bucket = storage.Client().bucket(bucket)
+
+    def _blob(self, key: str):
+        name = f'{key[:2]}/{key}.json.gz'
+        return self._bucket.blob(f'{self.prefix}/{name}' if self.prefix else name)
+
+    def get(self, key: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self._blob(key).download_as_bytes()
+        except NotFound:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._blob(key).upload_from_string(data, content_type='application/gzip')
+
+
+class SerpArchive:
+    """SerpAPI レスポンスのアーカイブ。
+
+    Args:
+        backend: 保存先のバックエンド
+        replay: True なら保存済みのレスポンスを返す（記録はしない）
+    """
+
+    def __init__(self, backend, replay: bool = False):
+        self.backend = backend
+        self.replay = replay
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._recorded = 0
+            self._replayed = 0
+            self._misses = 0
+            self._errors = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'mode': 'replay' if self.replay else 'record',
+                'recorded': self._recorded,
+                'replayed': self._replayed,
+                'misses': self._misses,
+                'errors': self._errors,
+            }
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record(self, params: dict, response: dict) -> None:
+        """レスポンスを保存する。保存失敗は検索結果に影響させない。"""
+        entry = {
+            'params': {key: value for key, value in params.items() if key != 'api_key'},
+            'recordedAt': datetime.now(timezone.utc).isoformat(),
+            'response': response,
+        }
+        data = gzip.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        try:
+            self.backend.put(archive_key(params), data)
+            self._count('_recorded')
+        except Exception as e:
+            logger.warning(f'アーカイブ保存エラー ({params.get("q")}): {e}')
+            self._count('_errors')
+
+    def load(self, params: dict) -> dict:
+        """保存済みのレスポンスを返す。
+
+        Raises:
+            ArchiveMiss: 保存されていない
+        """
+        data = self.backend.get(archive_key(params))
+        if data is None:
+            self._count('_misses')
+            raise ArchiveMiss(f'アーカイブにないクエリ: {params.get("q")}')
+        self._count('_replayed')
+        return json.loads(gzip.decompress(data))['response']
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_serp_archive() -> Optional[SerpArchive]:
+    """設定に応じたアーカイブのシングルトンを返す。無効時は None。"""
+    global _archive
+    if not ARCHIVE_PATH:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                if ARCHIVE_MODE not in ARCHIVE_MODES:
+                    raise ValueError(f'不明な SERP_ARCHIVE_MODE: {ARCHIVE_MODE}')
+                if ARCHIVE_PATH.startswith('gs://'):
+                    backend = GcsArchiveBackend(ARCHIVE_PATH)
+                else:
+                    backend = LocalArchiveBackend(ARCHIVE_PATH)
+                _archive = SerpArchive(backend, replay=ARCHIVE_MODE == 'replay')
+                logger.info(f'SerpAPI アーカイブ: {ARCHIVE_PATH} ({ARCHIVE_MODE})')
+    return _archive
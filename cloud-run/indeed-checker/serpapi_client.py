@@ -0,0 +1,319 @@
+"""SerpAPI クライアントモジュール
+
+keep-alive の requests.Session を使い回し、TLS ハンドシェイクを
+毎回やり直さないようにする。タイムアウト・5xx・429 は
+指数バックオフ（Retry-After ヘッダーがあればその秒数どおり）でリトライする。
+リトライの待ちで1回の検索の期限（retry_deadline）を超える場合はリトライしない。
+アーカイブ（serp_archive）を渡すと、成功したレスポンスを保存する
+（replay モードではネットワークに出ずにアーカイブから返す）。
+同時実行リミッターを渡すと同時リクエスト数を制限し、適応制御（rate_controller）を
+渡すと、リクエストごとの結果からレートと同時リクエスト数の上限を調整させる。
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import (
+    SERPAPI_CALLS,
+    SERPAPI_ERRORS,
+    SERPAPI_RATE_LIMITED,
+    SERPAPI_RETRIES,
+    observe_stage,
+)
+from rate_controller import (
+    OUTCOME_ERROR,
+    OUTCOME_ERROR_PAYLOAD,
+    OUTCOME_OK,
+    OUTCOME_THROTTLED,
+    OUTCOME_TIMEOUT,
+    AimdController,
+)
+from rate_limiter import ConcurrencyLimiter, TokenBucket
+from serp_archive import SerpArchive
+
+logger = logging.getLogger(__name__)
+
+# リトライ対象の HTTP ステータス
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# レイテンシ統計に保持する直近の件数
+LATENCY_WINDOW = 1000
+
+# 検索結果が0件のときの error（HTTP 200。0件の検索結果として扱い、適応制御でも成功扱い）
+NO_RESULTS_ERROR = "hasn't returned any results"
+
+
+def is_no_results(data: dict) -> bool:
+    """検索結果が0件だったことを示す error ペイロードか。"""
+    return NO_RESULTS_ERROR in str(data.get('error', ''))
+
+
+def _percentile(values: list, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _outcome(status_code: int, data: Optional[dict] = None) -> str:
+    """適応制御に渡す応答の分類。"""
+    if status_code == 429:
+        return OUTCOME_THROTTLED
+    if status_code >= 500:
+        return OUTCOME_ERROR
+    if status_code >= 400:
+        # 4xx（キー不正など）は混雑ではないので流量は変えない
+        return OUTCOME_OK
+    if isinstance(data, dict) and data.get('error') and not is_no_results(data):
+        return OUTCOME_ERROR_PAYLOAD
+    return OUTCOME_OK
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダー（秒数 or HTTP日付）を秒数に変換する。"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class SerpApiClient:
+    """接続プール付き SerpAPI クライアント。
+
+    スレッド間で1インスタンスを共有する想定。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: float = 20,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        retry_deadline: float = 120.0,
+        pool_size: int = 10,
+        rate_limiter: Optional[TokenBucket] = None,
+        archive: Optional[SerpArchive] = None,
+        concurrency: Optional[ConcurrencyLimiter] = None,
+        controller: Optional[AimdController] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_deadline = retry_deadline
+        self.rate_limiter = rate_limiter
+        self.archive = archive
+        self.concurrency = concurrency
+        self.controller = controller
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # 統計はプロセス全体の累計（スレッド間で共有するので、実行ごとにリセットしない）
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._rate_limited = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> dict:
+        """現在の累計の回数（stats(since=...) に渡す）。"""
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'retries': self._retries,
+                'failures': self._failures,
+                'rateLimited': self._rate_limited,
+            }
+
+    def stats(self, since: Optional[dict] = None) -> dict:
+        """呼び出し回数とレイテンシ統計（秒）を返す。
+
+        since（snapshot() の値）を渡すと、その時点からの差分を返す。
+        プロセス全体の集計の差分なので、同時に動いている別の処理
+        （変更監視・/check-batch など）の分も含まれる。
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+        counts = self.snapshot()
+        if since:
+            counts = {key: value - since.get(key, 0) for key, value in counts.items()}
+            # 直近の calls 件のレイテンシ（保持している件数まで）
+            latencies = latencies[max(0, len(latencies) - counts['calls']):]
+
+        def _round(value):
+            return round(value, 3) if value is not None else None
+
+        result = dict(counts)
+        result.update({
+            'latency': {
+                'avg': _round(sum(latencies) / len(latencies)) if latencies else None,
+                'p50': _round(_percentile(latencies, 50)),
+                'p95': _round(_percentile(latencies, 95)),
+                'max': _round(max(latencies)) if latencies else None,
+            },
+        })
+        if self.controller is not None:
+            result['adaptive'] = self.controller.stats()
+        return result
+
+    def warmup(self) -> None:
+        """SerpAPI への接続（TCP・TLS）を開いて接続プールに入れておく。
+
+        API キーを付けない HEAD リクエストなので、検索クエリには数えられない。
+        """
+        if self.archive is not None and self.archive.replay:
+            return
+        try:
+            self.session.head(self.base_url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f'SerpAPI への接続の事前確立に失敗: {e}')
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # Retry-After はそのまま守る（早く再送しても 429 が返るだけ）。上限は指数バックオフだけ
+        if retry_after is not None:
+            return retry_after
+        delay = self.backoff_base * (2 ** attempt)
+        # full jitter
+        return random.uniform(0, min(delay, self.backoff_max))
+
+    def search(self, params: dict) -> dict:
+        """SerpAPI に検索リクエストを送り、JSON を返す。
+
+        リトライしても失敗した場合は最後の例外を送出する。
+
+        Args:
+            params: api_key 以外の検索パラメータ
+
+        Returns:
+            SerpAPI のレスポンス JSON
+        """
+        # replay モードではネットワークに出ない（未保存のクエリは ArchiveMiss）
+        if self.archive is not None and self.archive.replay:
+            return self.archive.load(params)
+
+        request_params = dict(params, api_key=self.api_key)
+
+        search_started = time.monotonic()
+        attempt = 0
+        while True:
+            rate_waited = 0.0
+            if self.rate_limiter is not None:
+                rate_waited = self.rate_limiter.acquire()
+                observe_stage('rate_limit_wait', rate_waited)
+            inflight_waited = 0.0
+            if self.concurrency is not None:
+                inflight_waited = self.concurrency.acquire()
+                observe_stage('inflight_wait', inflight_waited)
+
+            started = time.monotonic()
+            retry_after = None
+            try:
+                try:
+                    resp = self.session.get(
+                        self.base_url,
+                        params=request_params,
+                        timeout=self.timeout,
+                    )
+                finally:
+                    if self.concurrency is not None:
+                        self.concurrency.release()
+                latency = time.monotonic() - started
+                self._record(latency)
+
+                if resp.status_code not in RETRY_STATUSES:
+                    if resp.status_code >= 400:
+                        SERPAPI_ERRORS.inc()
+                        with self._lock:
+                            self._failures += 1
+                        self._adapt(_outcome(resp.status_code), latency, rate_waited, inflight_waited)
+                    resp.raise_for_status()
+                    data = resp.json()
+                    self._adapt(_outcome(resp.status_code, data), latency, rate_waited, inflight_waited)
+                    if self.archive is not None:
+                        self.archive.record(params, data)
+                    return data
+
+                if resp.status_code == 429:
+                    SERPAPI_RATE_LIMITED.inc()
+                    with self._lock:
+                        self._rate_limited += 1
+                self._adapt(_outcome(resp.status_code), latency, rate_waited, inflight_waited)
+                retry_after = _parse_retry_after(resp.headers.get('Retry-After'))
+                error = requests.exceptions.HTTPError(
+                    f'SerpAPI HTTP {resp.status_code}', response=resp
+                )
+            except (
+                requests.exceptions.Timeout,
+                requests.exceptions.ConnectionError,
+            ) as e:
+                self._record(time.monotonic() - started)
+                self._adapt(OUTCOME_TIMEOUT, None, rate_waited, inflight_waited)
+                error = e
+
+            delay = self._backoff(attempt, retry_after)
+            elapsed = time.monotonic() - search_started
+            if attempt >= self.max_retries or elapsed + delay > self.retry_deadline:
+                if attempt < self.max_retries:
+                    logger.warning(
+                        f'SerpAPI のリトライ待ち（{delay:.1f}秒）が検索の期限'
+                        f'（{self.retry_deadline:g}秒）を超えるためリトライしない: {error}'
+                    )
+                SERPAPI_ERRORS.inc()
+                with self._lock:
+                    self._failures += 1
+                raise error
+
+            attempt += 1
+            SERPAPI_RETRIES.inc()
+            with self._lock:
+                self._retries += 1
+            logger.warning(
+                f'SerpAPI リトライ {attempt}/{self.max_retries} '
+                f'({delay:.1f}秒後): {error}'
+            )
+            time.sleep(delay)
+
+    def _adapt(
+        self, outcome: str, latency: Optional[float], rate_waited: float, inflight_waited: float
+    ) -> None:
+        if self.controller is not None:
+            self.controller.record(
+                outcome,
+                latency,
+                rate_limited=rate_waited > 0,
+                queued=inflight_waited > 0,
+            )
+
+    def _record(self, latency: float) -> None:
+        SERPAPI_CALLS.inc()
+        observe_stage('serpapi_request', latency)
+        with self._lock:
+            self._calls += 1
+            self._latencies.append(latency)
@@ -0,0 +1,169 @@
+"""シャーディングモジュール
+
+企業ドキュメントIDの安定ハッシュで企業をシャードに分割し、
+複数の Cloud Run インスタンスで /run を並列実行できるようにする。
+コーディネーターは全シャードの /run を同時に呼び出し、サマリーをマージする。
+"""
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# シャード実行の HTTP タイムアウト（秒）。/run 自体のタイムアウトに合わせる
+SHARD_REQUEST_TIMEOUT = 1800
+
+# 1回のコーディネートで起動できる最大シャード数
+MAX_SHARDS = 32
+
+# マージ時に合計する集計項目
+MERGE_KEYS = [
+    'total', 'checked', 'detected', 'not_detected', 'errors', 'jobs_updated', 'not_due',
+]
+
+
+def shard_of(company_id: str, shards: int) -> int:
+    """企業IDが属するシャード番号を返す。
+
+    Python の hash() はプロセスごとに変わるため、SHA-1 で安定させる。
+    """
+    digest = hashlib.sha1(company_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shards
+
+
+def filter_shard(companies: Iterable[dict], shard: int, shards: int) -> Iterator[dict]:
+    """指定シャードに属する企業だけを返す。"""
+    for company in companies:
+        if shard_of(company.get('id', ''), shards) == shard:
+            yield company
+
+
+def _id_token(audience: str) -> Optional[str]:
+    """Cloud Run 間呼び出し用の ID トークンを取得する（取得できなければ None）。"""
+    # google.auth・requests はシャード実行を使うときだけ読み込む（起動を速くするため）
+    import google.auth.transport.requests
+    import google.oauth2.id_token
+
+    try:
+        auth_request = google.auth.transport.requests.Request()
+        return google.oauth2.id_token.fetch_id_token(auth_request, audience)
+    except Exception as e:
+        logger.warning(f'ID トークン取得失敗（認証なしで呼び出します）: {e}')
+        return None
+
+
+def _call_shard(base_url: str, shard: int, shards: int, params: dict) -> dict:
+    import requests
+
+    headers = {}
+    token = _id_token(base_url)
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    query = dict(params, shard=shard, shards=shards)
+    try:
+        resp = requests.post(
+            f'{base_url.rstrip("/")}/run',
+            params=query,
+            headers=headers,
+            timeout=SHARD_REQUEST_TIMEOUT,
+        )
+        data = resp.json()
+        if resp.status_code != 200:
+            return {
+                'shard': shard,
+                'status': 'failed',
+                'error': data.get('error', f'HTTP {resp.status_code}'),
+                'summary': data.get('summary'),
+            }
+        return {'shard': shard, 'status': data.get('status'), 'summary': data}
+    except Exception as e:
+        logger.error(f'シャード {shard}/{shards} の呼び出し失敗: {e}')
+        return {'shard': shard, 'status': 'failed', 'error': str(e)}
+
+
+def merge_summaries(results: List[dict]) -> dict:
+    """シャードごとの結果をマージする。"""
+    merged = {key: 0 for key in MERGE_KEYS}
+    merged['dedup'] = {'groups': 0, 'duplicates': 0, 'queries_saved': 0}
+    merged['serpapi_calls'] = 0
+    merged['queries_used'] = 0
+    merged['shards'] = []
+
+    for result in sorted(results, key=lambda r: r['shard']):
+        summary = result.get('summary') or {}
+        for key in MERGE_KEYS:
+            merged[key] += summary.get(key, 0)
+        for key, value in (summary.get('dedup') or {}).items():
+            merged['dedup'][key] = merged['dedup'].get(key, 0) + value
+        merged['serpapi_calls'] += (summary.get('serpapi') or {}).get('calls', 0)
+        merged['queries_used'] += (summary.get('budget') or {}).get('runUsed', 0)
+
+        shard_info = {
+            'shard': result['shard'],
+            'status': result.get('status'),
+            'runId': summary.get('runId'),
+            'elapsed_seconds': summary.get('elapsed_seconds'),
+        }
+        if result.get('error'):
+            shard_info['error'] = result['error']
+        if summary.get('results'):
+            shard_info['results'] = summary['results']
+        if summary.get('resume'):
+            shard_info['resume'] = summary['resume']
+            shard_info['stopReason'] = summary.get('stopReason')
+        merged['shards'].append(shard_info)
+
+    statuses = {info['status'] for info in merged['shards']}
+    if statuses == {'completed'}:
+        merged['status'] = 'completed'
+    elif 'failed' in statuses:
+        merged['status'] = 'failed'
+    else:
+        merged['status'] = 'partial'
+    return merged
+
+
+def split_budget(budget: int, shard: int, shards: int) -> int:
+    """実行全体のクエリ予算をシャードに均等に割り振る。"""
+    return budget // shards + (1 if shard < budget % shards else 0)
+
+
+def run_shards(base_url: str, shards: int, params: dict) -> dict:
+    """全シャードの /run を並列に呼び出し、サマリーをマージする。
+
+    Args:
+        base_url: チェッカーサービスのURL
+        shards: シャード数
+        params: 各シャードの /run に渡すクエリパラメータ
+            （budget はシャード数で割り振る）
+
+    Returns:
+        マージしたサマリー
+    """
+    logger.info(f'=== シャード実行開始: {shards}シャード ({base_url}) ===')
+    with ThreadPoolExecutor(max_workers=shards) as executor:
+        futures = []
+        for shard in range(shards):
+            shard_params = dict(params)
+            if 'budget' in params:
+                shard_params['budget'] = split_budget(int(params['budget']), shard, shards)
+            futures.append(
+                executor.submit(_call_shard, base_url, shard, shards, shard_params)
+            )
+        results = [future.result() for future in futures]
+
+    merged = merge_summaries(results)
+    logger.info(
+        f'=== シャード実行完了: status={merged["status"]}, '
+        f'total={merged["total"]} ==='
+    )
+    return merged
+
+
+def coordinator_base_url(default: str) -> str:
+    """シャードを呼び出す先のURL（INDEED_CHECKER_URL 環境変数があれば優先）。"""
+    return os.environ.get('INDEED_CHECKER_URL') or default
@@ -0,0 +1,160 @@
+"""Indeed 企業ページ（/cmp/ スラッグ）索引モジュール
+
+検出済み企業の indeedStatus.indeedUrl からスラッグの索引を作り、
+検索せずに企業ページを特定できる企業は SerpAPI を使わずに判定する。
+
+- スラッグ（URL デコード・NFKC 正規化）と、解決済み企業の企業名の完全一致
+- スラッグの文字 3-gram による高い類似度の一致（最良候補が1つに決まる場合のみ）
+
+索引の情報は一定期間（SLUG_INDEX_MAX_AGE_DAYS）以内に検索で確認したものだけを使う。
+古い情報しかない企業は検索し直し、掲載終了を見逃さないようにする。
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Set
+
+from firestore_service import iter_known_indeed_urls
+from indeed_checker import cmp_slug
+from normalization import match_key, normalize_company_name
+
+logger = logging.getLogger(__name__)
+
+# 索引で検索を省略してよい、最後に検索で確認してからの日数
+SLUG_INDEX_MAX_AGE_DAYS = float(os.environ.get('SLUG_INDEX_MAX_AGE_DAYS', 30))
+
+# 検索で確認した日時が不明な企業ページ
+NEVER_VERIFIED = datetime.min.replace(tzinfo=timezone.utc)
+
+# 3-gram の類似度（Dice 係数）でこの値以上、かつ次点との差が
+# SLUG_INDEX_MARGIN 以上なら一致とみなす
+SLUG_INDEX_MIN_SIMILARITY = 0.9
+SLUG_INDEX_MARGIN = 0.1
+
+NGRAM = 3
+
+
+def _ngrams(key: str) -> Set[str]:
+    if len(key) < NGRAM:
+        return set()
+    return {key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1)}
+
+
+class SlugIndex:
+    """スラッグ・企業名 → 企業ページ URL の索引（スレッドセーフ）。"""
+
+    def __init__(self, max_age_days: float = SLUG_INDEX_MAX_AGE_DAYS):
+        self.max_age = timedelta(days=max_age_days)
+        self._lock = threading.Lock()
+        # 照合キー → 企業ページ URL
+        self._by_slug: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+        # 企業ページ URL → 最後に検索で確認した日時
+        self._verified_at: Dict[str, datetime] = {}
+        # 3-gram → スラッグの照合キー
+        self._grams: Dict[str, Set[str]] = {}
+        self.hits = {'slug': 0, 'name': 0, 'similar': 0}
+
+    def __len__(self) -> int:
+        return len(self._verified_at)
+
+    def add(
+        self,
+        indeed_url: str,
+        name: str = '',
+        verified_at: Optional[datetime] = None,
+    ) -> None:
+        """企業ページを索引に追加する。"""
+        slug_key = match_key(cmp_slug(indeed_url))
+        name_key = match_key(normalize_company_name(name))
+        with self._lock:
+            if slug_key and slug_key not in self._by_slug:
+                self._by_slug[slug_key] = indeed_url
+                for gram in _ngrams(slug_key):
+                    self._grams.setdefault(gram, set()).add(slug_key)
+            if name_key:
+                self._by_name.setdefault(name_key, indeed_url)
+            verified_at = verified_at or NEVER_VERIFIED
+            if verified_at >= self._verified_at.get(indeed_url, NEVER_VERIFIED):
+                self._verified_at[indeed_url] = verified_at
+
+    def _similar(self, key: str) -> Optional[str]:
+        grams = _ngrams(key)
+        if not grams:
+            return None
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for slug_key in self._grams.get(gram, ()):
+                shared[slug_key] = shared.get(slug_key, 0) + 1
+
+        scored = sorted(
+            (
+                2 * count / (len(grams) + len(_ngrams(slug_key))),
+                slug_key,
+            )
+            for slug_key, count in shared.items()
+        )
+        if not scored:
+            return None
+        best_score, best_key = scored[-1]
+        runner_up = scored[-2][0] if len(scored) > 1 else 0.0
+        if best_score >= SLUG_INDEX_MIN_SIMILARITY and best_score - runner_up >= SLUG_INDEX_MARGIN:
+            return self._by_slug[best_key]
+        return None
+
+    def resolve(self, normalized: str, now: Optional[datetime] = None) -> Optional[str]:
+        """正規化企業名から企業ページ URL を引く。
+
+        一致しない、または最後の確認が古い場合は None（検索が必要）。
+        """
+        key = match_key(normalized)
+        if not key:
+            return None
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            indeed_url, kind = self._by_slug.get(key), 'slug'
+            if not indeed_url:
+                indeed_url, kind = self._by_name.get(key), 'name'
+            if not indeed_url:
+                indeed_url, kind = self._similar(key), 'similar'
+            if not indeed_url or now - self._verified_at[indeed_url] > self.max_age:
+                return None
+            self.hits[kind] += 1
+            return indeed_url
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pages': len(self._verified_at),
+                'slugs': len(self._by_slug),
+                'names': len(self._by_name),
+                'hits': dict(self.hits),
+            }
+
+
+def build_slug_index(companies: Optional[Iterable[dict]] = None) -> SlugIndex:
+    """検出済み企業を1回ストリームして SlugIndex を構築する。
+
+    verifiedAt がない企業（索引の導入前に検索した企業）は lastCheckedAt を確認日時とする。
+
+    Args:
+        companies: 企業データ（省略時は Firestore から取得）
+
+    Returns:
+        SlugIndex
+    """
+    index = SlugIndex()
+    for company in companies if companies is not None else iter_known_indeed_urls():
+        status = company.get('indeedStatus') or {}
+        indeed_url = status.get('indeedUrl')
+        if not indeed_url:
+            continue
+        index.add(
+            indeed_url,
+            name=company.get('name', ''),
+            verified_at=status.get('verifiedAt') or status.get('lastCheckedAt'),
+        )
+    logger.info(f'スラッグ索引を構築: 企業ページ{len(index)}件')
+    return index
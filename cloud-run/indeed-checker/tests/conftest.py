@@ -0,0 +1,34 @@
+"""pytest 共通設定
+
+チェッカーのモジュールは読み込み時に環境変数を読むので、読み込む前にテスト用の値にする
+（検索結果キャッシュ・アーカイブは使わず、SerpAPI への適応制御もしない）。
+"""
+
+import os
+import sys
+
+os.environ.setdefault('SERPAPI_KEY', 'test')
+os.environ['INDEED_CACHE_BACKEND'] = 'none'
+os.environ['SERP_ARCHIVE_PATH'] = ''
+os.environ['SERPAPI_ADAPTIVE'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# インメモリ Firestore（bench/memory_firestore.py）を使う
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def memory_db():
+    """firestore_service の接続先をインメモリ Firestore に差し替える（テスト後に戻す）。"""
+    import firestore_service
+    import memory_firestore
+
+    saved = firestore_service._db, firestore_service.firestore
+    client = memory_firestore.install()
+    try:
+        yield client
+    finally:
+        firestore_service._db, firestore_service.firestore = saved
@@ -0,0 +1,103 @@
+"""OR 検索の振り分け（attribute_cmp_results）と個別検索へのフォールバックのテスト"""
+
+import pytest
+
+import indeed_checker
+from indeed_checker import attribute_cmp_results, check_companies_batched
+
+CMP = 'https://jp.indeed.com/cmp/'
+
+
+def _result(slug, title=''):
+    return {'link': CMP + slug, 'title': title}
+
+
+def test_substring_of_other_company_is_not_attributed():
+    results = [_result('Abc-Mart', 'ABCマートの求人・企業情報 | Indeed (インディード)')]
+    assert attribute_cmp_results(['ABC'], results) == {'ABC': None}
+
+
+def test_whole_name_matches_slug_and_title():
+    results = [
+        _result('Blue-Sky-Inc'),
+        _result('%E3%82%B5%E3%82%AF%E3%83%A9', '株式会社サクラの求人・企業情報 | Indeed (インディード)'),
+        _result('Midori', 'ミドリ商事 の企業情報 - Indeed'),
+    ]
+    assert attribute_cmp_results(['Blue Sky', 'サクラ', 'ミドリ商事'], results) == {
+        'Blue Sky': CMP + 'Blue-Sky-Inc',
+        'サクラ': CMP + '%E3%82%B5%E3%82%AF%E3%83%A9',
+        'ミドリ商事': CMP + 'Midori',
+    }
+
+
+def test_page_matching_two_names_is_ambiguous():
+    results = [_result('Sakura', 'サクラの求人')]
+    assert attribute_cmp_results(['Sakura', 'サクラ'], results) == {'Sakura': None, 'サクラ': None}
+
+
+def test_name_matching_two_pages_is_ambiguous():
+    results = [_result('Sakura'), _result('Sakura-KK')]
+    assert attribute_cmp_results(['Sakura'], results) == {'Sakura': None}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """SerpAPI の代わりに、クエリごとに決めた organic_results を返す。"""
+    queries = []
+    responses = {}
+
+    def _search_organic(query, num, label):
+        queries.append(query)
+        return responses.get(query, [])
+
+    monkeypatch.setattr(indeed_checker, '_search_organic', _search_organic)
+    return queries, responses
+
+
+def _single(name):
+    return f'site:jp.indeed.com/cmp/ "{name}"'
+
+
+def test_unmatched_names_fall_back_to_single_search(searches):
+    queries, responses = searches
+    responses[_single('ABC')] = [_result('ABC', 'ABCの求人・企業情報 | Indeed')]
+    batch = 'site:jp.indeed.com/cmp/ ("ABC" OR "無名社")'
+    responses[batch] = [_result('Abc-Mart', 'ABCマートの求人・企業情報 | Indeed')]
+
+    companies = [{'id': 'c1', 'name': 'ABC'}, {'id': 'c2', 'name': '株式会社無名社'}]
+    results, stats = check_companies_batched(companies, use_cache=False, jobs_check='off')
+
+    assert queries == [batch, _single('ABC'), _single('無名社')]
+    assert stats == {'batched': 2, 'resolved': 0, 'fallback': 2}
+    assert results[0].detected and results[0].indeed_url == CMP + 'ABC'
+    assert not results[1].detected and results[1].error is None
+    assert sum(result.queries for result in results) == 3
+
+
+def test_zero_batch_results_are_not_treated_as_negative(searches):
+    queries, responses = searches
+    responses[_single('サクラ')] = [_result('Sakura', 'サクラの求人')]
+
+    companies = [{'id': 'c1', 'name': 'サクラ'}, {'id': 'c2', 'name': 'ミドリ'}]
+    results, stats = check_companies_batched(companies, use_cache=False, jobs_check='off')
+
+    assert stats['fallback'] == 2
+    assert len(queries) == 3
+    assert results[0].indeed_url == CMP + 'Sakura'
+    assert not results[1].detected
+
+
+def test_resolved_names_skip_single_search(searches):
+    queries, responses = searches
+    batch = 'site:jp.indeed.com/cmp/ ("Blue Sky" OR "サクラ")'
+    responses[batch] = [
+        _result('Blue-Sky'),
+        _result('Sakura', 'サクラの求人・企業情報 | Indeed'),
+    ]
+
+    companies = [{'id': 'c1', 'name': 'Blue Sky'}, {'id': 'c2', 'name': 'サクラ'}]
+    results, stats = check_companies_batched(companies, use_cache=False, jobs_check='off')
+
+    assert queries == [batch]
+    assert stats == {'batched': 2, 'resolved': 2, 'fallback': 0}
+    assert [result.indeed_url for result in results] == [CMP + 'Blue-Sky', CMP + 'Sakura']
@@ -0,0 +1,132 @@
+"""SerpAPI クエリ予算（実行ごと・月間）と優先度順の実行のテスト"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+import quota
+import run_log
+import runner
+from firestore_service import add_quota_usage, get_quota_usage
+from indeed_checker import IndeedCheckResult
+from normalization import normalize_company_name
+from quota import QueryBudget, current_month
+
+
+def test_run_budget_reserves_and_settles():
+    budget = QueryBudget(run_limit=5, monthly_limit=0)
+    assert budget.try_reserve(2)
+    assert budget.try_reserve(2)
+    assert not budget.try_reserve(2)
+    budget.settle(2, 1)
+    assert budget.try_reserve(2)
+    assert budget.stats()['runUsed'] == 1
+    assert budget.stats()['remaining'] == 0
+
+
+def test_monthly_usage_is_shared_through_firestore(memory_db):
+    month = current_month()
+    assert get_quota_usage(month) == 0
+    assert add_quota_usage(month, 3) == 3
+
+    budget = QueryBudget(monthly_limit=10)
+    budget.load()
+    assert budget.month_used == 3
+    assert budget.try_reserve(2)
+    budget.settle(2, 2)
+    budget.flush()
+    assert get_quota_usage(month) == 5
+
+    # 別の実行（シャード）の使用量も反映される
+    add_quota_usage(month, 4)
+    budget.flush()
+    assert budget.month_used == 9
+    assert not budget.try_reserve(2)
+
+
+def test_unlimited_budget_is_not_prioritized():
+    assert not QueryBudget(run_limit=None, monthly_limit=0).limited
+    assert QueryBudget(run_limit=None, monthly_limit=100).limited
+
+
+NOW = datetime.now(timezone.utc)
+
+
+def _checked(name, days_ago, next_in_days=30):
+    return {
+        'name': name,
+        'status': 'active',
+        'indeedStatus': {
+            'detected': False,
+            'lastCheckedAt': NOW - timedelta(days=days_ago),
+            'nextCheckAt': NOW + timedelta(days=next_in_days),
+            'stableRuns': 1,
+            'checkedName': normalize_company_name(name),
+        },
+    }
+
+
+@pytest.fixture
+def checked(memory_db, monkeypatch, tmp_path):
+    """検索の代わりに1社2クエリを使うチェック（呼ばれた企業IDを順に返す）。"""
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(quota, 'SERPAPI_MONTHLY_QUOTA', 0)
+    calls = []
+    lock = threading.Lock()
+
+    def _check(company, **kwargs):
+        with lock:
+            calls.append(company['id'])
+        return IndeedCheckResult(detected=False, queries=2)
+
+    monkeypatch.setattr(runner, 'check_company_indeed', _check)
+    return calls
+
+
+def _run(query):
+    return main.app.test_client().post(f'/run?workers=1&batch=1{query}').get_json()
+
+
+def test_priority_order(memory_db, checked):
+    memory_db.data['companies'] = {
+        'a-old': _checked('アオイ', 20),
+        'b-recent': _checked('ボタン', 2),
+        'c-jobs': _checked('カエデ', 5),
+        'd-new': {'name': 'ダリア', 'status': 'active'},
+    }
+    memory_db.data['jobs'] = {
+        'j1': {'companyId': 'c-jobs', 'status': 'active'},
+        'j2': {'companyId': 'c-jobs', 'status': 'active'},
+        'j3': {'companyId': 'b-recent', 'status': 'closed'},
+    }
+    summary = _run('&full=1&budget=100')
+    assert summary['status'] == 'completed'
+    assert checked == ['d-new', 'c-jobs', 'a-old', 'b-recent']
+
+
+def test_budget_exhaustion_stops_cleanly(memory_db, checked):
+    memory_db.data['companies'] = {f'c{i}': _checked(f'企業{i}', 10 + i) for i in range(5)}
+    summary = _run('&full=1&budget=4')
+    assert summary['status'] == 'partial'
+    assert summary['stopReason'] == 'query_budget'
+    assert len(checked) == 2
+    assert summary['budget']['runUsed'] == 4
+    assert summary['processed'] == 2
+    assert memory_db.data['indeedCheckerQuota'][current_month()]['used'] == 4
+
+
+def test_prioritized_resume_does_not_recheck_unchanged_companies(memory_db, checked):
+    # 期限前・結果が変わらない企業は書き込まれない（lastCheckedAt は古いまま）
+    memory_db.data['companies'] = {f'c{i}': _checked(f'企業{i}', 10 + i) for i in range(4)}
+    first = _run('&full=1&budget=4')
+    assert first['status'] == 'partial'
+    assert len(checked) == 2
+    assert memory_db.data['companies'][checked[0]]['indeedStatus']['lastCheckedAt'] < NOW
+
+    second = _run(f'&resume={first["runId"]}&budget=8')
+    assert second['status'] == 'completed'
+    assert sorted(checked) == ['c0', 'c1', 'c2', 'c3']
+    assert second['budget']['runUsed'] == 8
+    assert second['processed'] == 4
@@ -0,0 +1,51 @@
+"""/check-batch?async=1（開始だけして進捗・結果をポーリングする）のテスト"""
+
+import time
+
+import pytest
+
+import main
+import run_log
+import runner
+from indeed_checker import IndeedCheckResult
+
+
+@pytest.fixture
+def client(memory_db, monkeypatch, tmp_path):
+    memory_db.data['companies'] = {
+        'c1': {'name': 'サクラ', 'status': 'active'},
+        'c2': {'name': 'モミジ', 'status': 'active'},
+    }
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(
+        runner, 'check_company_indeed', lambda company, **kwargs: IndeedCheckResult(detected=False)
+    )
+    return main.app.test_client()
+
+
+def test_async_batch_returns_immediately_and_can_be_polled(client):
+    response = client.post('/check-batch?async=1', json={'companyIds': ['c1', 'missing', 'c2']})
+    assert response.status_code == 202
+    started = response.get_json()
+    assert started['notFound'] == ['missing']
+
+    for _ in range(100):
+        progress = client.get(started['progress']).get_json()
+        if progress.get('status') == 'completed':
+            break
+        time.sleep(0.05)
+    assert progress['status'] == 'completed'
+    assert progress['checked'] == 2
+
+    lines = client.get(started['results']).get_data(as_text=True).splitlines()
+    assert len(lines) == 2
+
+
+def test_company_read_failure_returns_500(client, monkeypatch):
+    def _fail(company_ids):
+        raise RuntimeError('Firestore unavailable')
+
+    monkeypatch.setattr(main, 'get_companies', _fail)
+    response = client.post('/check-batch', json={'companyIds': ['c1']})
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Firestore unavailable'}
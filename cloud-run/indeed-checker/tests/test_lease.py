@@ -0,0 +1,62 @@
+"""シャード実行とシャードなしの /run のリースの排他のテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from lease import COORDINATOR_RUN_SUFFIX, LeaseHeld, RunLease, run_lease_name
+
+
+def _hold(memory_db, name, run_id):
+    memory_db.data.setdefault('indeedCheckerLeases', {})[name] = {
+        'owner': 'other',
+        'runId': run_id,
+        'expiresAt': datetime.now(timezone.utc) + timedelta(minutes=5),
+    }
+
+
+def _leases(memory_db):
+    return set(memory_db.data.get('indeedCheckerLeases', {}))
+
+
+def test_shard_run_conflicts_with_a_plain_run(memory_db):
+    _hold(memory_db, 'run', 'plain')
+    lease = RunLease(run_lease_name(0, 2), 'shard-run')
+    with pytest.raises(LeaseHeld) as e:
+        lease.acquire()
+    assert e.value.name == 'run'
+    assert e.value.run_id == 'plain'
+    assert _leases(memory_db) == {'run'}
+
+
+def test_shards_started_by_the_coordinator_share_the_run_lease(memory_db):
+    _hold(memory_db, 'run', f'r1{COORDINATOR_RUN_SUFFIX}')
+    _hold(memory_db, run_lease_name(1, 2), 'r1-shard1of2')
+    lease = RunLease(run_lease_name(0, 2), 'r1-shard0of2')
+    lease.acquire()
+    lease.release()
+
+
+def test_plain_run_conflicts_with_a_shard_run(memory_db):
+    _hold(memory_db, run_lease_name(1, 4), 'shard-run')
+    lease = RunLease(run_lease_name(), 'plain')
+    with pytest.raises(LeaseHeld) as e:
+        lease.acquire()
+    assert e.value.name == 'run-shard1of4'
+    assert _leases(memory_db) == {'run-shard1of4'}
+
+
+def test_shard_runs_with_different_counts_conflict(memory_db):
+    _hold(memory_db, run_lease_name(0, 4), 'four')
+    with pytest.raises(LeaseHeld):
+        RunLease(run_lease_name(0, 2), 'two').acquire()
+
+
+def test_expired_leases_do_not_conflict(memory_db):
+    _hold(memory_db, 'run', 'crashed')
+    memory_db.data['indeedCheckerLeases']['run']['expiresAt'] = (
+        datetime.now(timezone.utc) - timedelta(minutes=1)
+    )
+    lease = RunLease(run_lease_name(0, 2), 'shard-run')
+    lease.acquire()
+    lease.release()
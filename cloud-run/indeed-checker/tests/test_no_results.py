@@ -0,0 +1,103 @@
+"""SerpAPI の「検索結果0件」ペイロードの扱いのテスト"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import indeed_checker
+from lookup_cache import LookupCache, SqliteCacheBackend
+from scheduler import due_reason, next_schedule
+from serpapi_client import SerpApiClient
+
+NO_RESULTS = {
+    'search_information': {'organic_results_state': 'Fully empty'},
+    'error': "Google hasn't returned any results for this query.",
+}
+
+
+class _Response:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class _Session:
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return _Response(self.data)
+
+
+@pytest.fixture
+def serpapi(monkeypatch):
+    """指定したペイロードを返す SerpApiClient に差し替える。"""
+
+    def _install(data):
+        client = SerpApiClient(api_key='test', base_url='http://serpapi.invalid/search.json')
+        client.session = _Session(data)
+        monkeypatch.setattr(indeed_checker, 'get_serpapi_client', lambda: client)
+        return client
+
+    return _install
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = LookupCache(SqliteCacheBackend(str(tmp_path / 'cache.sqlite3')))
+    monkeypatch.setattr(indeed_checker, 'get_lookup_cache', lambda: cache)
+    return cache
+
+
+def test_no_results_payload_is_a_negative_result(serpapi, cache):
+    serpapi(NO_RESULTS)
+    result = indeed_checker.check_company_indeed(
+        {'id': 'c1', 'name': '株式会社無名社'}, use_cache=False, jobs_check='off'
+    )
+    assert result.error is None
+    assert result.detected is False
+    assert result.queries == 1
+    # 掲載なしとして negative TTL でキャッシュされる
+    assert cache.get('無名社') == {'indeedUrl': None, 'hasJobsPage': False}
+
+
+def test_no_results_is_scheduled_like_a_normal_check(serpapi, cache):
+    serpapi(NO_RESULTS)
+    company = {'id': 'c1', 'name': '無名社'}
+    result = indeed_checker.check_company_indeed(company, use_cache=False, jobs_check='off')
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    schedule = next_schedule(company, unchanged=False, error=result.error, now=now)
+    assert schedule['nextCheckAt'] > now
+    company['indeedStatus'] = dict(schedule, lastCheckedAt=now, detected=False)
+    assert due_reason(company, now) is None
+
+
+def test_other_error_payloads_still_fail(serpapi):
+    serpapi({'error': 'Invalid API key.'})
+    result = indeed_checker.check_company_indeed(
+        {'id': 'c1', 'name': '無名社'}, use_cache=False, jobs_check='off'
+    )
+    assert result.error and 'Invalid API key' in result.error
+
+
+def test_no_results_in_batched_search(serpapi):
+    client = serpapi(NO_RESULTS)
+    results, stats = indeed_checker.check_companies_batched(
+        [{'id': 'c1', 'name': 'A社'}, {'id': 'c2', 'name': 'B社'}],
+        use_cache=False,
+        jobs_check='off',
+    )
+    assert [result.error for result in results] == [None, None]
+    assert not any(result.detected for result in results)
+    # OR 検索の後、1社ずつ検索し直す
+    assert client.session.calls == 3
+    assert stats['fallback'] == 2
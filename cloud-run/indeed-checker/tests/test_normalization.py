@@ -0,0 +1,37 @@
+"""企業名の正規化（normalize_company_name / match_key）のテスト"""
+
+import pytest
+
+from normalization import match_key, normalize_company_name
+
+
+@pytest.mark.parametrize('name', [
+    '株式会社サクラ',
+    'サクラ株式会社',
+    '（株）サクラ',
+    '(株)サクラ',
+    '㈱サクラ',
+    'サクラ（株）',
+    '  株式会社　サクラ  ',
+])
+def test_corporate_suffix_is_removed(name):
+    assert normalize_company_name(name) == 'サクラ'
+
+
+def test_full_width_alphanumerics_are_half_width():
+    assert normalize_company_name('株式会社ＡＢＣ　Ｄｉｎｉｎｇ１２３') == 'ABC Dining123'
+
+
+def test_half_width_kana_is_full_width():
+    assert normalize_company_name('ｻｸﾗﾀﾞｲﾆﾝｸﾞ(ｶﾌﾞ)') == 'サクラダイニング(カブ)'
+    assert normalize_company_name('ｻｸﾗﾀﾞｲﾆﾝｸﾞ株式会社') == 'サクラダイニング'
+
+
+@pytest.mark.parametrize('name', ['株式会社', '（株）', '㈱', '  有限会社　', '', None])
+def test_suffix_only_or_empty_name_is_empty(name):
+    assert normalize_company_name(name) == ''
+
+
+def test_match_key_ignores_case_spaces_and_separators():
+    assert match_key('Blue-Sky_Foods') == match_key('blue sky・foods') == 'blueskyfoods'
+    assert match_key('ＢＬＵＥ　ＳＫＹ') == 'bluesky'
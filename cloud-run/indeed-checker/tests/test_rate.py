@@ -0,0 +1,45 @@
+"""/run?qps のレート指定が実行の間だけ有効になることのテスト"""
+
+import indeed_checker
+from rate_controller import AimdController
+from rate_limiter import ConcurrencyLimiter, TokenBucket
+
+
+def test_fixed_rate_is_restored_after_the_run():
+    limiter = indeed_checker._rate_limiter
+    before = limiter.rate
+    with indeed_checker.serpapi_rate(before / 2):
+        assert limiter.rate == before / 2
+    assert limiter.rate == before
+
+
+def test_fixed_rate_is_restored_when_the_run_fails():
+    limiter = indeed_checker._rate_limiter
+    before = limiter.rate
+    try:
+        with indeed_checker.serpapi_rate(before * 3):
+            raise RuntimeError('run failed')
+    except RuntimeError:
+        pass
+    assert limiter.rate == before
+
+
+def test_adaptive_max_rate_is_restored(monkeypatch):
+    bucket = TokenBucket(rate=2.0)
+    controller = AimdController(bucket, ConcurrencyLimiter(2), min_rate=0.1, max_rate=5.0)
+    monkeypatch.setattr(indeed_checker, '_controller', controller)
+
+    with indeed_checker.serpapi_rate(0.5):
+        assert controller.max_rate == 0.5
+        assert bucket.rate == 0.5
+    # 上限は元に戻し、レートは指定した値からまた増減させる
+    assert controller.max_rate == 5.0
+    assert bucket.rate == 0.5
+
+
+def test_no_qps_leaves_the_rate_alone():
+    limiter = indeed_checker._rate_limiter
+    before = limiter.rate
+    with indeed_checker.serpapi_rate(None):
+        pass
+    assert limiter.rate == before
@@ -0,0 +1,156 @@
+"""SerpAPI 流量の適応制御（AimdController）のテスト"""
+
+import pytest
+
+import rate_controller
+from rate_controller import (
+    OUTCOME_ERROR,
+    OUTCOME_ERROR_PAYLOAD,
+    OUTCOME_OK,
+    OUTCOME_THROTTLED,
+    OUTCOME_TIMEOUT,
+    AimdController,
+)
+from rate_limiter import ConcurrencyLimiter, TokenBucket
+from serpapi_client import _outcome
+
+WINDOW = 4
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_controller.time, 'monotonic', clock)
+    return clock
+
+
+def _controller(rate=1.0, limit=2, **kwargs):
+    options = dict(
+        min_rate=0.1, max_rate=4.0, min_inflight=1, max_inflight=4,
+        target_latency=5.0, target_error_rate=0.1, window=WINDOW,
+    )
+    options.update(kwargs)
+    return AimdController(TokenBucket(rate), ConcurrencyLimiter(limit), **options)
+
+
+def _ok_window(controller, rate_limited=True, queued=False, latency=1.0):
+    for _ in range(WINDOW):
+        controller.record(OUTCOME_OK, latency, rate_limited=rate_limited, queued=queued)
+
+
+def test_slow_start_doubles_then_increases_additively(clock):
+    controller = _controller()
+    _ok_window(controller)
+    assert controller.bucket.rate == 2.0
+
+    controller.record(OUTCOME_THROTTLED)
+    assert controller.bucket.rate == 1.0
+    # 429 を含むウィンドウは、クールダウン中なのでさらには下げない
+    for _ in range(WINDOW - 1):
+        controller.record(OUTCOME_OK, 1.0, rate_limited=True)
+    assert controller.bucket.rate == 1.0
+    clock.now += rate_controller.COOLDOWN_SECONDS + 1
+    _ok_window(controller)
+    assert controller.bucket.rate == pytest.approx(1.0 + rate_controller.RATE_STEP)
+    assert controller.stats()['slowStart'] is False
+
+
+def test_no_increase_when_not_rate_bound(clock):
+    controller = _controller()
+    _ok_window(controller, rate_limited=False)
+    assert controller.bucket.rate == 1.0
+    assert controller.limiter.limit == 2
+
+
+def test_inflight_limit_grows_when_requests_queue(clock):
+    controller = _controller()
+    _ok_window(controller, rate_limited=False, queued=True)
+    assert controller.limiter.limit == 3
+    assert controller.bucket.rate == 1.0
+
+
+@pytest.mark.parametrize('outcome', [OUTCOME_THROTTLED, OUTCOME_TIMEOUT, OUTCOME_ERROR_PAYLOAD])
+def test_backoff_halves_rate_and_limit_immediately(clock, outcome):
+    controller = _controller(rate=2.0, limit=4)
+    controller.record(outcome)
+    assert controller.bucket.rate == 1.0
+    assert controller.limiter.limit == 2
+
+
+def test_5xx_only_counts_toward_the_window_error_rate(clock):
+    controller = _controller(rate=2.0, limit=4)
+    controller.record(OUTCOME_ERROR)
+    assert controller.bucket.rate == 2.0
+    for _ in range(WINDOW - 1):
+        controller.record(OUTCOME_OK, 1.0, rate_limited=True)
+    assert controller.bucket.rate == 2.0 * rate_controller.DECREASE_FACTOR
+    assert controller.limiter.limit == 3
+
+
+def test_slow_p95_decreases(clock):
+    controller = _controller(rate=2.0, limit=4)
+    _ok_window(controller, latency=10.0)
+    assert controller.bucket.rate == 2.0 * rate_controller.DECREASE_FACTOR
+
+
+def test_cooldown_prevents_repeated_decreases(clock):
+    controller = _controller(rate=2.0, limit=4)
+    controller.record(OUTCOME_THROTTLED)
+    controller.record(OUTCOME_THROTTLED)
+    assert controller.bucket.rate == 1.0
+    clock.now += rate_controller.COOLDOWN_SECONDS
+    controller.record(OUTCOME_THROTTLED)
+    assert controller.bucket.rate == 0.5
+    assert controller.stats()['decreases'] == 2
+
+
+def test_rate_and_limit_are_clamped(clock):
+    controller = _controller(rate=3.0, limit=4)
+    for _ in range(3):
+        _ok_window(controller, queued=True)
+    assert controller.bucket.rate == 4.0
+    assert controller.limiter.limit == 4
+
+    for _ in range(10):
+        controller.record(OUTCOME_TIMEOUT)
+        clock.now += rate_controller.COOLDOWN_SECONDS
+    assert controller.bucket.rate == 0.1
+    assert controller.limiter.limit == 1
+
+
+def test_initial_values_are_clamped(clock):
+    controller = _controller(rate=10.0, limit=16)
+    assert controller.bucket.rate == 4.0
+    assert controller.limiter.limit == 4
+
+
+def test_outcome_classification():
+    no_results = {'error': "Google hasn't returned any results for this query."}
+    assert _outcome(200, no_results) == OUTCOME_OK
+    assert _outcome(200, {'error': 'Your account has run out of searches.'}) == OUTCOME_ERROR_PAYLOAD
+    assert _outcome(200, {'organic_results': []}) == OUTCOME_OK
+    assert _outcome(429) == OUTCOME_THROTTLED
+    assert _outcome(503) == OUTCOME_ERROR
+    assert _outcome(401) == OUTCOME_OK
+
+
+def test_no_results_payloads_do_not_slow_down(clock):
+    controller = _controller()
+    no_results = {'error': "Google hasn't returned any results for this query."}
+    for _ in range(WINDOW):
+        controller.record(_outcome(200, no_results), 1.0, rate_limited=True)
+    assert controller.bucket.rate == 2.0
+    assert controller.stats()['decreases'] == 0
+
+
+def test_defaults_stay_near_the_fixed_pacing():
+    assert rate_controller.SERPAPI_MAX_QPS <= 1.0
+    assert rate_controller.SERPAPI_MAX_INFLIGHT <= 4
@@ -0,0 +1,108 @@
+"""チェックポイントからの再開（ProgressCursor と /run の自動再開）のテスト"""
+
+import threading
+import time
+
+import pytest
+
+import main
+import run_log
+import runner
+from firestore_service import get_run_state, save_run_state, set_last_run_id
+from indeed_checker import IndeedCheckResult
+from runner import ProgressCursor
+
+COMPANY_COUNT = 12
+
+
+def test_cursor_advances_only_over_contiguous_completions():
+    progress = ProgressCursor()
+    for company_id in ('a', 'b', 'c'):
+        progress.scanned(company_id)
+    progress.completed('b', {'checked': 1})
+    assert progress.cursor is None
+    assert progress.counters['total'] == 0
+    progress.completed('a', {'checked': 1, 'detected': 1})
+    assert progress.cursor == 'b'
+    assert progress.counters['total'] == 2
+    assert progress.counters['detected'] == 1
+
+
+def test_cursor_restores_saved_counters():
+    progress = ProgressCursor('b', {'total': 2, 'checked': 2})
+    progress.scanned('c')
+    progress.completed('c', {'checked': 1})
+    assert progress.cursor == 'c'
+    assert progress.counters['total'] == 3
+    assert progress.counters['checked'] == 3
+
+
+@pytest.fixture
+def checked(memory_db, monkeypatch, tmp_path):
+    """企業を登録し、検索の代わりに1社0.05秒かかるチェックを使う（呼ばれた企業名を返す）。"""
+    memory_db.data['companies'] = {
+        f'c{i:02d}': {'name': f'企業{i:02d}', 'status': 'active'}
+        for i in range(COMPANY_COUNT)
+    }
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(runner, 'PLAN_CHUNK_SIZE', 1)
+    names = []
+    lock = threading.Lock()
+
+    def _check(company, **kwargs):
+        time.sleep(0.05)
+        with lock:
+            names.append(company['name'])
+        return IndeedCheckResult(detected=False)
+
+    monkeypatch.setattr(runner, 'check_company_indeed', _check)
+    return names
+
+
+def _run(query=''):
+    return main.app.test_client().post(f'/run?workers=1&batch=1{query}').get_json()
+
+
+def test_run_continues_a_partial_run(checked):
+    first = _run('&max_seconds=0.2')
+    assert first['status'] == 'partial'
+    assert first['stopReason'] == 'time_budget'
+    assert 0 < len(checked) < COMPANY_COUNT
+
+    second = _run()
+    assert second['runId'] == first['runId']
+    assert second['status'] == 'completed'
+    assert second['processed'] == COMPANY_COUNT
+    assert sorted(checked) == [f'企業{i:02d}' for i in range(COMPANY_COUNT)]
+
+    # 完了した実行は再開しない
+    assert _run('&resume=pending') == {'status': 'idle', 'message': '未完了の実行はありません'}
+
+
+def test_run_continues_after_the_instance_was_killed(checked):
+    # タイムアウトで強制終了した実行: status は running のまま、最後のチェックポイントだけが残る
+    save_run_state('killed', {
+        'status': 'running',
+        'cursor': 'c04',
+        'counters': {'total': 5, 'checked': 5, 'not_detected': 5},
+        'slices': 1,
+        'shard': 0,
+        'shards': 1,
+    })
+    set_last_run_id('run', 'killed')
+
+    summary = _run()
+    assert summary['runId'] == 'killed'
+    assert summary['status'] == 'completed'
+    assert summary['processed'] == COMPANY_COUNT
+    assert sorted(checked) == [f'企業{i:02d}' for i in range(5, COMPANY_COUNT)]
+    assert get_run_state('killed')['status'] == 'completed'
+
+
+def test_fresh_run_ignores_the_pending_run(checked):
+    save_run_state('killed', {'status': 'partial', 'cursor': 'c04', 'slices': 1})
+    set_last_run_id('run', 'killed')
+
+    summary = _run('&fresh=1')
+    assert summary['runId'] != 'killed'
+    assert len(checked) == COMPANY_COUNT
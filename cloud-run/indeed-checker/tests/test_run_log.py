@@ -0,0 +1,45 @@
+"""結果ログの保存期間（古いログの削除）のテスト"""
+
+import os
+import time
+
+import run_log
+from run_log import ResultLog, prune_result_logs
+
+
+def _touch(directory, name, age_hours):
+    path = directory / name
+    path.write_text('{}\n')
+    mtime = time.time() - age_hours * 3600
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_old_logs_are_deleted_when_a_run_starts(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(run_log, 'RETENTION_HOURS', 24)
+    old = _touch(tmp_path, 'old.ndjson', 30)
+    recent = _touch(tmp_path, 'recent.ndjson', 2)
+    other = _touch(tmp_path, 'notes.txt', 30)
+
+    log = ResultLog('new-run')
+    log.append({'companyId': 'c1'})
+    log.close()
+
+    assert not old.exists()
+    assert recent.exists()
+    assert other.exists()
+    assert (tmp_path / 'new-run.ndjson').exists()
+
+
+def test_zero_retention_keeps_everything(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(run_log, 'RETENTION_HOURS', 0)
+    old = _touch(tmp_path, 'old.ndjson', 24 * 365)
+    assert prune_result_logs() == 0
+    assert old.exists()
+
+
+def test_missing_directory_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_log, 'RESULTS_DIR', str(tmp_path / 'missing'))
+    assert prune_result_logs() == 0
@@ -0,0 +1,80 @@
+"""次回チェック日時（due_reason / next_schedule）のテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import scheduler
+from normalization import normalize_company_name
+from scheduler import check_interval, due_reason, next_schedule
+
+NOW = datetime(2026, 10, 12, 18, 0, tzinfo=timezone.utc)
+
+
+def _company(name='株式会社サクラ', **status):
+    base = {
+        'lastCheckedAt': NOW - timedelta(days=7),
+        'nextCheckAt': NOW + timedelta(days=7),
+        'checkedName': normalize_company_name(name),
+    }
+    return {'id': 'c1', 'name': name, 'indeedStatus': dict(base, **status)}
+
+
+def test_never_checked_company_is_new():
+    assert due_reason({'id': 'c1', 'name': 'サクラ'}, NOW) == 'new'
+    assert due_reason(_company(nextCheckAt=None), NOW) == 'new'
+
+
+def test_previous_error_is_rechecked():
+    assert due_reason(_company(error='timeout'), NOW) == 'error'
+
+
+def test_renamed_company_is_rechecked():
+    company = _company()
+    company['name'] = '株式会社モミジ'
+    assert due_reason(company, NOW) == 'renamed'
+
+
+def test_due_within_slack():
+    slack = timedelta(hours=scheduler.SCHEDULE_SLACK_HOURS)
+    assert due_reason(_company(nextCheckAt=NOW + slack), NOW) == 'due'
+    assert due_reason(_company(nextCheckAt=NOW + slack + timedelta(minutes=1)), NOW) is None
+
+
+def test_interval_grows_and_is_capped():
+    base = scheduler.SCHEDULE_BASE_INTERVAL_DAYS
+    assert check_interval(0) == timedelta(days=base)
+    assert check_interval(1) == timedelta(days=base * scheduler.SCHEDULE_GROWTH)
+    assert check_interval(100) == timedelta(days=scheduler.SCHEDULE_MAX_INTERVAL_DAYS)
+
+
+def test_unchanged_result_extends_the_interval():
+    schedule = next_schedule(_company(stableRuns=1), True, None, NOW)
+    assert schedule['stableRuns'] == 2
+    interval = check_interval(2)
+    jitter = interval * scheduler.SCHEDULE_JITTER
+    assert NOW + interval - jitter <= schedule['nextCheckAt'] <= NOW + interval
+    assert schedule['checkedName'] == normalize_company_name('株式会社サクラ')
+
+
+def test_changed_result_resets_the_interval():
+    schedule = next_schedule(_company(stableRuns=3), False, None, NOW)
+    assert schedule['stableRuns'] == 0
+    assert schedule['nextCheckAt'] <= NOW + check_interval(0)
+
+
+def test_error_is_due_on_the_next_run():
+    schedule = next_schedule(_company(stableRuns=3), True, 'timeout', NOW)
+    assert schedule == {
+        'nextCheckAt': NOW,
+        'stableRuns': 0,
+        'checkedName': normalize_company_name('株式会社サクラ'),
+    }
+
+
+@pytest.mark.parametrize('company_id', ['c1', 'c2', 'abc'])
+def test_jitter_is_stable_per_company(company_id):
+    company = dict(_company(), id=company_id)
+    first = next_schedule(company, True, None, NOW)
+    second = next_schedule(company, True, None, NOW)
+    assert first['nextCheckAt'] == second['nextCheckAt']
@@ -0,0 +1,87 @@
+"""アーカイブの記録 → 再判定（replay.py）の往復のテスト"""
+
+import pytest
+
+import indeed_checker
+import serp_archive
+from indeed_checker import check_companies_batched
+from replay import replay_companies
+from serp_archive import LocalArchiveBackend, SerpArchive
+from serpapi_client import SerpApiClient
+
+CMP = 'https://jp.indeed.com/cmp/'
+BATCH = 'site:jp.indeed.com/cmp/ ("Blue Sky" OR "サクラ" OR "無名社")'
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class _Session:
+    """クエリごとに決めた organic_results を返す（replay モードでは呼ばれない）。"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.queries = []
+
+    def get(self, url, params=None, timeout=None):
+        self.queries.append(params['q'])
+        return _Response({'organic_results': self.responses.get(params['q'], [])})
+
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    archive = SerpArchive(LocalArchiveBackend(str(tmp_path)))
+    client = SerpApiClient(api_key='test', base_url='http://serpapi.invalid', archive=archive)
+    monkeypatch.setattr(indeed_checker, 'get_serp_archive', lambda: archive)
+    monkeypatch.setattr(serp_archive, 'get_serp_archive', lambda: archive)
+    monkeypatch.setattr(indeed_checker, '_client', client)
+    return archive
+
+
+def test_batched_results_replay_without_misses(archive):
+    session = _Session({BATCH: [
+        {'link': CMP + 'Blue-Sky-Inc', 'title': 'Blue Sky Inc の企業情報 - Indeed',
+         'sitelinks': {'inline': [{'link': CMP + 'Blue-Sky-Inc/jobs'}]}},
+        {'link': CMP + 'Sakura', 'title': '株式会社サクラの求人・企業情報 | Indeed'},
+        {'link': CMP + 'Abc-Mart', 'title': 'ABCマートの求人・企業情報 | Indeed'},
+    ]})
+    indeed_checker._client.session = session
+    companies = [
+        {'id': 'c1', 'name': 'Blue Sky'},
+        {'id': 'c2', 'name': '株式会社サクラ'},
+        {'id': 'c3', 'name': '無名社'},
+    ]
+
+    recorded, stats = check_companies_batched(companies, use_cache=False, jobs_check='single')
+    assert stats == {'batched': 3, 'resolved': 2, 'fallback': 1}
+    assert session.queries == [BATCH, 'site:jp.indeed.com/cmp/ "無名社"']
+    assert [result.indeed_url for result in recorded] == [CMP + 'Blue-Sky-Inc', CMP + 'Sakura', None]
+
+    for company, result in zip(companies, recorded):
+        company['indeedStatus'] = {
+            'detected': result.detected,
+            'indeedUrl': result.indeed_url,
+            'hasJobsPage': result.has_jobs_page,
+        }
+
+    archive.replay = True
+    archive.reset_stats()
+    *rows, summary = replay_companies(companies, 'single', include_unchanged=True)
+
+    assert [row['after']['indeedUrl'] for row in rows] == [CMP + 'Blue-Sky-Inc', CMP + 'Sakura', None]
+    assert rows[0]['after']['hasJobsPage'] is True
+    assert summary['summary']['unchanged'] == 3
+    assert summary['summary']['missing'] == 0
+    assert summary['summary']['archive']['misses'] == 0
+    assert len(session.queries) == 2
@@ -0,0 +1,65 @@
+"""SerpApiClient のリトライ（Retry-After の扱い）のテスト"""
+
+import pytest
+import requests
+
+import serpapi_client
+from serpapi_client import SerpApiClient
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'organic_results': []}
+
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, params=None, timeout=None):
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(serpapi_client.time, 'sleep', slept.append)
+    return slept
+
+
+def _client(*responses, **kwargs):
+    client = SerpApiClient(api_key='test', base_url='http://serpapi.invalid', **kwargs)
+    client.session = _Session(responses)
+    return client
+
+
+def test_retry_after_longer_than_backoff_max_is_honored(sleeps):
+    client = _client(_Response(429, {'Retry-After': '45'}), _Response(200), backoff_max=30)
+    assert client.search({'q': 'x'}) == {'organic_results': []}
+    assert sleeps == [45.0]
+
+
+def test_retry_after_beyond_deadline_gives_up(sleeps):
+    client = _client(
+        _Response(429, {'Retry-After': '500'}), _Response(200), retry_deadline=120
+    )
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.search({'q': 'x'})
+    assert sleeps == []
+    assert client.stats()['failures'] == 1
+
+
+def test_exponential_backoff_is_capped(sleeps):
+    client = _client(
+        _Response(503), _Response(503), _Response(200), backoff_base=100, backoff_max=2
+    )
+    client.search({'q': 'x'})
+    assert len(sleeps) == 2
+    assert all(delay <= 2 for delay in sleeps)
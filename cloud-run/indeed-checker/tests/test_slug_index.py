@@ -0,0 +1,83 @@
+"""スラッグ索引（SlugIndex）の照合のテスト"""
+
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+from normalization import normalize_company_name
+from slug_index import SlugIndex, build_slug_index
+
+NOW = datetime(2026, 10, 12, 18, 0, tzinfo=timezone.utc)
+CMP = 'https://jp.indeed.com/cmp/'
+
+
+def _index(*urls, **kwargs):
+    index = SlugIndex()
+    for url in urls:
+        index.add(url, verified_at=NOW - timedelta(days=1), **kwargs)
+    return index
+
+
+def test_exact_slug_match():
+    index = _index(CMP + 'Blue-Sky-Foods')
+    assert index.resolve('Blue Sky Foods', NOW) == CMP + 'Blue-Sky-Foods'
+    assert index.hits['slug'] == 1
+
+
+def test_url_encoded_full_width_slug_is_decoded_and_nfkc_normalized():
+    url = CMP + quote('ＡＢＣ食堂')
+    index = _index(url)
+    assert index.resolve(normalize_company_name('株式会社ABC食堂'), NOW) == url
+    assert index.hits['slug'] == 1
+
+
+def test_resolved_company_name_match():
+    url = CMP + 'Xyz-Holdings-1'
+    index = _index(url, name='株式会社さくら食堂')
+    assert index.resolve(normalize_company_name('（株）さくら食堂'), NOW) == url
+    assert index.hits['name'] == 1
+
+
+def test_similar_slug_match():
+    # 16 個と 15 個の 3-gram のうち 15 個が共通（Dice 係数 30/31 ≒ 0.97）
+    index = _index(CMP + 'Sakura-Dining-Tokyo')
+    assert index.resolve('sakuradiningtokyo1', NOW) == CMP + 'Sakura-Dining-Tokyo'
+    assert index.hits['similar'] == 1
+
+
+def test_similarity_below_threshold_is_rejected():
+    # 10 個と 15 個の 3-gram のうち 10 個が共通（Dice 係数 0.8）
+    index = _index(CMP + 'Sakura-Dining-Tokyo')
+    assert index.resolve('sakuradining', NOW) is None
+
+
+def test_near_tie_is_rejected():
+    # どちらも Dice 係数 30/31 で、次点との差が SLUG_INDEX_MARGIN に満たない
+    index = _index(CMP + 'Sakura-Dining-Tokyo-1', CMP + 'Sakura-Dining-Tokyo-2')
+    assert index.resolve('sakuradiningtokyo', NOW) is None
+    assert index.hits == {'slug': 0, 'name': 0, 'similar': 0}
+
+
+def test_stale_or_unverified_page_is_not_used():
+    index = SlugIndex(max_age_days=30)
+    index.add(CMP + 'Old-Page', verified_at=NOW - timedelta(days=31))
+    index.add(CMP + 'Unverified-Page')
+    assert index.resolve('old page', NOW) is None
+    assert index.resolve('unverified page', NOW) is None
+
+
+def test_newer_verification_wins():
+    index = SlugIndex(max_age_days=30)
+    index.add(CMP + 'Blue-Sky', verified_at=NOW - timedelta(days=1))
+    index.add(CMP + 'Blue-Sky', verified_at=NOW - timedelta(days=60))
+    assert index.resolve('Blue Sky', NOW) == CMP + 'Blue-Sky'
+
+
+def test_build_falls_back_to_last_checked_at():
+    index = build_slug_index([
+        {'id': 'c1', 'name': 'ブルースカイ', 'indeedStatus': {
+            'indeedUrl': CMP + 'Blue-Sky', 'lastCheckedAt': NOW - timedelta(days=1),
+        }},
+        {'id': 'c2', 'name': '未検出', 'indeedStatus': {'indeedUrl': None}},
+    ])
+    assert len(index) == 1
+    assert index.resolve('ブルースカイ', NOW) == CMP + 'Blue-Sky'
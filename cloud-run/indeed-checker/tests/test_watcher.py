@@ -0,0 +1,98 @@
+"""企業の変更監視（最初のスナップショット・実行中の待機・予算）のテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import watcher
+from indeed_checker import IndeedCheckResult
+from normalization import normalize_company_name
+from watcher import CompanyWatcher
+
+
+def _company(company_id, name='サクラ', checked_name=None):
+    now = datetime.now(timezone.utc)
+    return {
+        'id': company_id,
+        'name': name,
+        'indeedStatus': {
+            'detected': False,
+            'lastCheckedAt': now - timedelta(days=1),
+            'nextCheckAt': now + timedelta(days=6),
+            'checkedName': normalize_company_name(checked_name or name),
+        },
+    }
+
+
+@pytest.fixture
+def searched(memory_db, monkeypatch):
+    """検索の代わりに呼ばれた企業IDを記録する（1社2クエリ）。"""
+    calls = []
+
+    def _check(company, **kwargs):
+        calls.append(company['id'])
+        return IndeedCheckResult(detected=False, queries=2)
+
+    monkeypatch.setattr(watcher, 'check_company_indeed', _check)
+    monkeypatch.setattr(watcher, 'WATCH_LEASE_POLL_SECONDS', 0)
+    return calls
+
+
+def test_initial_snapshot_is_only_a_baseline():
+    w = CompanyWatcher(debounce=0)
+    w._on_snapshot([('ADDED', {'id': 'c1', 'name': '未チェック'}), ('ADDED', _company('c2'))])
+    assert len(w.queue) == 0
+    assert w.snapshot()['baseline'] == 2
+
+    w._on_snapshot([('ADDED', _company('c3'))])
+    assert len(w.queue) == 1
+
+
+def test_only_added_and_relevant_modified_changes_are_queued():
+    w = CompanyWatcher(debounce=60)
+    w._on_snapshot([])
+    w._on_snapshot([
+        ('MODIFIED', _company('renamed', name='モミジ', checked_name='サクラ')),
+        ('MODIFIED', _company('written')),
+        ('ADDED', _company('added')),
+    ])
+    assert len(w.queue) == 2
+
+    # /run が書き込んで期限前になった企業はキューから外れる
+    w._on_snapshot([('MODIFIED', _company('renamed', name='モミジ'))])
+    w._on_snapshot([('REMOVED', _company('added'))])
+    assert len(w.queue) == 0
+
+
+def test_checks_wait_while_a_run_holds_the_lease(memory_db, searched):
+    memory_db.data['indeedCheckerLeases'] = {
+        'run-shard0of2': {'runId': 'r1', 'expiresAt': datetime.now(timezone.utc) + timedelta(minutes=5)},
+    }
+    w = CompanyWatcher(debounce=0)
+    w._renew_budget()
+    company = _company('c1', name='モミジ', checked_name='サクラ')
+    w._check(company)
+    assert searched == []
+    assert len(w.queue) == 1
+    assert w.snapshot()['waited_run'] == 1
+
+    memory_db.data['indeedCheckerLeases'] = {}
+    w._check(w.queue.get())
+    assert searched == ['c1']
+
+
+def test_checks_are_charged_to_the_daily_budget(memory_db, searched, monkeypatch):
+    monkeypatch.setattr(watcher, 'WATCH_DAILY_QUERY_BUDGET', 2)
+    memory_db.data['companies'] = {
+        'c1': _company('c1', name='モミジ', checked_name='サクラ'),
+        'c2': _company('c2', name='カエデ', checked_name='サクラ'),
+    }
+    w = CompanyWatcher(debounce=0)
+    w._renew_budget()
+    w._check(memory_db.data['companies']['c1'])
+    w._check(memory_db.data['companies']['c2'])
+    assert searched == ['c1']
+    stats = w.snapshot()
+    assert stats['skipped_budget'] == 1
+    assert stats['budget']['runUsed'] == 2
+    assert memory_db.data['indeedCheckerQuota'][watcher.QueryBudget().month]['used'] == 2
@@ -0,0 +1,125 @@
+"""BatchWriter とチェック結果の書き込み（変更のない企業・求人の省略）のテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+from firestore_service import BatchWriter, JobsIndex, update_jobs_indeed_control
+from indeed_checker import IndeedCheckResult
+from runner import apply_result
+
+URL = 'https://jp.indeed.com/cmp/Sakura'
+
+
+def _seed(db, collection, count):
+    db.data[collection] = {f'd{i}': {'n': i} for i in range(count)}
+    return [db.collection(collection).document(f'd{i}') for i in range(count)]
+
+
+def test_batch_writer_commits_full_batches_and_flushes_the_rest(memory_db):
+    refs = _seed(memory_db, 'companies', 5)
+    writer = BatchWriter(limit=2)
+    for i, ref in enumerate(refs):
+        writer.update(ref, {'n': i * 10}, kind='companies')
+    assert memory_db.ops['commits'] == 2
+    writer.flush()
+    assert memory_db.ops['commits'] == 3
+    assert [doc['n'] for doc in memory_db.data['companies'].values()] == [0, 10, 20, 30, 40]
+    assert writer.stats() == {
+        'companies': {'written': 5, 'skipped': 0, 'failed': 0},
+        'commits': 3,
+    }
+
+
+def test_batch_writer_commit_workers(memory_db):
+    refs = _seed(memory_db, 'jobs', 3)
+    writer = BatchWriter(limit=2, commit_workers=1)
+    for ref in refs:
+        writer.update(ref, {'n': -1}, kind='jobs')
+    futures = writer.flush(wait=False)
+    for future in futures:
+        future.result()
+    writer.close()
+    assert all(doc['n'] == -1 for doc in memory_db.data['jobs'].values())
+    assert writer.stats()['jobs'] == {'written': 3, 'skipped': 0, 'failed': 0}
+
+
+def test_batch_writer_retries_failed_batch_one_by_one(memory_db):
+    refs = _seed(memory_db, 'jobs', 2)
+    missing = memory_db.collection('jobs').document('deleted')
+    writer = BatchWriter(limit=10)
+    writer.update(refs[0], {'n': 100}, kind='jobs')
+    writer.update(missing, {'n': 100}, kind='jobs')
+    writer.update(refs[1], {'n': 100}, kind='jobs')
+    writer.flush()
+    assert memory_db.data['jobs']['d0']['n'] == 100
+    assert memory_db.data['jobs']['d1']['n'] == 100
+    assert writer.stats()['jobs'] == {'written': 2, 'skipped': 0, 'failed': 1}
+
+
+def test_jobs_with_same_can_post_are_skipped(memory_db):
+    memory_db.data['jobs'] = {
+        'j1': {'indeedControl': {'canPost': False, 'exported': False}},
+        'j2': {'indeedControl': {'canPost': True, 'exported': False}},
+        'j3': {},
+    }
+    index = JobsIndex()
+    index.add('c1', 'j1', {'canPost': False, 'exported': False})
+    index.add('c1', 'j2', {'canPost': True, 'exported': False})
+    index.add('c1', 'j3', {})
+    writer = BatchWriter()
+    assert update_jobs_indeed_control('c1', False, writer=writer, jobs_index=index) == 2
+    writer.flush()
+    assert writer.stats()['jobs'] == {'written': 2, 'skipped': 1, 'failed': 0}
+    assert memory_db.data['jobs']['j3']['indeedControl'] == {'canPost': False, 'exported': False}
+
+
+def _company(next_check_at):
+    now = datetime.now(timezone.utc)
+    return {
+        'id': 'c1',
+        'name': 'サクラ',
+        'indeedStatus': {
+            'detected': True,
+            'detectedBy': 'external',
+            'indeedUrl': URL,
+            'hasJobsPage': True,
+            'lastCheckedAt': now - timedelta(days=7),
+            'nextCheckAt': next_check_at,
+            'stableRuns': 2,
+            'checkedName': 'サクラ',
+        },
+    }
+
+
+def test_unchanged_company_checked_early_is_not_written(memory_db):
+    company = _company(datetime.now(timezone.utc) + timedelta(days=20))
+    memory_db.data['companies'] = {'c1': dict(company)}
+    writer = BatchWriter()
+    result = IndeedCheckResult(detected=True, indeed_url=URL, has_jobs_page=True)
+    apply_result(company, result, writer=writer, jobs_index=JobsIndex())
+    writer.flush()
+    assert writer.stats() == {'companies': {'written': 0, 'skipped': 1, 'failed': 0}, 'commits': 0}
+
+
+def test_unchanged_company_that_is_due_advances_its_schedule(memory_db):
+    due_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    company = _company(due_at)
+    memory_db.data['companies'] = {'c1': dict(company)}
+    writer = BatchWriter()
+    result = IndeedCheckResult(detected=True, indeed_url=URL, has_jobs_page=True)
+    apply_result(company, result, writer=writer, jobs_index=JobsIndex())
+    writer.flush()
+    status = memory_db.data['companies']['c1']['indeedStatus']
+    assert status['nextCheckAt'] > due_at + timedelta(days=7)
+    assert status['stableRuns'] == 3
+    assert writer.stats()['companies'] == {'written': 1, 'skipped': 0, 'failed': 0}
+
+
+def test_changed_company_checked_early_is_written(memory_db):
+    company = _company(datetime.now(timezone.utc) + timedelta(days=20))
+    memory_db.data['companies'] = {'c1': dict(company)}
+    writer = BatchWriter()
+    apply_result(company, IndeedCheckResult(detected=False), writer=writer, jobs_index=JobsIndex())
+    writer.flush()
+    status = memory_db.data['companies']['c1']['indeedStatus']
+    assert status['detected'] is False
+    assert status['stableRuns'] == 0
@@ -0,0 +1,295 @@
+"""企業の変更監視モジュール
+
+Firestore の on_snapshot でアクティブな企業を購読し、購読開始後に
+追加・企業名の変更・再アクティブ化があった企業を週次の /run を待たずにチェックする。
+購読直後の最初のスナップショット（既存の全企業）は基準として件数を記録するだけで、
+その時点の未チェック・改名の企業は /run に任せる。
+
+変更はデバウンス付きのキューで企業ごとにまとめ、最後の変更から
+WATCH_DEBOUNCE_SECONDS 秒たってから1回だけチェックする（入力途中の企業名で検索しない）。
+チェックは /run と同じ check_company_indeed（プロセス共有のレートリミッター）と
+apply_result を通り、1日あたりの予算（WATCH_DAILY_QUERY_BUDGET）と月間のクエリ予算に計上する。
+/run（シャード実行を含む）のリースが保持されている間はチェックせず、終わるまで待つ。
+
+常駐させるため、Cloud Run では --min-instances 1 と --no-cpu-throttling が必要。
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from firestore_service import watch_active_companies
+from indeed_checker import JOBS_CHECK_MODE, check_company_indeed
+from lease import active_run_leases
+from quota import QUERIES_PER_CHECK, QueryBudget
+from runner import apply_result
+from scheduler import due_reason
+
+logger = logging.getLogger(__name__)
+
+# 1 の場合、起動時に企業の変更監視を開始する
+WATCH_COMPANIES = os.environ.get('WATCH_COMPANIES', '0') == '1'
+
+# 最後の変更から何秒たったらチェックするか
+WATCH_DEBOUNCE_SECONDS = float(os.environ.get('WATCH_DEBOUNCE_SECONDS', 30))
+
+# 変更監視で1日（UTC）に使える SerpAPI クエリ数（0 なら月間の予算だけ）
+WATCH_DAILY_QUERY_BUDGET = int(os.environ.get('WATCH_DAILY_QUERY_BUDGET', 200))
+
+# /run のリースを確認し直す間隔（秒）
+WATCH_LEASE_POLL_SECONDS = float(os.environ.get('WATCH_LEASE_POLL_SECONDS', 30))
+
+# 変更監視で即時チェックする理由（scheduler.due_reason）。
+# エラー・期限切れの企業は通常の /run に任せる
+WATCH_DUE_REASONS = ('new', 'renamed')
+
+
+class DebouncedQueue:
+    """企業IDごとに変更をまとめる遅延キュー（スレッドセーフ）。
+
+    同じ企業の変更が続く間は取り出しを遅らせ、最後の変更から
+    debounce 秒後に最新の企業データを1回だけ取り出す。
+    """
+
+    def __init__(self, debounce: float = WATCH_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        # 企業ID → (取り出せる時刻, 最新の企業データ)
+        self._items: Dict[str, Tuple[float, dict]] = {}
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def put(self, company: dict, delay: Optional[float] = None, replace: bool = True) -> None:
+        """企業を積む（delay 秒後に取り出せる。None なら debounce 秒後）。
+
+        replace=False なら、同じ企業の新しい変更が積まれていればそちらを残す。
+        """
+        delay = self.debounce if delay is None else delay
+        with self._cond:
+            if not replace and company['id'] in self._items:
+                return
+            self._items[company['id']] = (time.monotonic() + delay, company)
+            self._cond.notify()
+
+    def discard(self, company_id: str) -> None:
+        with self._cond:
+            self._items.pop(company_id, None)
+
+    def get(self) -> Optional[dict]:
+        """取り出せる企業を待って返す。close() 後は None を返す。"""
+        with self._cond:
+            while not self._closed:
+                if not self._items:
+                    self._cond.wait()
+                    continue
+                company_id, (ready_at, company) = min(
+                    self._items.items(), key=lambda item: item[1][0]
+                )
+                wait = ready_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                del self._items[company_id]
+                return company
+            return None
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class CompanyWatcher:
+    """アクティブな企業の変更を購読し、変更のあった企業をチェックする。
+
+    Args:
+        debounce: 最後の変更からチェックまでの秒数
+        jobs_check: /jobs サブページの確認方法
+            （後追い確認がないため deferred は full として扱う）
+    """
+
+    def __init__(
+        self,
+        debounce: float = WATCH_DEBOUNCE_SECONDS,
+        jobs_check: str = JOBS_CHECK_MODE,
+    ):
+        self.queue = DebouncedQueue(debounce)
+        self.jobs_check = 'full' if jobs_check == 'deferred' else jobs_check
+        self.budget = QueryBudget(run_limit=WATCH_DAILY_QUERY_BUDGET or None)
+        self._budget_day = None
+        self.stats = {
+            'snapshots': 0,
+            'baseline': None,
+            'changes': 0,
+            'queued': 0,
+            'checked': 0,
+            'detected': 0,
+            'errors': 0,
+            'queries': 0,
+            'skipped_budget': 0,
+            'waited_run': 0,
+            'lastSnapshotAt': None,
+            'lastCheckedAt': None,
+        }
+        self._stats_lock = threading.Lock()
+        self._watch = None
+        self._thread = None
+        # (確認した時刻, /run のリースが保持されていたか)
+        self._run_lease_checked: Tuple[float, bool] = (0.0, False)
+
+    def start(self) -> None:
+        self._renew_budget()
+        self._thread = threading.Thread(
+            target=self._work, name='company-watcher', daemon=True
+        )
+        self._thread.start()
+        self._watch = watch_active_companies(self._on_snapshot)
+        logger.info(
+            f'企業の変更監視を開始（デバウンス {self.queue.debounce:g}秒）'
+        )
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self.queue.close()
+        logger.info('企業の変更監視を停止')
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['pending'] = len(self.queue)
+        stats['budget'] = self.budget.stats()
+        return stats
+
+    def _on_snapshot(self, changes: List[Tuple[str, dict]]) -> None:
+        """スナップショットの変更をキューに積む（Firestore のリスナースレッドで実行）。
+
+        - 最初のスナップショット（購読開始時点の全企業）は件数を記録するだけ
+        - REMOVED（アクティブでなくなった）企業はキューから外す
+        - ADDED になった企業（新規・再アクティブ化）はチェックする
+        - MODIFIED は未チェック・企業名が変わった企業だけチェックする。
+          チェック結果の書き込み（/run を含む）で期限前になった企業はキューから外す
+        """
+        now = datetime.now(timezone.utc)
+        with self._stats_lock:
+            initial = self.stats['snapshots'] == 0
+            self.stats['snapshots'] += 1
+            self.stats['lastSnapshotAt'] = now
+            if initial:
+                self.stats['baseline'] = len(changes)
+            else:
+                self.stats['changes'] += len(changes)
+        if initial:
+            logger.info(f'変更監視の基準: アクティブな企業 {len(changes)}社')
+            return
+
+        queued = 0
+        for change_type, company in changes:
+            if change_type == 'REMOVED':
+                self.queue.discard(company['id'])
+                continue
+            if change_type == 'ADDED':
+                reason = 'added'
+            elif change_type == 'MODIFIED':
+                reason = due_reason(company, now)
+                if reason not in WATCH_DUE_REASONS:
+                    self.queue.discard(company['id'])
+                    continue
+            else:
+                continue
+            logger.info(f'変更を検知 ({reason}): {company.get("name", "")} (ID: {company["id"]})')
+            self.queue.put(company)
+            queued += 1
+
+        with self._stats_lock:
+            self.stats['queued'] += queued
+
+    def _work(self) -> None:
+        while True:
+            company = self.queue.get()
+            if company is None:
+                return
+            try:
+                self._check(company)
+            except Exception as e:
+                logger.error(f'変更監視のチェックエラー ({company.get("id", "")}): {e}')
+                with self._stats_lock:
+                    self.stats['errors'] += 1
+
+    def _renew_budget(self) -> None:
+        """1日ごとの予算を作り直し、今月の使用量を読み込む。"""
+        budget = QueryBudget(run_limit=WATCH_DAILY_QUERY_BUDGET or None)
+        budget.load()
+        self.budget = budget
+        self._budget_day = datetime.now(timezone.utc).date()
+
+    def _run_in_progress(self) -> bool:
+        """/run（シャード実行を含む）のリースが保持されているか（WATCH_LEASE_POLL_SECONDS ごとに確認）。"""
+        checked_at, held = self._run_lease_checked
+        if time.monotonic() - checked_at < WATCH_LEASE_POLL_SECONDS:
+            return held
+        try:
+            held = bool(active_run_leases())
+        except Exception as e:
+            # 確認できなければ /run と重ならないよう保持中として扱う
+            logger.warning(f'実行リースの確認エラー: {e}')
+            held = True
+        self._run_lease_checked = (time.monotonic(), held)
+        return held
+
+    def _check(self, company: dict) -> None:
+        # /run の実行中は検索しない（/run も未チェック・改名の企業をチェックする）。
+        # 終わってから改めてキューから取り出し、その間に /run がチェックした企業は
+        # 結果の書き込み（MODIFIED）でキューから外れる
+        if self._run_in_progress():
+            self.queue.put(company, delay=WATCH_LEASE_POLL_SECONDS, replace=False)
+            with self._stats_lock:
+                self.stats['waited_run'] += 1
+            return
+
+        # 常駐中に日付が変わったら、新しい日（月）の予算に切り替える
+        if self._budget_day != datetime.now(timezone.utc).date():
+            self._renew_budget()
+
+        if not self.budget.try_reserve(QUERIES_PER_CHECK):
+            logger.warning(
+                f'SerpAPI クエリ予算がないためスキップ: {company.get("name", "")} '
+                f'(ID: {company["id"]})'
+            )
+            with self._stats_lock:
+                self.stats['skipped_budget'] += 1
+            return
+
+        result = check_company_indeed(company, jobs_check=self.jobs_check)
+        self.budget.settle(QUERIES_PER_CHECK, result.queries)
+        self.budget.flush()
+
+        _, counts = apply_result(company, result)
+        with self._stats_lock:
+            for key in ('checked', 'detected', 'errors'):
+                self.stats[key] += counts[key]
+            self.stats['queries'] += result.queries
+            self.stats['lastCheckedAt'] = datetime.now(timezone.utc)
+
+
+_watcher: Optional[CompanyWatcher] = None
+
+
+def start_watcher() -> CompanyWatcher:
+    """プロセスで1つの CompanyWatcher を開始する。"""
+    global _watcher
+    if _watcher is None:
+        _watcher = CompanyWatcher()
+        _watcher.start()
+    return _watcher
+
+
+def get_watcher() -> Optional[CompanyWatcher]:
+    return _watcher
@@ -10,11 +10,15 @@ import { getAdminFirestore } from '@/lib/firebase-admin'
  * 
  * Request Body:
  *  - companyId?: string  (指定時は単体チェック)
+ *  - companyIds?: string[]  (指定時は複数企業をまとめてチェック。開始だけして runId を返す)
+ *
+ * 複数企業・全企業のチェックは関数の実行時間の上限（vercel.json の maxDuration）を
+ * 超えるため、Cloud Run 側で非同期に実行し、進捗は GET /api/indeed/trigger?runId=... で取得する。
  */
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json().catch(() => ({}))
-    const { companyId } = body
+    const { companyId, companyIds } = body
 
     const cloudRunUrl = process.env.INDEED_CHECKER_URL
 
@@ -25,6 +29,31 @@ export async function POST(request: NextRequest) {
       )
     }
 
+    if (Array.isArray(companyIds) && companyIds.length > 0) {
+      // 複数企業チェック（非同期）
+      // 開始だけ待ち、進捗と結果は GET /api/indeed/trigger?runId=... で取得する
+      const response = await fetch(`${cloudRunUrl}/check-batch?async=1`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ companyIds }),
+      })
+      const result = await response.json().catch(() => ({}))
+
+      if (!response.ok) {
+        return NextResponse.json(
+          { success: false, error: result.error || '一括チェックの開始に失敗しました' },
+          { status: response.status }
+        )
+      }
+
+      return NextResponse.json({
+        success: true,
+        message: `${companyIds.length}社のIndeedチェックを開始しました`,
+        runId: result.runId,
+        notFound: result.notFound || [],
+      })
+    }
+
     if (companyId) {
       // 単体チェック
       const db = getAdminFirestore()
@@ -57,17 +86,32 @@ export async function POST(request: NextRequest) {
       })
     } else {
       // 全企業チェック（非同期）
-      // Cloud Runのタイムアウトが長いので、バックグラウンドで実行
-      fetch(`${cloudRunUrl}/run`, {
+      // 開始だけ待ち、進捗は Cloud Run の /runs/<runId> で確認する
+      // full=1: 次回チェック日時に関係なく全企業をチェック、fresh=1: 未完了の実行を再開しない
+      const response = await fetch(`${cloudRunUrl}/run?async=1&full=1&fresh=1`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-      }).catch(err => {
-        console.error('Cloud Run呼び出しエラー:', err)
       })
+      const result = await response.json().catch(() => ({}))
+
+      if (response.status === 409) {
+        // 別の実行（定期実行など）が進行中
+        return NextResponse.json(
+          { success: false, error: 'Indeedチェックはすでに実行中です', runId: result.runId },
+          { status: 409 }
+        )
+      }
+      if (!response.ok) {
+        return NextResponse.json(
+          { success: false, error: result.error || 'Indeedチェックの開始に失敗しました' },
+          { status: response.status }
+        )
+      }
 
       return NextResponse.json({
         success: true,
         message: '全企業のIndeedチェックを開始しました。完了まで数分かかります。',
+        runId: result.runId,
       })
     }
   } catch (error) {
@@ -78,3 +122,62 @@ export async function POST(request: NextRequest) {
     )
   }
 }
+
+/**
+ * Indeed チェックの進捗取得 API
+ * GET /api/indeed/trigger?runId=...
+ *
+ * Cloud Run の /runs/<runId> の進捗を返す。実行が終わっていれば
+ * 企業ごとの結果（/runs/<runId>/results の NDJSON）も返す。
+ */
+export async function GET(request: NextRequest) {
+  try {
+    const runId = new URL(request.url).searchParams.get('runId')
+    if (!runId) {
+      return NextResponse.json(
+        { success: false, error: 'runId を指定してください' },
+        { status: 400 }
+      )
+    }
+
+    const cloudRunUrl = process.env.INDEED_CHECKER_URL
+    if (!cloudRunUrl) {
+      return NextResponse.json(
+        { success: false, error: 'Cloud Run が未デプロイです。INDEED_CHECKER_URL 環境変数を設定してください。' },
+        { status: 503 }
+      )
+    }
+
+    const runUrl = `${cloudRunUrl}/runs/${encodeURIComponent(runId)}`
+    const response = await fetch(runUrl)
+    const summary = await response.json().catch(() => ({}))
+    if (!response.ok) {
+      return NextResponse.json(
+        { success: false, error: summary.error || '進捗の取得に失敗しました' },
+        { status: response.status }
+      )
+    }
+
+    const running = summary.status === 'pending' || summary.status === 'running'
+    if (running) {
+      return NextResponse.json({ success: true, running, summary })
+    }
+
+    // 終了済みなので結果ログは待たずに読み切れる（別インスタンスに振り分けられたら結果なし）
+    const resultsResponse = await fetch(`${runUrl}/results`)
+    const results = resultsResponse.ok
+      ? (await resultsResponse.text())
+          .split('\n')
+          .filter(line => line.trim())
+          .map(line => JSON.parse(line))
+      : null
+
+    return NextResponse.json({ success: true, running, summary, results })
+  } catch (error) {
+    console.error('Indeed 進捗取得エラー:', error)
+    return NextResponse.json(
+      { success: false, error: '進捗の取得に失敗しました' },
+      { status: 500 }
+    )
+  }
+}